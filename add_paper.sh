@@ -2,4 +2,4 @@
 
 set -euo pipefail
 
-./src/python/add_paper.py
+./src/python/add_paper.py "$@"
@@ -1,16 +1,39 @@
 #!/usr/bin/env python3
 
-from json import load, dump
+from argparse import ArgumentParser, Namespace
+from csv import DictReader, writer
+from json import JSONDecodeError, loads
+from typing import Any, Iterable, Optional, TextIO, TypeAlias
 
 from normaliser import Normaliser, NormalisedEntry
+from daemon_client import DaemonClient
 from duplicate_checker import DuplicateChecker
+from database_journal import JournaledStorage, open_journaled_storage
+from database_reader import Fields
+from duplicate_index import DuplicateIndex
+from entry_store import EntryStore
+from pipeline_metrics import METRICS, PipelineMetrics
+from search_index import update_search_index
 
 import os
+import sys
+
+
+# (row, entry fields, error) as read from a batch, and (row, id, "accepted" or "rejected", reason) as reported.
+BatchRow: TypeAlias = tuple[int, Optional[dict[str, Any]], Optional[str]]
+ReportRow: TypeAlias = tuple[int, str, str, str]
 
 
 class PaperEntryParser():
-    def __init__(self, papers_bib_file: str) -> None:
+    BATCH_FORMATS: tuple[str, ...] = ("csv", "jsonl")
+
+    def __init__(self, papers_bib_file: str, fields: Optional[Fields] = DuplicateChecker.FIELDS, daemon: Optional[DaemonClient] = None) -> None:
         self.__papers_bib_file: str = papers_bib_file
+        self.__storage: JournaledStorage = open_journaled_storage(papers_bib_file)
+        # The daemon keeps whole entries, so that it can also sync them; a CLI run only needs what the checks read.
+        self.__fields: Optional[Fields] = fields
+        self.__daemon: Optional[DaemonClient] = daemon
+        self.__loaded: bool = False
         self.__standard_keys: list[str] = ["id", "entrytype", "authors", "title", "year", "doi", "url", "journal", "booktitle", "venue"]
         self.__misc_keys: list[str] = ["area", "language", "goal", "type", "repository"]
         self.__normaliser: Normaliser = Normaliser()
@@ -20,13 +43,46 @@ class PaperEntryParser():
             if not os.path.isfile(self.__papers_bib_file):
                 raise FileNotFoundError(f"The file {self.__papers_bib_file} does not exist or is not a file.")
             else:
-                self.__parse_bibtex_file()
+                with METRICS.stage("database_load"):
+                    self.__parse_bibtex_file()
         except Exception as e:
             raise RuntimeError(f"Failed to parse the BibTeX file {self.__papers_bib_file}: {e}") from e
 
     def __parse_bibtex_file(self) -> None:
-        with open(self.__papers_bib_file, "r", encoding="utf-8") as bib_file:
-            self.__bib_database: dict[str, list[NormalisedEntry]] = load(bib_file)
+        self.__bib_database: EntryStore = EntryStore(self.__storage.project(self.__fields))
+        self.__duplicate_index: DuplicateIndex = DuplicateIndex(self.__bib_database)
+        # Whether the search index was checked against every entry loaded, so that later syncs only index additions.
+        self.__search_index_checked: bool = False
+        self.__loaded = True
+
+    def __refresh_bib_database(self) -> bool:
+        # Another curator may have added papers while this one was being entered.
+        new_entries: Optional[list[NormalisedEntry]] = self.__storage.new_entries()
+
+        if new_entries is None:
+            self.__parse_bibtex_file()
+        else:
+            for new_entry in new_entries:
+                self.__bib_database.append(new_entry)
+                self.__duplicate_index.add(new_entry)
+
+        return new_entries is None or new_entries != []
+
+    def refresh(self) -> bool:
+        # Loads the database on first use; afterwards reads only what other writers added. True when anything was read.
+        if not self.__loaded:
+            self.__load_bib_database()
+
+            return True
+
+        with self.__storage.locked():
+            return self.__refresh_bib_database()
+
+    @property
+    def entries(self) -> EntryStore:
+        self.refresh()
+
+        return self.__bib_database
 
     def __parse_new_entry(self) -> dict[str, str]:
         entry: dict[str, str] = {}
@@ -50,26 +106,218 @@ class PaperEntryParser():
     def __append_entry_to_bib(self, entry: dict[str, str]) -> None:
         normalised_entry: NormalisedEntry = self.__normaliser.normalise_bibtex_entry(bibtex_entry=entry)
 
-        if DuplicateChecker.is_duplicate(normalised_entry=normalised_entry, normalised_entries=self.__bib_database["entries"]):
-            raise ValueError("The paper to be added is a duplicate of an existing paper in the BibTeX database.")
+        with self.__storage.locked():
+            self.__refresh_bib_database()
+
+            if DuplicateChecker.is_duplicate(normalised_entry=normalised_entry, normalised_entries=self.__bib_database, duplicate_index=self.__duplicate_index):
+                raise ValueError("The paper to be added is a duplicate of an existing paper in the BibTeX database.")
+
+            self.__storage.append([normalised_entry])
+            self.__bib_database.append(normalised_entry)
+            self.__duplicate_index.add(normalised_entry)
+
+            self.__update_search_index()
+
+    def __update_search_index(self) -> None:
+        # This parser only appends, so once the index was checked it is only behind by the papers added since.
+        update_search_index(self.__papers_bib_file, self.__bib_database, changed=() if self.__search_index_checked else None)
+
+        self.__search_index_checked = True
+
+    def __submit_entry(self, daemon: DaemonClient, entry: dict[str, str]) -> None:
+        _, _, status, reason = daemon.request({"command": "add", "entries": [entry]})["report"][0]
+
+        if status != "accepted":
+            raise ValueError(f"The paper was not added: {reason}.")
+
+    def __read_batch(self, batch_file: TextIO, batch_format: str) -> list[BatchRow]:
+        rows: list[BatchRow] = []
+
+        if batch_format == "csv":
+            for row, record in enumerate(DictReader(batch_file), start=1):
+                rows.append((row, self.__batch_entry(record), None))
+        else:
+            for row, line in enumerate(batch_file, start=1):
+                if not line.strip():
+                    continue
+
+                try:
+                    record: Any = loads(line)
+                except JSONDecodeError as e:
+                    rows.append((row, None, f"invalid JSON: {e}"))
+
+                    continue
+
+                if isinstance(record, dict):
+                    rows.append((row, self.__batch_entry(record), None))
+                else:
+                    rows.append((row, None, "not a JSON object"))
+
+        return rows
+
+    def __batch_entry(self, record: dict[str, Any]) -> dict[str, Any]:
+        # Same fields and string values as an interactive entry; columns the CLI would not ask for are ignored.
+        entry: dict[str, Any] = {}
+
+        for key in self.__standard_keys + self.__misc_keys:
+            value: Any = record.get(key) or ""
+            entry[key] = " and ".join(str(item) for item in value) if isinstance(value, list) else str(value).strip()
+
+        return entry
+
+    def __validate_batch_entry(self, entry: dict[str, Any], normalised_entry: NormalisedEntry) -> Optional[str]:
+        if not normalised_entry["norm"]["title"]:
+            return "missing title"
+        elif not normalised_entry["norm"]["authors"]:
+            return "missing authors"
+        elif entry["year"] and normalised_entry["norm"]["year"] is None:
+            return f"invalid year {entry["year"]!r}"
+        else:
+            return None
+
+    def add_entries(self, entries: Iterable[Optional[dict[str, Any]]]) -> list[ReportRow]:
+        # Rows are numbered from 1 in the order given; None stands for a row that could not be read.
+        if not self.__loaded:
+            self.__load_bib_database()
+
+        rows: list[BatchRow] = [(row, None if entry is None else self.__batch_entry(entry), None if entry is not None else "not a JSON object") for row, entry in enumerate(entries, start=1)]
+
+        return self.__append_batch_to_bib(rows)
 
-        self.__bib_database["entries"].append(normalised_entry)
+    def add_normalised(self, normalised_entries: Iterable[tuple[int, NormalisedEntry]]) -> list[ReportRow]:
+        # Entries normalised elsewhere, such as BibTeX entries keyed by their line, go through the same checks.
+        if not self.__loaded:
+            self.__load_bib_database()
+
+        return self.__add_normalised_rows([(row, str(entry["norm"]["id"]), entry, None) for row, entry in normalised_entries])
+
+    def __append_batch_to_bib(self, rows: list[BatchRow]) -> list[ReportRow]:
+        normalised_rows: list[tuple[int, str, Optional[NormalisedEntry], Optional[str]]] = []
+
+        with METRICS.stage("normalisation"):
+            for row, entry, error in rows:
+                normalised_entry: Optional[NormalisedEntry] = None
+
+                if entry is not None:
+                    try:
+                        normalised_entry = self.__normaliser.normalise_bibtex_entry(bibtex_entry=entry)
+                        error = self.__validate_batch_entry(entry, normalised_entry)
+                    except ValueError as e:
+                        error = str(e)
+
+                normalised_rows.append((row, str(entry.get("id", "")) if entry is not None else "", normalised_entry, error))
+
+        return self.__add_normalised_rows(normalised_rows)
+
+    def __add_normalised_rows(self, normalised_rows: list[tuple[int, str, Optional[NormalisedEntry], Optional[str]]]) -> list[ReportRow]:
+        report: list[ReportRow] = []
+        accepted: list[NormalisedEntry] = []
+
+        # Entries accepted earlier in the batch count as existing papers for the later ones.
+        with self.__storage.locked():
+            self.__refresh_bib_database()
+
+            with METRICS.stage("duplicate_check"):
+                for row, entry_id, normalised_entry, error in normalised_rows:
+                    if normalised_entry is None or error is not None:
+                        report.append((row, entry_id, "rejected", f"validation error: {error}"))
+
+                        continue
+
+                    position: Optional[int] = DuplicateChecker.find_duplicate(normalised_entry=normalised_entry, normalised_entries=self.__bib_database, duplicate_index=self.__duplicate_index)
+
+                    if position is not None:
+                        report.append((row, entry_id, "rejected", f"duplicate of {self.__bib_database[position]["norm"]["id"]}"))
+                    else:
+                        report.append((row, entry_id, "accepted", ""))
+                        accepted.append(normalised_entry)
+                        self.__bib_database.append(normalised_entry)
+                        self.__duplicate_index.add(normalised_entry)
+
+            if accepted:
+                with METRICS.stage("storage_write"):
+                    self.__storage.append(accepted)
+
+                with METRICS.stage("search_index"):
+                    self.__update_search_index()
+
+        METRICS.count("storage_write", "accepted", len(accepted))
+        METRICS.count("storage_write", "rejected", len(report) - len(accepted))
+
+        return report
 
-        with open(self.__papers_bib_file, "w", encoding="utf-8") as bib_file:
-            dump(self.__bib_database, bib_file, indent=4, ensure_ascii=False)
+    def __save_report(self, report_file: str, report: list[ReportRow]) -> None:
+        with open(report_file, "w", encoding="utf-8", newline="") as f:
+            writer(f).writerows([("row", "id", "status", "reason"), *report])
+
+    def __submit_batch(self, daemon: DaemonClient, rows: list[BatchRow]) -> list[ReportRow]:
+        # The daemon numbers the entries it is sent from 1; rows that could not be read are reported here.
+        readable: list[tuple[int, dict[str, Any]]] = [(row, entry) for row, entry, error in rows if entry is not None and error is None]
+        response: dict[str, Any] = daemon.request({"command": "add", "entries": [entry for _, entry in readable]})
+        reports: dict[int, ReportRow] = {row: (row, entry_id, status, reason) for (row, _), (_, entry_id, status, reason) in zip(readable, response["report"])}
+
+        return [reports.get(row) or (row, "", "rejected", f"validation error: {error}") for row, _, error in rows]
+
+    def run_batch(self, batch_file: str, report_file: str, batch_format: Optional[str] = None) -> None:
+        batch_format = batch_format or ("csv" if batch_file.lower().endswith(".csv") else "jsonl")
+
+        if batch_format not in self.BATCH_FORMATS:
+            raise ValueError(f"Unknown batch format {batch_format!r}; expected one of {", ".join(self.BATCH_FORMATS)}.")
+
+        try:
+            if self.__daemon is None:
+                self.__load_bib_database()
+
+            if batch_file == "-":
+                rows: list[BatchRow] = self.__read_batch(sys.stdin, batch_format)
+            else:
+                with open(batch_file, "r", encoding="utf-8", newline="") as f:
+                    rows = self.__read_batch(f, batch_format)
+
+            report: list[ReportRow] = self.__append_batch_to_bib(rows) if self.__daemon is None else self.__submit_batch(self.__daemon, rows)
+
+            self.__save_report(report_file, report)
+
+            accepted: int = sum(1 for _, _, status, _ in report if status == "accepted")
+
+            print(f"{accepted} of {len(report)} papers added to {self.__papers_bib_file}; see {report_file} for the rejected ones.")
+        except Exception as e:
+            raise RuntimeError(f"Failed to complete the AddPaperToBib batch job: {e}") from e
 
     def run(self) -> None:
         try:
-            self.__load_bib_database()
+            if self.__daemon is None:
+                self.__load_bib_database()
 
             entry: dict[str, str] = self.__parse_new_entry()
 
-            self.__append_entry_to_bib(entry=entry)
+            if self.__daemon is None:
+                self.__append_entry_to_bib(entry=entry)
+            else:
+                self.__submit_entry(self.__daemon, entry)
         except Exception as e:
             raise RuntimeError(f"Failed to complete the AddPaperToBib job: {e}") from e
 
 
 if __name__ == "__main__":
-    parser: PaperEntryParser = PaperEntryParser(papers_bib_file="papers.json")
+    argument_parser: ArgumentParser = ArgumentParser(description="Add papers to the master database, interactively or in a batch.")
+    argument_parser.add_argument("--papers-database", default="papers.json", help="master database to add the paper to (.json, .jsonl or .sqlite3)")
+    argument_parser.add_argument("--batch", default=None, help="CSV or JSON Lines file of papers to add, or - for stdin")
+    argument_parser.add_argument("--format", default=None, choices=PaperEntryParser.BATCH_FORMATS, help="format of the batch (default: from the file extension, JSON Lines for stdin)")
+    argument_parser.add_argument("--report", default="add_paper_report.csv", help="CSV file listing each batch row as accepted or rejected, with the reason")
+    argument_parser.add_argument("--daemon", nargs="?", const=DaemonClient.SOCKET, default=None, help=f"submit the papers to a running pipeline_daemon.py on this socket (default: {DaemonClient.SOCKET}) instead of loading the database")
+    argument_parser.add_argument("--metrics-dir", default=None, help=f"write a per-stage JSON report here (or set {PipelineMetrics.DIRECTORY_VARIABLE})")
+    argument_parser.add_argument("--profile", action="store_true", help=f"also dump cProfile and tracemalloc results (or set {PipelineMetrics.PROFILE_VARIABLE}=1)")
+
+    arguments: Namespace = argument_parser.parse_args()
+    parser: PaperEntryParser = PaperEntryParser(papers_bib_file=arguments.papers_database, daemon=None if arguments.daemon is None else DaemonClient(arguments.daemon))
+
+    METRICS.start("add_paper", directory=arguments.metrics_dir, profile=arguments.profile)
 
-    parser.run()
+    try:
+        if arguments.batch is None:
+            parser.run()
+        else:
+            parser.run_batch(batch_file=arguments.batch, report_file=arguments.report, batch_format=arguments.format)
+    finally:
+        METRICS.finish()
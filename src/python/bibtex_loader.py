@@ -1,222 +1,276 @@
 #!/usr/bin/env python3
 
-from json import dump, load
-from re import match, Match
-from typing import Any, Optional
-
+from argparse import ArgumentParser, Namespace
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import batched
+from time import perf_counter
+from typing import Any, cast, Iterable, Optional, TypeAlias
+
+from bibtex_parser import BibTeXParser, BibTeXStreamReader, SourceEntry
+from database_journal import JournaledStorage, open_journaled_storage
 from duplicate_checker import DuplicateChecker
+from duplicate_index import DuplicateIndex
+from entry_store import EntryStore
+from metadata_enrichment import MetadataEnricher, RESOLVERS, create_resolver
+from normalisation_cache import NormalisationCache
 from normaliser import Normaliser, NormalisedEntry
+from pipeline_metrics import METRICS, PipelineMetrics
+from search_index import update_search_index
 
 import os
 
 
+# (line, entry, error, served from the normalisation cache) outcome of converting one BibTeX entry.
+ConversionResult: TypeAlias = tuple[int, Optional[NormalisedEntry], Optional[str], bool]
+# The results of a chunk converted in a worker, with the metrics the worker collected for it.
+WorkerResult: TypeAlias = tuple[list[ConversionResult], Optional[dict[str, Any]]]
+
+
 class BibTeXLoader():
-    def __init__(self) -> None:
+    def __init__(self, workers: int = 1, chunk_size: int = 256, cache_file: Optional[str] = None, read_only_cache: bool = False, output_file: str = "papers.json", enricher: Optional[MetadataEnricher] = None) -> None:
+        if chunk_size < 1:
+            raise ValueError("The chunk size must be at least 1.")
+
         self.__bibtex_file: str = "papers.bib"
-        self.__output_file: str = "papers.json"
+        self.__output_file: str = output_file
+        self.__workers: int = workers if workers > 0 else (os.cpu_count() or 1)
+        self.__chunk_size: int = chunk_size
+        self.__parser: BibTeXParser = BibTeXParser()
         self.__normaliser: Normaliser = Normaliser()
         self.__converted_entries: list[dict[str, Any]] = []
+        self.__conversion_errors: int = 0
+        self.__cache_file: Optional[str] = cache_file
+        self.__cache: Optional[NormalisationCache] = None if cache_file is None else NormalisationCache(cache_file, Normaliser.rules_version(), read_only=read_only_cache)
+        self.__cache_hits: int = 0
+        self.__cache_misses: int = 0
+        self.__enricher: Optional[MetadataEnricher] = enricher
 
     def main(self) -> None:
-        entries: list[str] = self.__load_bib_database()
-
-        self.__convert_bib_entries(entries)
-        self.__save_output()
-
-    def __load_bib_database(self) -> list[str]:
-        if not os.path.isfile(self.__bibtex_file):
-            raise FileNotFoundError(f"{self.__bibtex_file} not found.")
-
-        with open(self.__bibtex_file, "r", encoding="utf-8") as f:
-            content: str = f.read()
-
-        return self.__split_entries(content)
-
-    def __split_entries(self, content: str) -> list[str]:
-        entries: list[str] = []
-        depth: int = 0
-        start: int = -1
-
-        for i, ch in enumerate(content):
-            if ch == "@":
-                start = i
-            elif ch == "{":
-                depth += 1
-            elif ch == "}":
-                depth -= 1
-
-                if depth == 0 and start != -1:
-                    entries.append(content[start:i + 1])
-
-                    start = -1
-
-        return entries
-
-    def __parse_bibtex_entry(self, bibtex: str) -> tuple[str, str, dict[str, str]]:
-        text: str = bibtex.strip()
-        entrytype, citation_key, body = self.__parse_entry_header(text)
-        fields: dict[str, str] = self.__parse_bibtex_fields(body)
-
-        return entrytype, citation_key, fields
-
-
-    def __parse_entry_header(self, text: str) -> tuple[str, str, str]:
-        m: Optional[Match[str]] = match(r"@([A-Za-z0-9_:+-]+)\s*\{\s*([^,]+)\s*,", text)
-
-        if not m:
-            raise ValueError("Invalid BibTeX entry")
-
-        entrytype: str = m.group(1).lower()
-        citation_key: str = m.group(2)
-        body: str = text[m.end():].rstrip("}").strip()
-
-        return entrytype, citation_key, body
+        entries: Iterable[SourceEntry] = METRICS.timed("bibtex_reading", self.__stream_bib_database())
 
+        try:
+            with METRICS.stage("conversion"):
+                self.__convert_bib_entries(entries)
+        finally:
+            if self.__cache is not None:
+                self.__cache.close()
 
-    def __parse_bibtex_fields(self, body: str) -> dict[str, str]:
-        fields: dict[str, str] = {}
-        i: int = 0
+        # Lookups are cached by the enricher, so only entries new to it cost a request.
+        if self.__enricher is not None:
+            self.__converted_entries = self.__enricher.enrich(self.__converted_entries)
 
-        while i < len(body):
-            i = self.__skip_field_separators(body, i)
+        self.__save_output()
 
-            if i >= len(body):
-                break
+        # Only meaningful for a sequential run; workers normalise with their own memoised primitives.
+        METRICS.record("normaliser_cache", self.__normaliser.cache_statistics())
 
-            field, i = self.__read_field_name(body, i)
-            value, i = self.__read_field_value(body, i)
+    def __stream_bib_database(self) -> Iterable[SourceEntry]:
+        if not os.path.isfile(self.__bibtex_file):
+            raise FileNotFoundError(f"{self.__bibtex_file} not found.")
 
-            fields[field] = value.strip()
+        return BibTeXStreamReader(self.__bibtex_file).blocks()
 
-        return fields
+    def __infer_type(self, entrytype: str) -> str:
+        mapping: dict[str, str] = {
+            "article": "Article",
+            "inproceedings": "Conference Paper",
+            "misc": "Article",
+        }
 
+        return mapping.get(entrytype, "Article")
 
-    def __skip_field_separators(self, body: str, i: int) -> int:
-        while i < len(body) and body[i] in " \n\t,":
-            i += 1
+    def __convert_bib_entries(self, entries: Iterable[SourceEntry]) -> None:
+        # Chunks are pulled from the reader as they are needed, so reading overlaps conversion.
+        chunks: Iterable[tuple[SourceEntry, ...]] = batched(entries, self.__chunk_size)
 
-        return i
+        if self.__workers == 1:
+            for chunk in chunks:
+                self.__collect_conversion_results(self.convert_chunk(list(chunk)))
+        else:
+            with ProcessPoolExecutor(max_workers=self.__workers, initializer=_initialise_worker, initargs=(self.__cache_file, METRICS.enabled)) as pool:
+                # Results are collected in submission order, so the output matches a sequential run,
+                # and only a bounded number of chunks is in flight at any time.
+                in_flight: deque[Future[WorkerResult]] = deque()
 
+                for chunk in chunks:
+                    in_flight.append(pool.submit(_convert_chunk_in_worker, list(chunk)))
 
-    def __read_field_name(self, body: str, i: int) -> tuple[str, int]:
-        start: int = i
+                    if len(in_flight) >= 2 * self.__workers:
+                        self.__collect_worker_result(in_flight.popleft().result())
 
-        while i < len(body) and body[i] != "=":
-            i += 1
+                while in_flight:
+                    self.__collect_worker_result(in_flight.popleft().result())
 
-        field: str = body[start:i].strip().lower()
+        if self.__conversion_errors:
+            print(f"{self.__conversion_errors} BibTeX entries could not be converted.")
 
-        i += 1  # skip '='
+        if self.__cache is not None:
+            print(f"Normalisation cache: {self.__cache_hits} hits, {self.__cache_misses} misses.")
 
-        while i < len(body) and body[i].isspace():
-            i += 1
+    def __collect_worker_result(self, worker_result: WorkerResult) -> None:
+        results, metrics = worker_result
 
-        return field, i
+        # Parsing, cache lookup and normalisation times are measured in the worker.
+        if metrics is not None:
+            METRICS.merge(metrics)
 
+        self.__collect_conversion_results(results)
 
-    def __read_field_value(self, body: str, i: int) -> tuple[str, int]:
-        if i >= len(body):
-            raise ValueError("Missing value after '=' in BibTeX field")
+    def __collect_conversion_results(self, results: list[ConversionResult]) -> None:
+        for line, normalised_entry, error, cached in results:
+            METRICS.count("conversion", "entries")
 
-        if body[i] == "{":
-            return self.__read_braced(body, i)
+            if normalised_entry is not None:
+                self.__converted_entries.append(normalised_entry)
 
-        if body[i] == '"':
-            return self.__read_quoted(body, i)
+                if self.__cache is None:
+                    continue
+                elif cached:
+                    self.__cache_hits += 1
+                    METRICS.count("conversion", "cache_hits")
+                else:
+                    METRICS.count("conversion", "cache_misses")
+                    self.__cache_misses += 1
+                    self.__cache.put(NormalisationCache.key(normalised_entry["raw"]), normalised_entry)
+            else:
+                self.__conversion_errors += 1
+                METRICS.count("conversion", "errors")
+
+                print(f"Skipping the BibTeX entry at {self.__bibtex_file}:{line}: {error}")
+
+    def convert_chunk(self, chunk: list[SourceEntry]) -> list[ConversionResult]:
+        results: list[ConversionResult] = []
+
+        for line, entry in chunk:
+            try:
+                normalised_entry, cached = self.__convert_bib_entry(entry)
+
+                results.append((line, normalised_entry, None, cached))
+            except ValueError as e:
+                results.append((line, None, str(e), False))
+
+        return results
+
+    def __convert_bib_entry(self, entry: str) -> tuple[NormalisedEntry, bool]:
+        start: float = perf_counter()
+        entrytype, key, fields = self.__parser.parse_entry(entry)
+
+        METRICS.add_time("field_parsing", perf_counter() - start)
+
+        raw: dict[str, Any] = {
+            "id": key,
+            "entrytype": entrytype,
+            "authors": fields.get("author", ""),
+            "title": fields.get("title", ""),
+            "year": fields.get("year", ""),
+            "doi": fields.get("doi", ""),
+            "url": fields.get("url", ""),
+            "journal": fields.get("journal", ""),
+            "booktitle": fields.get("booktitle", ""),
+            "venue": fields.get("journal", "") or fields.get("booktitle", ""),
+            "domain": fields.get("domain", ""),
+            "target formalism": fields.get("target formalism", ""),
+            "goal": fields.get("goal", ""),
+            "type": self.__infer_type(entrytype),
+            "repository": fields.get("repository", ""),
+        }
 
-        start: int = i
+        if self.__cache is not None:
+            start = perf_counter()
+            cached_entry: Optional[NormalisedEntry] = self.__cache.get(NormalisationCache.key(raw))
 
-        while i < len(body) and body[i] != ",":
-            i += 1
+            METRICS.add_time("cache_lookup", perf_counter() - start)
 
-        return body[start:i], i
+            if cached_entry is not None:
+                return cached_entry, True
 
-    def __read_braced(self, s: str, i: int) -> tuple[str, int]:
-        depth: int = 0
-        start: int = i + 1
+        start = perf_counter()
+        normalised_entry: NormalisedEntry = self.__normaliser.normalise_bibtex_entry(raw)
 
-        i += 1
+        METRICS.add_time("normalisation", perf_counter() - start)
 
-        while i < len(s):
-            if s[i] == "{":
-                depth += 1
-            elif s[i] == "}":
-                if depth == 0:
-                    return s[start:i], i + 1
+        return normalised_entry, False
 
-                depth -= 1
+    def __save_output(self) -> None:
+        storage: JournaledStorage = open_journaled_storage(self.__output_file)
 
-            i += 1
+        # Papers added concurrently are either already in the database or wait for the import to finish.
+        with storage.locked():
+            with METRICS.stage("database_load"):
+                existing_entries: EntryStore = EntryStore(storage.project(DuplicateChecker.FIELDS))
+                duplicate_index: DuplicateIndex = DuplicateIndex(existing_entries)
 
-        raise ValueError("Unbalanced braces")
+            new_entries: list[NormalisedEntry] = []
 
-    def __read_quoted(self, s: str, i: int) -> tuple[str, int]:
-        i += 1
+            with METRICS.stage("duplicate_check"):
+                for new_entry in self.__converted_entries:
+                    if not DuplicateChecker.is_duplicate(normalised_entry=new_entry, normalised_entries=existing_entries, duplicate_index=duplicate_index):
+                        existing_entries.append(new_entry)
+                        duplicate_index.add(new_entry)
+                        new_entries.append(new_entry)
+                    else:
+                        METRICS.count("duplicate_check", "duplicates")
+                        print(f"Duplicate entry detected (ID: {new_entry["norm"]["id"]}). Skipping.")
 
-        start: int = i
+            with METRICS.stage("storage_write"):
+                storage.append(new_entries)
+                storage.compact()
 
-        while i < len(s):
-            if s[i] == '"':
-                return s[start:i], i + 1
+            METRICS.count("storage_write", "entries", len(new_entries))
 
-            i += 1
+            with METRICS.stage("search_index"):
+                update_search_index(self.__output_file, existing_entries)
 
-        raise ValueError("Unbalanced quotes")
 
-    def __infer_type(self, entrytype: str) -> str:
-        mapping: dict[str, str] = {
-            "article": "Article",
-            "inproceedings": "Conference Paper",
-            "misc": "Article",
-        }
+_worker_loader: Optional[BibTeXLoader] = None
 
-        return mapping.get(entrytype, "Article")
 
-    def __convert_bib_entries(self, entries: list[str]) -> None:
-        for entry in entries:
-            entrytype, key, fields = self.__parse_bibtex_entry(entry)
-
-            raw: dict[str, Any] = {
-                "id": key,
-                "entrytype": entrytype,
-                "authors": fields.get("author", ""),
-                "title": fields.get("title", ""),
-                "year": fields.get("year", ""),
-                "doi": fields.get("doi", ""),
-                "url": fields.get("url", ""),
-                "journal": fields.get("journal", ""),
-                "booktitle": fields.get("booktitle", ""),
-                "venue": fields.get("journal", "") or fields.get("booktitle", ""),
-                "domain": fields.get("domain", ""),
-                "target formalism": fields.get("target formalism", ""),
-                "goal": fields.get("goal", ""),
-                "type": self.__infer_type(entrytype),
-                "repository": fields.get("repository", ""),
-            }
-
-            normalised_entry: NormalisedEntry = self.__normaliser.normalise_bibtex_entry(raw)
-
-            self.__converted_entries.append(normalised_entry)
+def _initialise_worker(cache_file: Optional[str], collect_metrics: bool) -> None:
+    global _worker_loader
 
-    def __save_output(self) -> None:
-        existing_papers_data: dict[str, list[NormalisedEntry]] = {"entries": []}
+    # Workers only read the cache; the parent process stores newly normalised entries.
+    _worker_loader = BibTeXLoader(cache_file=cache_file, read_only_cache=True)
 
-        with open(self.__output_file, "r", encoding="utf-8") as f:
-            existing_papers_data = load(f)
+    if collect_metrics:
+        METRICS.collect()
 
-        existing_entries: list[NormalisedEntry] = existing_papers_data.get("entries", [])
 
-        for new_entry in self.__converted_entries:
-            if not DuplicateChecker.is_duplicate(normalised_entry=new_entry, normalised_entries=existing_entries):
-                existing_entries.append(new_entry)
-            else:
-                print(f"Duplicate entry detected (ID: {new_entry["norm"]["id"]}). Skipping.")
+def _convert_chunk_in_worker(chunk: list[SourceEntry]) -> WorkerResult:
+    results: list[ConversionResult] = cast(BibTeXLoader, _worker_loader).convert_chunk(chunk)
 
-        with open(self.__output_file, "w", encoding="utf-8") as f:
-            dump(existing_papers_data, f, indent=4, ensure_ascii=False)
+    return results, METRICS.take() if METRICS.enabled else None
 
 
 if __name__ == "__main__":
-    loader: BibTeXLoader = BibTeXLoader()
-
-    loader.main()
+    argument_parser: ArgumentParser = ArgumentParser(description="Import papers.bib into papers.json.")
+    argument_parser.add_argument("--workers", type=int, default=1, help="processes used to parse and normalise entries (0 for one per core)")
+    argument_parser.add_argument("--chunk-size", type=int, default=256, help="entries handed to a worker at a time")
+    argument_parser.add_argument("--cache-file", default=".cache/normalised_entries.sqlite3", help="normalised entries reused across runs")
+    argument_parser.add_argument("--no-cache", action="store_true", help="normalise every entry from scratch")
+    argument_parser.add_argument("--papers-database", default="papers.json", help="master database to import into (.json, .jsonl or .sqlite3)")
+    argument_parser.add_argument("--enrich", default=None, choices=RESOLVERS, help="look up missing DOIs, venues, URLs and repositories with this resolver before saving")
+    argument_parser.add_argument("--metadata-file", default=None, help="JSON file of known metadata for the local resolver")
+    argument_parser.add_argument("--mailto", default=None, help="contact address sent to Crossref")
+    argument_parser.add_argument("--enrichment-cache-file", default=".cache/metadata_responses.sqlite3", help="resolver responses reused across runs")
+    argument_parser.add_argument("--metrics-dir", default=None, help=f"write a per-stage JSON report here (or set {PipelineMetrics.DIRECTORY_VARIABLE})")
+    argument_parser.add_argument("--profile", action="store_true", help=f"also dump cProfile and tracemalloc results (or set {PipelineMetrics.PROFILE_VARIABLE}=1)")
+
+    arguments: Namespace = argument_parser.parse_args()
+    loader: BibTeXLoader = BibTeXLoader(
+        workers=arguments.workers,
+        chunk_size=arguments.chunk_size,
+        cache_file=None if arguments.no_cache else arguments.cache_file,
+        output_file=arguments.papers_database,
+        enricher=None if arguments.enrich is None else MetadataEnricher(
+            resolver=create_resolver(arguments.enrich, metadata_file=arguments.metadata_file, mailto=arguments.mailto),
+            cache_file=arguments.enrichment_cache_file,
+        ),
+    )
+
+    METRICS.start("bibtex_loader", directory=arguments.metrics_dir, profile=arguments.profile)
+
+    try:
+        loader.main()
+    finally:
+        METRICS.finish()
@@ -0,0 +1,343 @@
+from io import TextIOBase
+from re import compile as re_compile, Match, Pattern
+from typing import cast, Iterator, Optional, TypeAlias
+
+
+# (line, entry) pairs as found in the BibTeX file, and parsed (entrytype, citation key, fields) entries.
+SourceEntry: TypeAlias = tuple[int, str]
+ParsedEntry: TypeAlias = tuple[str, str, dict[str, str]]
+
+
+class BibTeXParser():
+    ENGINES: tuple[str, ...] = ("scanner", "character")
+    HEADER_PATTERN: Pattern[str] = re_compile(r"@([A-Za-z0-9_:+-]+)\s*\{\s*([^,]+)\s*,")
+    SEPARATORS_PATTERN: Pattern[str] = re_compile(r"[ \n\t,]*")
+    WHITESPACE_PATTERN: Pattern[str] = re_compile(r"\s*")
+    FIELD_PATTERN: Pattern[str] = re_compile(r'[ \n\t,]*+([^=]*+)=\s*+(?:\{([^{}]*+)\}|"([^"]*+)"|(?=[^{"])([^,]*+))')
+
+    def __init__(self, engine: str = "scanner") -> None:
+        if engine not in self.ENGINES:
+            raise ValueError(f"Unknown BibTeX parser engine {engine!r}; expected one of {", ".join(self.ENGINES)}.")
+
+        self.__engine: str = engine
+
+    @property
+    def engine(self) -> str:
+        return self.__engine
+
+    def parse_entry(self, bibtex: str) -> ParsedEntry:
+        text: str = bibtex.strip()
+
+        if not text.endswith("}"):
+            raise ValueError("Unterminated BibTeX entry")
+
+        entrytype, citation_key, body = self.__parse_entry_header(text)
+        fields: dict[str, str] = self.__scan_bibtex_fields(body) if self.__engine == "scanner" else self.__parse_bibtex_fields(body)
+
+        return entrytype, citation_key, fields
+
+
+    def __parse_entry_header(self, text: str) -> tuple[str, str, str]:
+        m: Optional[Match[str]] = self.HEADER_PATTERN.match(text)
+
+        if not m:
+            raise ValueError("Invalid BibTeX entry")
+
+        entrytype: str = m.group(1).lower()
+        citation_key: str = m.group(2)
+        body: str = text[m.end():].rstrip("}").strip()
+
+        return entrytype, citation_key, body
+
+
+    def __parse_bibtex_fields(self, body: str) -> dict[str, str]:
+        fields: dict[str, str] = {}
+        i: int = 0
+
+        while i < len(body):
+            i = self.__skip_field_separators(body, i)
+
+            if i >= len(body):
+                break
+
+            field, i = self.__read_field_name(body, i)
+            value, i = self.__read_field_value(body, i)
+
+            fields[field] = value.strip()
+
+        return fields
+
+
+    def __skip_field_separators(self, body: str, i: int) -> int:
+        while i < len(body) and body[i] in " \n\t,":
+            i += 1
+
+        return i
+
+
+    def __read_field_name(self, body: str, i: int) -> tuple[str, int]:
+        start: int = i
+
+        while i < len(body) and body[i] != "=":
+            i += 1
+
+        field: str = body[start:i].strip().lower()
+
+        i += 1  # skip '='
+
+        while i < len(body) and body[i].isspace():
+            i += 1
+
+        return field, i
+
+
+    def __read_field_value(self, body: str, i: int) -> tuple[str, int]:
+        if i >= len(body):
+            raise ValueError("Missing value after '=' in BibTeX field")
+
+        if body[i] == "{":
+            return self.__read_braced(body, i)
+
+        if body[i] == '"':
+            return self.__read_quoted(body, i)
+
+        start: int = i
+
+        while i < len(body) and body[i] != ",":
+            i += 1
+
+        return body[start:i], i
+
+    def __read_braced(self, s: str, i: int) -> tuple[str, int]:
+        depth: int = 0
+        start: int = i + 1
+
+        i += 1
+
+        while i < len(s):
+            if s[i] == "{":
+                depth += 1
+            elif s[i] == "}":
+                if depth == 0:
+                    return s[start:i], i + 1
+
+                depth -= 1
+
+            i += 1
+
+        raise ValueError("Unbalanced braces")
+
+    def __read_quoted(self, s: str, i: int) -> tuple[str, int]:
+        i += 1
+
+        start: int = i
+
+        while i < len(s):
+            if s[i] == '"':
+                return s[start:i], i + 1
+
+            i += 1
+
+        raise ValueError("Unbalanced quotes")
+
+    def __scan_bibtex_fields(self, body: str) -> dict[str, str]:
+        # Same grammar and errors as __parse_bibtex_fields. Flat fields are matched whole by one
+        # compiled pattern; nested braces, a missing value or trailing separators fall back to
+        # str.find jumps between delimiters, never stepping through the body one character at a time.
+        fields: dict[str, str] = {}
+        length: int = len(body)
+        i: int = 0
+
+        while i < length:
+            m: Optional[Match[str]] = self.FIELD_PATTERN.match(body, i)
+
+            if m is not None:
+                value: Optional[str] = m.group(2)
+
+                if value is None:
+                    value = m.group(3) if m.group(3) is not None else m.group(4)
+
+                fields[m.group(1).strip().lower()] = value.strip()
+                i = m.end()
+            else:
+                i = self.__scan_bibtex_field(body, i, fields)
+
+        return fields
+
+    def __scan_bibtex_field(self, body: str, i: int, fields: dict[str, str]) -> int:
+        length: int = len(body)
+        i = cast(Match[str], self.SEPARATORS_PATTERN.match(body, i)).end()
+
+        if i >= length:
+            return i
+
+        equals: int = body.find("=", i)
+
+        if equals == -1:
+            raise ValueError("Missing value after '=' in BibTeX field")
+
+        field: str = body[i:equals].strip().lower()
+
+        i = cast(Match[str], self.WHITESPACE_PATTERN.match(body, equals + 1)).end()
+
+        if i >= length:
+            raise ValueError("Missing value after '=' in BibTeX field")
+
+        end: int
+
+        if body[i] == "{":
+            end = self.__find_closing_brace(body, i + 1)
+            fields[field] = body[i + 1:end].strip()
+
+            return end + 1
+        elif body[i] == '"':
+            end = body.find('"', i + 1)
+
+            if end == -1:
+                raise ValueError("Unbalanced quotes")
+
+            fields[field] = body[i + 1:end].strip()
+
+            return end + 1
+        else:
+            end = body.find(",", i)
+            end = length if end == -1 else end
+            fields[field] = body[i:end].strip()
+
+            return end
+
+    def __find_closing_brace(self, body: str, i: int) -> int:
+        # Each "}" closes one level; the "{"s found before it open new ones.
+        depth: int = 0
+
+        while True:
+            closing: int = body.find("}", i)
+
+            if closing == -1:
+                raise ValueError("Unbalanced braces")
+
+            depth += body.count("{", i, closing)
+
+            if depth == 0:
+                return closing
+
+            depth -= 1
+            i = closing + 1
+
+
+class BibTeXStreamReader():
+    NON_ENTRY_TYPES: frozenset[str] = frozenset({"comment", "string", "preamble"})
+    ENTRY_START_PATTERN: Pattern[str] = re_compile(r"@([A-Za-z0-9_:+-]*)\s*")
+    DELIMITER_PATTERN: Pattern[str] = re_compile(r'[{}"]|\n(?=@)')
+
+    def __init__(self, bibtex_file: str, chunk_size: int = 1 << 16) -> None:
+        if chunk_size < 1:
+            raise ValueError("The chunk size must be at least 1.")
+
+        self.__bibtex_file: str = bibtex_file
+        self.__chunk_size: int = chunk_size
+        self.__parser: BibTeXParser = BibTeXParser()
+
+    def entries(self) -> Iterator[ParsedEntry]:
+        for line, block in self.blocks():
+            try:
+                yield self.__parser.parse_entry(block)
+            except ValueError as e:
+                raise ValueError(f"{self.__bibtex_file}:{line}: {e}") from e
+
+    def blocks(self) -> Iterator[SourceEntry]:
+        with open(self.__bibtex_file, "r", encoding="utf-8") as f:
+            yield from self.__scan(f)
+
+    def __scan(self, f: TextIOBase) -> Iterator[SourceEntry]:
+        # Only the current entry and the unread tail of the last chunk are buffered. Text before
+        # `base` has been consumed; the scanning state survives refills of the buffer.
+        buffer: str = ""
+        base: int = 0
+        line: int = 1
+        start: int = -1
+        entrytype: str = ""
+        depth: int = 0
+        in_quotes: bool = False
+        position: int = 0
+        exhausted: bool = False
+
+        while True:
+            if start == -1:
+                at: int = buffer.find("@", base)
+
+                if at == -1:
+                    line += buffer.count("\n", base)
+                    base = len(buffer)
+                else:
+                    line += buffer.count("\n", base, at)
+                    base = at
+
+                    m: Match[str] = cast(Match[str], self.ENTRY_START_PATTERN.match(buffer, at))
+
+                    if m.end() < len(buffer) or exhausted:
+                        if m.end() < len(buffer) and buffer[m.end()] == "{" and m.group(1):
+                            start, entrytype, depth, in_quotes, position = at, m.group(1).lower(), 1, False, m.end() + 1
+                        else:
+                            # A stray "@" outside any entry is free text, as in BibTeX itself.
+                            base = at + 1
+
+                        continue
+            else:
+                recovered: bool = False
+
+                for delimiter in self.DELIMITER_PATTERN.finditer(buffer, position):
+                    character: str = delimiter.group()
+                    position = delimiter.end()
+
+                    # An "@" opening a line means the current entry was never closed: hand over what was
+                    # read so far, which the parser then rejects, and resume at the next entry.
+                    if character == "\n":
+                        recovered = True
+                        position = delimiter.start()
+
+                        break
+                    # Inside a quoted value only the closing quote matters, as in BibTeXParser.
+                    elif in_quotes:
+                        in_quotes = character != '"'
+                    elif character == '"':
+                        in_quotes = depth == 1
+                    elif character == "{":
+                        depth += 1
+                    else:
+                        depth -= 1
+
+                        if depth == 0:
+                            break
+
+                if depth == 0 or recovered:
+                    if entrytype not in self.NON_ENTRY_TYPES:
+                        yield line, buffer[start:position]
+
+                    line += buffer.count("\n", start, position)
+                    base = position
+                    start = -1
+
+                    continue
+
+                # A trailing newline may still turn out to precede an "@" in the next chunk.
+                position = max(position, len(buffer) - 1)
+
+            if exhausted:
+                if start != -1 and entrytype not in self.NON_ENTRY_TYPES:
+                    yield line, buffer[start:]
+
+                return
+
+            chunk: str = f.read(self.__chunk_size)
+
+            if not chunk:
+                exhausted = True
+            else:
+                buffer = buffer[base:] + chunk
+
+                if start != -1:
+                    start -= base
+                    position -= base
+
+                base = 0
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+
+from argparse import ArgumentParser, Namespace
+from json import load
+from random import Random
+from time import perf_counter
+from typing import Any
+
+from bibtex_parser import BibTeXParser, BibTeXStreamReader
+
+
+class BibTeXParserBenchmark():
+    # That the engines agree is checked by tests/test_bibtex_parser.py; this only measures them.
+    def __init__(self, bibtex_file: str, papers_json: str, repeat: int, seed: int) -> None:
+        self.__bibtex_file: str = bibtex_file
+        self.__papers_json: str = papers_json
+        self.__repeat: int = repeat
+        self.__rng: Random = Random(seed)
+        self.__engines: dict[str, BibTeXParser] = {engine: BibTeXParser(engine=engine) for engine in BibTeXParser.ENGINES}
+
+    def run(self) -> None:
+        corpus: list[str] = self.__load_corpus()
+
+        for engine, parser in self.__engines.items():
+            start: float = perf_counter()
+
+            for _ in range(self.__repeat):
+                for entry in corpus:
+                    parser.parse_entry(entry)
+
+            elapsed: float = perf_counter() - start
+
+            print(f"{engine}: {len(corpus) * self.__repeat / elapsed:,.0f} entries/s")
+
+    def __load_corpus(self) -> list[str]:
+        corpus: list[str] = [block for _, block in BibTeXStreamReader(self.__bibtex_file).blocks()]
+
+        # The master database holds far more entries than papers.bib, so render those as BibTeX too.
+        with open(self.__papers_json, "r", encoding="utf-8") as papers_file:
+            for entry in load(papers_file)["entries"]:
+                corpus.append(self.__render_entry(entry["raw"]))
+
+        return corpus
+
+    def __render_entry(self, raw: dict[str, Any]) -> str:
+        fields: list[str] = []
+
+        for key, value in raw.items():
+            if key in ("id", "entrytype") or not value:
+                continue
+
+            text: str = str(value)
+            fields.append(f"  {key} = \"{text}\"" if "{" not in text and self.__rng.random() < 0.3 else f"  {key}={{{text}}}")
+
+        return f"@{raw["entrytype"] or "misc"}{{{raw["id"]},\n{",\n".join(fields)}\n}}"
+
+
+if __name__ == "__main__":
+    argument_parser: ArgumentParser = ArgumentParser(description="Measure the throughput of the BibTeX parser engines.")
+    argument_parser.add_argument("--bibtex-file", default="papers.bib")
+    argument_parser.add_argument("--papers-json", default="papers.json")
+    argument_parser.add_argument("--repeat", type=int, default=50)
+    argument_parser.add_argument("--seed", type=int, default=0)
+
+    arguments: Namespace = argument_parser.parse_args()
+    benchmark: BibTeXParserBenchmark = BibTeXParserBenchmark(
+        bibtex_file=arguments.bibtex_file,
+        papers_json=arguments.papers_json,
+        repeat=arguments.repeat,
+        seed=arguments.seed,
+    )
+
+    benchmark.run()
@@ -0,0 +1,52 @@
+from json import dumps, loads
+from typing import Any
+
+import socket
+
+
+class DaemonClient():
+    # Requests and responses are one JSON object per line, one request per connection.
+    SOCKET: str = ".cache/pipeline.sock"
+
+    def __init__(self, socket_path: str = SOCKET, timeout: float = 60.0) -> None:
+        self.__socket_path: str = socket_path
+        self.__timeout: float = timeout
+
+    @property
+    def socket_path(self) -> str:
+        return self.__socket_path
+
+    def request(self, payload: dict[str, Any]) -> dict[str, Any]:
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+                connection.settimeout(self.__timeout)
+                connection.connect(self.__socket_path)
+                connection.sendall((dumps(payload, ensure_ascii=False) + "\n").encode("utf-8"))
+
+                response: dict[str, Any] = loads(self.read_line(connection))
+        except (FileNotFoundError, ConnectionRefusedError) as e:
+            raise ConnectionError(f"No pipeline daemon is listening on {self.__socket_path}; start it with pipeline_daemon.py.") from e
+
+        if not response.get("ok"):
+            raise RuntimeError(f"The pipeline daemon could not complete the {payload.get("command")!r} request: {response.get("error")}")
+
+        return response
+
+    @staticmethod
+    def read_line(connection: socket.socket) -> bytes:
+        chunks: list[bytes] = []
+
+        while True:
+            chunk: bytes = connection.recv(65536)
+
+            if not chunk:
+                raise ConnectionError("The connection closed before a whole line was received.")
+
+            end: int = chunk.find(b"\n")
+
+            if end != -1:
+                chunks.append(chunk[:end])
+
+                return b"".join(chunks)
+
+            chunks.append(chunk)
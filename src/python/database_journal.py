@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+
+from argparse import ArgumentParser, Namespace
+from contextlib import contextmanager
+from json import dumps, loads
+from typing import Any, BinaryIO, Iterable, Iterator, Mapping, Optional, TextIO
+
+from database_reader import Fields, project_entry
+from database_storage import DatabaseStorage, open_storage
+from normaliser import NormalisedEntry
+
+import fcntl
+import os
+
+
+class JournaledStorage(DatabaseStorage):
+    # New entries go to an append-only journal next to the database, one JSON line each, under an
+    # exclusive lock. The journal header records how many entries the database had when the journal
+    # was started. A database that has since gained exactly the journaled entries was compacted by a
+    # run interrupted before deleting the journal, which is then ignored; any other change to the
+    # entry count is an error rather than a reason to drop the journal. Rewriting the database with
+    # the same entries, as a git checkout does, leaves the journal in effect.
+    def __init__(self, storage: DatabaseStorage, compact_threshold: int = 16) -> None:
+        if compact_threshold < 1:
+            raise ValueError("The compaction threshold must be at least 1.")
+
+        super().__init__(storage.path)
+
+        self.__storage: DatabaseStorage = storage
+        self.__journal_path: str = f"{storage.path}.journal"
+        self.__lock_path: str = f"{storage.path}.lock"
+        self.__compact_threshold: int = compact_threshold
+        self.__lock_file: Optional[TextIO] = None
+        self.__lock_depth: int = 0
+        self.__lock_exclusive: bool = False
+        self.__read_state: Optional[list[int]] = None
+        self.__read_offset: int = -1
+        # Ids of the database entries, cached while its file state is unchanged.
+        self.__ids_state: Optional[list[int]] = None
+        self.__ids: list[str] = []
+
+    @property
+    def journal_path(self) -> str:
+        return self.__journal_path
+
+    def exists(self) -> bool:
+        return self.__storage.exists() or self.__journal_entries(0)[0] != []
+
+    @contextmanager
+    def locked(self, exclusive: bool = True) -> Iterator[None]:
+        if self.__lock_depth == 0:
+            self.__lock_file = open(self.__lock_path, "a", encoding="utf-8")
+
+            try:
+                fcntl.flock(self.__lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            except BaseException:
+                self.__lock_file.close()
+                self.__lock_file = None
+
+                raise
+
+            self.__lock_exclusive = exclusive
+        elif exclusive and not self.__lock_exclusive:
+            # Keeping the shared lock would let other readers in while this one writes, and flock does not
+            # convert it atomically, so another writer could get in between.
+            raise RuntimeError(f"An exclusive lock on {self.__lock_path} was asked for while a shared one is held.")
+
+        self.__lock_depth += 1
+
+        try:
+            yield
+        finally:
+            self.__lock_depth -= 1
+
+            if self.__lock_depth == 0 and self.__lock_file is not None:
+                fcntl.flock(self.__lock_file, fcntl.LOCK_UN)
+                self.__lock_file.close()
+                self.__lock_file = None
+
+    def entries(self) -> Iterator[NormalisedEntry]:
+        return self.project(None)
+
+    def project(self, fields: Optional[Fields]) -> Iterator[NormalisedEntry]:
+        # A shared lock keeps a concurrent compaction from moving entries between the two files mid-read.
+        # The entries are read in full under it, so the lock is not held while the caller goes through them.
+        with self.locked(exclusive=False):
+            state: Optional[list[int]] = self.__database_state()
+            entries: list[NormalisedEntry] = []
+
+            if self.__storage.exists():
+                entries.extend(self.__storage.entries() if fields is None else self.__storage.project(fields))
+
+            journal_entries, offset = self.__journal_entries(0)
+
+            entries.extend(project_entry(entry, fields) for entry in journal_entries)
+
+            self.__read_state, self.__read_offset = state, offset
+
+        return iter(entries)
+
+    def new_entries(self) -> Optional[list[NormalisedEntry]]:
+        # Entries journaled by other writers since entries() was last read in full, or None when
+        # the database itself changed in between and has to be read again.
+        with self.locked():
+            if self.__read_offset == -1 or self.__read_state != self.__database_state():
+                return None
+
+            journal_entries, self.__read_offset = self.__journal_entries(self.__read_offset)
+
+            return journal_entries
+
+    def append(self, entries: Iterable[Mapping[str, Any]]) -> None:
+        with self.locked():
+            up_to_date: bool = self.__is_up_to_date()
+            journaled: int = self.__append_to_journal(entries)
+
+            if up_to_date:
+                self.__read_offset = self.__journal_end()
+
+            if journaled >= self.__compact_threshold:
+                self.compact()
+
+    def save(self, entries: Iterable[Mapping[str, Any]]) -> None:
+        with self.locked():
+            self.__storage.save(list(entries))
+            self.__remove_journal()
+
+    def compact(self) -> int:
+        with self.locked():
+            up_to_date: bool = self.__is_up_to_date()
+            journal_entries: list[NormalisedEntry] = self.__journal_entries(0)[0]
+
+            if journal_entries:
+                self.__storage.append(journal_entries)
+
+            self.__remove_journal()
+
+            # A reader that had seen every entry still has, so new_entries() need not read them all again.
+            if up_to_date:
+                self.__read_state, self.__read_offset = self.__database_state(), 0
+
+            return len(journal_entries)
+
+    def __is_up_to_date(self) -> bool:
+        return self.__read_offset != -1 and self.__read_state == self.__database_state() and self.__read_offset == self.__journal_end()
+
+    def __database_state(self) -> Optional[list[int]]:
+        if not self.__storage.exists():
+            return None
+
+        status: os.stat_result = os.stat(self.path)
+
+        return [status.st_ino, status.st_size, status.st_mtime_ns]
+
+    def __journal_end(self) -> int:
+        return os.path.getsize(self.__journal_path) if os.path.isfile(self.__journal_path) else 0
+
+    def __database_ids(self) -> list[str]:
+        state: Optional[list[int]] = self.__database_state()
+
+        if state is None:
+            return []
+        elif state != self.__ids_state:
+            self.__ids, self.__ids_state = self.__storage.ids(), state
+
+        return self.__ids
+
+    def __journal_entries(self, offset: int) -> tuple[list[NormalisedEntry], int]:
+        if not os.path.isfile(self.__journal_path):
+            return [], 0
+
+        journal_entries: list[NormalisedEntry] = []
+
+        with open(self.__journal_path, "rb") as journal_file:
+            header: bytes = journal_file.readline()
+
+            # A header that never completed was written by an append that journaled nothing.
+            if not header.endswith(b"\n"):
+                return [], 0
+
+            base: Any = loads(header).get("base")
+            database_size: int = len(self.__database_ids())
+
+            if database_size != base:
+                folded: list[str] = [str(entry["norm"]["id"]) for entry in self.__read_lines(journal_file)]
+
+                if isinstance(base, int) and database_size == base + len(folded) and self.__database_ids()[base:] == folded:
+                    return [], 0
+
+                raise ValueError(f"The journal {self.__journal_path} does not extend {self.path} as it is now ({database_size} entries). "
+                                 f"Its {len(folded)} papers were not added to the database; merge them by hand and delete the journal.")
+
+            journal_file.seek(max(offset, journal_file.tell()))
+
+            for line in journal_file:
+                # A line without its newline is a write that never completed; it is dropped.
+                if not line.endswith(b"\n"):
+                    break
+
+                journal_entries.append(loads(line))
+                offset = journal_file.tell()
+
+            return journal_entries, max(offset, len(header))
+
+    @staticmethod
+    def __read_lines(journal_file: BinaryIO) -> list[NormalisedEntry]:
+        return [loads(line) for line in journal_file if line.endswith(b"\n")]
+
+    def __append_to_journal(self, entries: Iterable[Mapping[str, Any]]) -> int:
+        lines: list[bytes] = [(dumps(self._as_dict(entry), ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8") for entry in entries]
+        journal_entries, end = self.__journal_entries(0)
+
+        # A missing or already folded journal is started afresh; otherwise an incomplete last line is cut off first.
+        with open(self.__journal_path, "r+b" if end else "wb") as journal_file:
+            if end:
+                journal_file.truncate(end)
+                journal_file.seek(end)
+            else:
+                journal_file.write((dumps({"base": len(self.__database_ids())}) + "\n").encode("utf-8"))
+
+            journal_file.writelines(lines)
+            journal_file.flush()
+            os.fsync(journal_file.fileno())
+
+        return len(journal_entries) + len(lines)
+
+    def __remove_journal(self) -> None:
+        if os.path.isfile(self.__journal_path):
+            os.remove(self.__journal_path)
+
+        self.__read_state, self.__read_offset = None, -1
+
+
+def open_journaled_storage(path: str, compact_threshold: int = 16) -> JournaledStorage:
+    return JournaledStorage(open_storage(path), compact_threshold=compact_threshold)
+
+
+if __name__ == "__main__":
+    argument_parser: ArgumentParser = ArgumentParser(description="Fold the journal of newly added papers into the master database.")
+    argument_parser.add_argument("--papers-database", default="papers.json")
+
+    arguments: Namespace = argument_parser.parse_args()
+    storage: JournaledStorage = open_journaled_storage(arguments.papers_database)
+
+    print(f"Compacted {storage.compact()} journaled entries into {arguments.papers_database}.")
@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+
+from argparse import ArgumentParser, Namespace
+from array import array
+from json import JSONDecoder, dumps, loads
+from json.decoder import scanstring
+from mmap import ACCESS_READ, mmap
+from re import Pattern, compile as re_compile
+from tempfile import NamedTemporaryFile
+from time import perf_counter
+from typing import Any, Callable, Iterator, Optional, Sequence, TypeAlias
+
+from normaliser import NormalisedEntry
+
+import os
+
+
+# Dotted paths of what to decode from each entry: "raw", "norm", "raw.title", "norm.title_tokens"...
+Fields: TypeAlias = Sequence[str]
+
+
+def project_entry(entry: NormalisedEntry, fields: Optional[Fields]) -> NormalisedEntry:
+    # The same shape as the entry, holding only the given fields (and the halves they belong to).
+    if fields is None:
+        return entry
+
+    projection: dict[str, Any] = {}
+
+    for field in fields:
+        half, _, key = field.partition(".")
+
+        if half not in entry:
+            continue
+        elif not key:
+            projection[half] = entry[half]
+        elif key in entry[half]:
+            projection.setdefault(half, {})[key] = entry[half][key]
+        else:
+            projection.setdefault(half, {})
+
+    return projection
+
+
+class DatabaseReader():
+    # Random access to a .json or .jsonl master database without decoding all of it. On first open the
+    # file is scanned once for the byte spans of every entry, of its raw and norm halves and of each norm
+    # field; the spans are kept next to the database and rebuilt when its size or mtime changes.
+    # Entries are then decoded from the memory-mapped file, and only as far as a projection asks.
+    VERSION: int = 1
+    HALVES: tuple[str, ...] = ("raw", "norm")
+    BATCH_SIZE: int = 512
+    WHITESPACE: Pattern[str] = re_compile(r"[ \t\n\r]*")
+
+    def __init__(self, path: str, index_path: Optional[str] = None) -> None:
+        extension: str = os.path.splitext(path)[1].lower()
+
+        if extension not in (".json", ".jsonl"):
+            raise ValueError(f"Random access needs a .json or .jsonl database, not {path}.")
+        elif not os.path.isfile(path):
+            raise FileNotFoundError(f"The database {path} does not exist.")
+
+        self.__path: str = path
+        self.__lines: bool = extension == ".jsonl"
+        self.__index_path: str = index_path or f"{path}.offsets"
+        self.__decoder: JSONDecoder = JSONDecoder()
+        self.__file: Any = open(path, "rb")
+        # mmap refuses empty files; an empty database simply has no entries.
+        self.__map: Optional[mmap] = mmap(self.__file.fileno(), 0, access=ACCESS_READ) if os.fstat(self.__file.fileno()).st_size else None
+        self.__fields: list[str] = []
+        self.__ids: list[str] = []
+        self.__spans: array[int] = array("q")
+        self.__columns: dict[str, int] = {}
+        self.__positions: Optional[dict[str, int]] = None
+        self.__rebuilt: bool = False
+
+        if not self.__load_index():
+            self.__build_index()
+            self.__save_index()
+
+        self.__columns = {field: column for column, field in enumerate(self.__fields)}
+
+    def __enter__(self) -> "DatabaseReader":
+        return self
+
+    def __exit__(self, *exception: Any) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self.__ids)
+
+    @property
+    def rebuilt(self) -> bool:
+        return self.__rebuilt
+
+    def close(self) -> None:
+        if self.__map is not None:
+            self.__map.close()
+            self.__map = None
+
+        self.__file.close()
+
+    def ids(self) -> list[str]:
+        return list(self.__ids)
+
+    def position(self, entry_id: str) -> Optional[int]:
+        if self.__positions is None:
+            self.__positions = {}
+
+            # The first entry wins, like the duplicate checker's first match.
+            for position, indexed_id in enumerate(self.__ids):
+                self.__positions.setdefault(indexed_id, position)
+
+        return self.__positions.get(entry_id)
+
+    def entry(self, position: int, fields: Optional[Fields] = None) -> NormalisedEntry:
+        if not 0 <= position < len(self.__ids):
+            raise IndexError(f"No entry at position {position} of {self.__path}; it has {len(self.__ids)}.")
+
+        return self.__decode([position], fields)[0]
+
+    def entry_by_id(self, entry_id: str, fields: Optional[Fields] = None) -> Optional[NormalisedEntry]:
+        position: Optional[int] = self.position(entry_id)
+
+        return None if position is None else self.entry(position, fields)
+
+    def entries(self, fields: Optional[Fields] = None) -> Iterator[NormalisedEntry]:
+        for start in range(0, len(self.__ids), self.BATCH_SIZE):
+            yield from self.__decode(range(start, min(start + self.BATCH_SIZE, len(self.__ids))), fields)
+
+    def __decode(self, positions: Sequence[int], fields: Optional[Fields]) -> list[NormalisedEntry]:
+        # Each span a projection needs: the whole entry, a half, or a norm field. Other fields
+        # (raw.title...) are cut from their decoded half.
+        plan: list[tuple[str, str, str]] = []
+
+        for field in fields if fields is not None else [""]:
+            half, _, key = field.partition(".")
+
+            if field and half not in self.HALVES:
+                raise ValueError(f"Unknown field {field!r}; fields start with one of {", ".join(self.HALVES)}.")
+
+            plan.append((half, key, field if not key or field in self.__columns else half))
+
+        columns: list[str] = list(dict.fromkeys(column for _, _, column in plan))
+        values: list[Any] = self.__decode_spans([self.__span(position, column) for position in positions for column in columns])
+        projections: list[NormalisedEntry] = []
+
+        for row in range(len(positions)):
+            decoded: dict[str, Any] = dict(zip(columns, values[row * len(columns):(row + 1) * len(columns)]))
+            projection: dict[str, Any] = {}
+
+            for half, key, column in plan:
+                value: Any = decoded[column]
+
+                if not half:
+                    projection = value
+                elif not key:
+                    projection[half] = value if value is not None else {}
+                elif column != half:
+                    projection.setdefault(half, {})
+
+                    if value is not None:
+                        projection[half][key] = value
+                elif isinstance(value, dict) and key in value:
+                    projection.setdefault(half, {})[key] = value[key]
+                else:
+                    projection.setdefault(half, {})
+
+            projections.append(projection)
+
+        return projections
+
+    def __span(self, position: int, field: str) -> tuple[int, int]:
+        offset: int = 2 * (position * len(self.__fields) + self.__columns[field])
+
+        return self.__spans[offset], self.__spans[offset + 1]
+
+    def __decode_spans(self, spans: list[tuple[int, int]]) -> list[Any]:
+        # One json.loads over all the spans of a batch costs far less than one call per field.
+        if self.__map is None:
+            return [None] * len(spans)
+
+        return loads(b"[" + b",".join(self.__map[start:end] if start != -1 else b"null" for start, end in spans) + b"]")
+
+    def __state(self) -> list[int]:
+        # The state of the file that was opened and mapped: the path may already name a newer one.
+        status: os.stat_result = os.fstat(self.__file.fileno())
+
+        return [status.st_ino, status.st_size, status.st_mtime_ns]
+
+    def __load_index(self) -> bool:
+        if not os.path.isfile(self.__index_path):
+            return False
+
+        with open(self.__index_path, "rb") as index_file:
+            try:
+                header: dict[str, Any] = loads(index_file.readline())
+            except ValueError:
+                return False
+
+            if header.get("version") != self.VERSION or header.get("state") != self.__state():
+                return False
+
+            spans: array[int] = array("q")
+
+            try:
+                spans.frombytes(index_file.read())
+            except ValueError:
+                return False
+
+        if len(spans) != 2 * len(header["fields"]) * len(header["ids"]):
+            return False
+
+        self.__fields, self.__ids, self.__spans = header["fields"], header["ids"], spans
+
+        return True
+
+    def __save_index(self) -> None:
+        header: str = dumps({"version": self.VERSION, "state": self.__state(), "fields": self.__fields, "ids": self.__ids}, ensure_ascii=False)
+        temporary_path: Optional[str] = None
+
+        # The index is only a cache: a database that cannot have one next to it is still read.
+        # Each builder writes its own temporary file, so concurrent readers never publish a mix of two.
+        try:
+            with NamedTemporaryFile("wb", dir=os.path.dirname(os.path.abspath(self.__index_path)), prefix=f".{os.path.basename(self.__index_path)}-", suffix=".tmp", delete=False) as index_file:
+                temporary_path = index_file.name
+                index_file.write(header.encode("utf-8") + b"\n")
+                self.__spans.tofile(index_file)
+
+            os.replace(temporary_path, self.__index_path)
+        except OSError:
+            if temporary_path is not None and os.path.isfile(temporary_path):
+                os.remove(temporary_path)
+
+    def __build_index(self) -> None:
+        rows: list[dict[str, tuple[int, int]]] = []
+        fields: dict[str, None] = {"": None, "raw": None, "norm": None}
+        content: bytes = self.__map[:] if self.__map is not None else b""
+
+        if self.__lines:
+            offset: int = 0
+
+            for line in content.splitlines(keepends=True):
+                if line.strip():
+                    try:
+                        text: str = line.decode("utf-8")
+                        rows.append(self.__scan_entry(text, self.__skip(text, 0), self.__byte_offsets(text, offset)))
+                    except ValueError:
+                        # A last line without its newline that does not parse is an append that never completed.
+                        if line.endswith(b"\n"):
+                            raise
+
+                offset += len(line)
+        elif content.strip():
+            text = content.decode("utf-8")
+            rows = list(self.__scan_document(text, self.__byte_offsets(text, 0)))
+
+        for row in rows:
+            fields.update(dict.fromkeys(row))
+
+        self.__fields = list(fields)
+        self.__ids = []
+        self.__spans = array("q")
+        self.__rebuilt = True
+
+        for row in rows:
+            for field in self.__fields:
+                self.__spans.extend(row.get(field, (-1, -1)))
+
+            # Ids are read once here so lookups by id never touch the database.
+            norm_id: tuple[int, int] = row.get("norm.id", (-1, -1))
+            self.__ids.append(str(loads(content[norm_id[0]:norm_id[1]])) if norm_id[0] != -1 else "")
+
+    def __scan_document(self, text: str, to_bytes: Callable[[int], int]) -> Iterator[dict[str, tuple[int, int]]]:
+        # {"entries": [entry, ...]}, whatever other keys or whitespace surround it.
+        position: int = self.__expect(text, self.__skip(text, 0), "{")
+
+        while text[position] != "}":
+            key, position = scanstring(text, self.__expect(text, position, "\""))
+            position = self.__expect(text, position, ":")
+
+            if key != "entries":
+                _, position = self.__decoder.raw_decode(text, position)
+            else:
+                position = self.__expect(text, position, "[")
+
+                while text[position] != "]":
+                    end: list[int] = []
+                    row: dict[str, tuple[int, int]] = self.__scan_entry(text, position, to_bytes, end)
+
+                    yield row
+
+                    position = self.__skip(text, end[0])
+                    position = self.__skip(text, position + 1) if text[position] == "," else position
+
+                position = self.__skip(text, position + 1)
+
+            position = self.__skip(text, position + 1) if text[position] == "," else position
+
+    def __scan_entry(self, text: str, start: int, to_bytes: Callable[[int], int], end: Optional[list[int]] = None) -> dict[str, tuple[int, int]]:
+        # Offsets are converted in increasing order, as to_bytes walks the text forwards only.
+        entry_start: int = to_bytes(start)
+        spans: dict[str, tuple[int, int]] = {}
+        position: int = self.__expect(text, start, "{")
+
+        while text[position] != "}":
+            half, position = scanstring(text, self.__expect(text, position, "\""))
+            position = self.__expect(text, position, ":")
+            value_start: int = to_bytes(position)
+
+            if half == "norm" and text[position] == "{":
+                position = self.__scan_members(text, position, to_bytes, spans)
+            else:
+                _, position = self.__decoder.raw_decode(text, position)
+
+            spans[half] = (value_start, to_bytes(position))
+            position = self.__skip(text, position)
+            position = self.__skip(text, position + 1) if text[position] == "," else position
+
+        spans[""] = (entry_start, to_bytes(position + 1))
+
+        if end is not None:
+            end.append(position + 1)
+
+        return spans
+
+    def __scan_members(self, text: str, start: int, to_bytes: Callable[[int], int], spans: dict[str, tuple[int, int]]) -> int:
+        position: int = self.__expect(text, start, "{")
+
+        while text[position] != "}":
+            key, position = scanstring(text, self.__expect(text, position, "\""))
+            position = self.__expect(text, position, ":")
+            value_start: int = to_bytes(position)
+            _, position = self.__decoder.raw_decode(text, position)
+            spans[f"norm.{key}"] = (value_start, to_bytes(position))
+            position = self.__skip(text, position)
+            position = self.__skip(text, position + 1) if text[position] == "," else position
+
+        return position + 1
+
+    def __skip(self, text: str, position: int) -> int:
+        match: Any = self.WHITESPACE.match(text, position)
+
+        return match.end()
+
+    def __expect(self, text: str, position: int, token: str) -> int:
+        position = self.__skip(text, position)
+
+        if text[position:position + 1] != token:
+            raise ValueError(f"Expected {token!r} at character {position} of {self.__path}.")
+
+        return self.__skip(text, position + 1) if token != "\"" else position + 1
+
+    @staticmethod
+    def __byte_offsets(text: str, base: int) -> Callable[[int], int]:
+        # Character offsets into the decoded text -> byte offsets into the UTF-8 file.
+        if text.isascii():
+            return lambda position: base + position
+
+        last: list[int] = [0, base]
+
+        def to_bytes(position: int) -> int:
+            last[1] += len(text[last[0]:position].encode("utf-8"))
+            last[0] = position
+
+            return last[1]
+
+        return to_bytes
+
+
+if __name__ == "__main__":
+    argument_parser: ArgumentParser = ArgumentParser(description="Look papers up in a .json or .jsonl master database without loading all of it.")
+    argument_parser.add_argument("ids", nargs="*", help="ids of the papers to print; none prints the number of entries")
+    argument_parser.add_argument("--papers-database", default="papers.json")
+    argument_parser.add_argument("--fields", default=None, help="comma-separated fields to decode, e.g. raw or norm.title_tokens,norm.authors")
+
+    arguments: Namespace = argument_parser.parse_args()
+    fields: Optional[list[str]] = None if arguments.fields is None else [field.strip() for field in arguments.fields.split(",") if field.strip()]
+    start: float = perf_counter()
+
+    with DatabaseReader(arguments.papers_database) as reader:
+        opened: float = perf_counter() - start
+
+        print(f"{len(reader)} entries in {arguments.papers_database}; offset index {"built" if reader.rebuilt else "loaded"} in {opened * 1000:.1f} ms.")
+
+        for entry_id in arguments.ids:
+            entry: Optional[NormalisedEntry] = reader.entry_by_id(entry_id, fields)
+
+            if entry is None:
+                raise ValueError(f"No paper with id {entry_id!r} in {arguments.papers_database}.")
+
+            print(dumps(entry, indent=4, ensure_ascii=False))
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+
+from abc import ABC, abstractmethod
+from argparse import ArgumentParser, Namespace
+from json import dump, dumps, load, loads
+from tempfile import NamedTemporaryFile
+from typing import Any, BinaryIO, Callable, IO, Iterable, Iterator, Mapping, Optional, TextIO
+
+from database_reader import DatabaseReader, Fields, project_entry
+from normaliser import NormalisedEntry
+
+import os
+import sqlite3
+
+
+def write_atomically(path: str, write: Callable[[TextIO], Any]) -> None:
+    # Readers see either the old or the new file, never a partial write, so no backup is needed.
+    directory: str = os.path.dirname(os.path.abspath(path))
+
+    temporary_file: IO[str] = NamedTemporaryFile("w", encoding="utf-8", dir=directory, prefix=".papers-", suffix=".tmp", delete=False)
+
+    try:
+        with temporary_file:
+            write(temporary_file)
+            temporary_file.flush()
+            os.fsync(temporary_file.fileno())
+
+        # Temporary files are private to the owner; keep the permissions the file already had, so a web
+        # server running as another user can still read what is deployed.
+        os.chmod(temporary_file.name, os.stat(path).st_mode & 0o777 if os.path.isfile(path) else 0o644)
+        os.replace(temporary_file.name, path)
+    except BaseException:
+        # Whatever failed, including the caller's write, the temporary file is not left behind.
+        os.remove(temporary_file.name)
+
+        raise
+
+
+class DatabaseStorage(ABC):
+    def __init__(self, path: str) -> None:
+        self.path: str = path
+
+    def exists(self) -> bool:
+        return os.path.isfile(self.path)
+
+    def load(self) -> list[NormalisedEntry]:
+        return list(self.entries())
+
+    @abstractmethod
+    def entries(self) -> Iterator[NormalisedEntry]:
+        pass
+
+    def project(self, fields: Optional[Fields]) -> Iterator[NormalisedEntry]:
+        # Entries holding only the given fields, e.g. ("raw",) or ("norm.id", "norm.title_tokens").
+        for entry in self.entries():
+            yield project_entry(entry, fields)
+
+    def ids(self) -> list[str]:
+        return [str(entry.get("norm", {}).get("id", "")) for entry in self.project(("norm.id",))]
+
+    @abstractmethod
+    def save(self, entries: Iterable[Mapping[str, Any]]) -> None:
+        pass
+
+    @abstractmethod
+    def append(self, entries: Iterable[Mapping[str, Any]]) -> None:
+        pass
+
+    @staticmethod
+    def _as_dict(entry: Mapping[str, Any]) -> NormalisedEntry:
+        # EntryStore views are mappings, not dicts; the JSON encoder only accepts the latter.
+        return entry if isinstance(entry, dict) else {"raw": dict(entry["raw"]), "norm": dict(entry["norm"])}
+
+
+class JsonStorage(DatabaseStorage):
+    # The original {"entries": [...]} layout, indented. Writing any entry rewrites the whole file; projections
+    # are read through the offset index of DatabaseReader instead of decoding it all.
+    def entries(self) -> Iterator[NormalisedEntry]:
+        with open(self.path, "r", encoding="utf-8") as papers_file:
+            yield from load(papers_file).get("entries", [])
+
+    def project(self, fields: Optional[Fields]) -> Iterator[NormalisedEntry]:
+        with DatabaseReader(self.path) as reader:
+            yield from reader.entries(fields)
+
+    def ids(self) -> list[str]:
+        with DatabaseReader(self.path) as reader:
+            return reader.ids()
+
+    def save(self, entries: Iterable[Mapping[str, Any]]) -> None:
+        papers_data: dict[str, list[NormalisedEntry]] = {"entries": [self._as_dict(entry) for entry in entries]}
+
+        write_atomically(self.path, lambda papers_file: dump(papers_data, papers_file, indent=4, ensure_ascii=False))
+
+    def append(self, entries: Iterable[Mapping[str, Any]]) -> None:
+        self.save([*(self.entries() if self.exists() else []), *entries])
+
+
+class JsonLinesStorage(DatabaseStorage):
+    # One compact entry per line: entries are read one at a time and appended without rewriting the file.
+    def entries(self) -> Iterator[NormalisedEntry]:
+        with open(self.path, "rb") as papers_file:
+            for line in papers_file:
+                if not line.strip():
+                    continue
+                elif line.endswith(b"\n"):
+                    yield loads(line)
+                else:
+                    # A last line without its newline that does not parse is an append that never completed.
+                    try:
+                        entry: NormalisedEntry = loads(line)
+                    except ValueError:
+                        return
+
+                    yield entry
+
+    def project(self, fields: Optional[Fields]) -> Iterator[NormalisedEntry]:
+        with DatabaseReader(self.path) as reader:
+            yield from reader.entries(fields)
+
+    def ids(self) -> list[str]:
+        with DatabaseReader(self.path) as reader:
+            return reader.ids()
+
+    def save(self, entries: Iterable[Mapping[str, Any]]) -> None:
+        write_atomically(self.path, lambda papers_file: papers_file.writelines(self.__line(entry) for entry in entries))
+
+    def append(self, entries: Iterable[Mapping[str, Any]]) -> None:
+        # Callers hold the database lock, as JournaledStorage does, so no other writer is mid-line.
+        with open(self.path, "a+b") as papers_file:
+            self.__repair_last_line(papers_file)
+            papers_file.writelines(self.__line(entry).encode("utf-8") for entry in entries)
+            papers_file.flush()
+            os.fsync(papers_file.fileno())
+
+    @staticmethod
+    def __repair_last_line(papers_file: BinaryIO) -> None:
+        # A last line without its newline is either a whole entry, as a hand edit leaves it, which only
+        # needs the newline, or an append that never completed, which is cut off like the journal's.
+        end: int = papers_file.seek(0, os.SEEK_END)
+        start: int = end
+
+        while start > 0:
+            size: int = min(start, 65536)
+            papers_file.seek(start - size)
+            newline: int = papers_file.read(size).rfind(b"\n")
+
+            if newline != -1:
+                start = start - size + newline + 1
+
+                break
+
+            start -= size
+
+        if start == end:
+            return
+
+        papers_file.seek(start)
+        last_line: bytes = papers_file.read()
+
+        try:
+            loads(last_line)
+        except ValueError:
+            papers_file.truncate(start)
+        else:
+            papers_file.write(b"\n")
+
+    def __line(self, entry: Mapping[str, Any]) -> str:
+        return dumps(self._as_dict(entry), ensure_ascii=False, separators=(",", ":")) + "\n"
+
+
+class SQLiteStorage(DatabaseStorage):
+    # Entries are stored as compact JSON rows in insertion order and streamed from a cursor.
+    def entries(self) -> Iterator[NormalisedEntry]:
+        if not self.exists():
+            raise FileNotFoundError(f"The database {self.path} does not exist.")
+
+        connection: sqlite3.Connection = self.__connect()
+
+        try:
+            for (entry,) in connection.execute("SELECT entry FROM entries ORDER BY position"):
+                yield loads(entry)
+        finally:
+            connection.close()
+
+    def save(self, entries: Iterable[Mapping[str, Any]]) -> None:
+        connection: sqlite3.Connection = self.__connect()
+
+        try:
+            with connection:
+                connection.execute("DELETE FROM entries")
+                connection.executemany("INSERT INTO entries (entry) VALUES (?)", ((self.__row(entry),) for entry in entries))
+        finally:
+            connection.close()
+
+    def append(self, entries: Iterable[Mapping[str, Any]]) -> None:
+        connection: sqlite3.Connection = self.__connect()
+
+        try:
+            with connection:
+                connection.executemany("INSERT INTO entries (entry) VALUES (?)", ((self.__row(entry),) for entry in entries))
+        finally:
+            connection.close()
+
+    def __connect(self) -> sqlite3.Connection:
+        connection: sqlite3.Connection = sqlite3.connect(self.path)
+
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("CREATE TABLE IF NOT EXISTS entries (position INTEGER PRIMARY KEY AUTOINCREMENT, entry TEXT NOT NULL)")
+
+        return connection
+
+    def __row(self, entry: Mapping[str, Any]) -> str:
+        return dumps(self._as_dict(entry), ensure_ascii=False, separators=(",", ":"))
+
+
+STORAGE_FORMATS: dict[str, type[DatabaseStorage]] = {
+    ".json": JsonStorage,
+    ".jsonl": JsonLinesStorage,
+    ".sqlite": SQLiteStorage,
+    ".sqlite3": SQLiteStorage,
+    ".db": SQLiteStorage,
+}
+
+
+def open_storage(path: str) -> DatabaseStorage:
+    extension: str = os.path.splitext(path)[1].lower()
+
+    if extension not in STORAGE_FORMATS:
+        raise ValueError(f"Unknown database format {extension!r} for {path}; expected one of {", ".join(STORAGE_FORMATS)}.")
+
+    return STORAGE_FORMATS[extension](path)
+
+
+if __name__ == "__main__":
+    argument_parser: ArgumentParser = ArgumentParser(description="Convert the master paper database between storage formats, chosen by file extension.")
+    argument_parser.add_argument("source", help="database to read, e.g. papers.json")
+    argument_parser.add_argument("destination", help="database to write, e.g. papers.jsonl or papers.sqlite3")
+
+    arguments: Namespace = argument_parser.parse_args()
+    source: DatabaseStorage = open_storage(arguments.source)
+    destination: DatabaseStorage = open_storage(arguments.destination)
+
+    if not source.exists():
+        raise FileNotFoundError(f"The database {arguments.source} does not exist.")
+    elif os.path.isfile(f"{arguments.source}.journal"):
+        raise ValueError(f"The database {arguments.source} has journaled entries; run database_journal.py to compact them first.")
+
+    destination.save(source.entries())
+
+    print(f"Converted {arguments.source} to {arguments.destination}.")
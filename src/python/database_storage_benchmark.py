@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+
+from argparse import ArgumentParser, Namespace
+from copy import deepcopy
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+from database_storage import DatabaseStorage, JsonStorage, open_storage, STORAGE_FORMATS
+from normaliser import NormalisedEntry
+
+import os
+
+
+class DatabaseStorageBenchmark():
+    def __init__(self, papers_json: str, sizes: list[int], extensions: list[str]) -> None:
+        self.__papers_json: str = papers_json
+        self.__sizes: list[int] = sizes
+        self.__extensions: list[str] = extensions
+
+    def run(self) -> None:
+        entries: list[NormalisedEntry] = JsonStorage(self.__papers_json).load()
+
+        print("format\tentries\tsize (bytes)\tsave (s)\tload (s)\tfirst entry (s)\tappend one (s)")
+
+        for size in self.__sizes:
+            catalogue: list[NormalisedEntry] = self.__catalogue(entries, size)
+
+            with TemporaryDirectory() as directory:
+                for extension in self.__extensions:
+                    self.__measure(open_storage(os.path.join(directory, f"papers{extension}")), catalogue)
+
+    def __catalogue(self, entries: list[NormalisedEntry], size: int) -> list[NormalisedEntry]:
+        catalogue: list[NormalisedEntry] = []
+
+        for i in range(size):
+            entry: NormalisedEntry = deepcopy(entries[i % len(entries)])
+            entry["raw"]["id"] = entry["norm"]["id"] = f"{entry["norm"]["id"]}-{i}"
+
+            catalogue.append(entry)
+
+        return catalogue
+
+    def __measure(self, storage: DatabaseStorage, catalogue: list[NormalisedEntry]) -> None:
+        start: float = perf_counter()
+        storage.save(catalogue)
+        save: float = perf_counter() - start
+
+        start = perf_counter()
+        loaded: list[NormalisedEntry] = storage.load()
+        load: float = perf_counter() - start
+
+        start = perf_counter()
+        next(storage.entries())
+        first: float = perf_counter() - start
+
+        start = perf_counter()
+        storage.append(catalogue[:1])
+        append: float = perf_counter() - start
+
+        if loaded != catalogue:
+            raise RuntimeError(f"{type(storage).__name__} does not round-trip {len(catalogue)} entries.")
+
+        print(f"{os.path.splitext(storage.path)[1]}\t{len(catalogue)}\t{os.path.getsize(storage.path)}\t{save:.3f}\t{load:.3f}\t{first:.4f}\t{append:.4f}")
+
+
+if __name__ == "__main__":
+    argument_parser: ArgumentParser = ArgumentParser(description="Measure load, save and append times of the master database storage formats.")
+    argument_parser.add_argument("--papers-json", default="papers.json", help="entries repeated to build the synthetic catalogues")
+    argument_parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    argument_parser.add_argument("--formats", nargs="+", default=[".json", ".jsonl", ".sqlite3"], choices=list(STORAGE_FORMATS))
+
+    arguments: Namespace = argument_parser.parse_args()
+    benchmark: DatabaseStorageBenchmark = DatabaseStorageBenchmark(papers_json=arguments.papers_json, sizes=arguments.sizes, extensions=arguments.formats)
+
+    benchmark.run()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+
+from argparse import ArgumentParser, Namespace
+from json import load
+from time import perf_counter
+
+from duplicate_checker import DuplicateChecker
+from normaliser import NormalisedEntry
+
+
+class DuplicateAudit():
+    def __init__(self, papers_json: str, threshold: float, verify: bool) -> None:
+        self.__papers_json: str = papers_json
+        self.__threshold: float = threshold
+        self.__verify: bool = verify
+
+    def run(self) -> None:
+        with open(self.__papers_json, "r", encoding="utf-8") as papers_file:
+            entries: list[NormalisedEntry] = load(papers_file)["entries"]
+
+        start: float = perf_counter()
+        pairs: list[tuple[int, int, float]] = DuplicateChecker.duplicate_pairs(entries, threshold=self.__threshold)
+        elapsed: float = perf_counter() - start
+
+        for i, j, score in pairs:
+            print(f"{score:.4f}\t{entries[i]["norm"]["id"]}\t{entries[j]["norm"]["id"]}")
+
+        print(f"{len(pairs)} pairs scoring at least {self.__threshold} among {len(entries)} entries ({elapsed:.3f}s).")
+
+        if self.__verify:
+            self.__verify_against_scalar_scores(entries, pairs)
+
+    def __verify_against_scalar_scores(self, entries: list[NormalisedEntry], pairs: list[tuple[int, int, float]]) -> None:
+        expected: list[tuple[int, int, float]] = []
+
+        for i in range(len(entries)):
+            for j in range(i + 1, len(entries)):
+                score: float = DuplicateChecker.score(entries[i], entries[j])
+
+                if score >= self.__threshold:
+                    expected.append((i, j, score))
+
+        if expected != pairs:
+            raise RuntimeError(f"Batch scoring returned {len(pairs)} pairs but the scalar scores give {len(expected)}.")
+
+        print("Batch scores match the scalar scores exactly.")
+
+
+if __name__ == "__main__":
+    argument_parser: ArgumentParser = ArgumentParser(description="List all pairs of entries whose duplicate score reaches a threshold.")
+    argument_parser.add_argument("--papers-json", default="papers.json")
+    argument_parser.add_argument("--threshold", type=float, default=DuplicateChecker.DUPLICATE_THRESHOLD)
+    argument_parser.add_argument("--verify", action="store_true", help="also compare against the scalar score of every pair")
+
+    arguments: Namespace = argument_parser.parse_args()
+    audit: DuplicateAudit = DuplicateAudit(papers_json=arguments.papers_json, threshold=arguments.threshold, verify=arguments.verify)
+
+    audit.run()
@@ -1,27 +1,40 @@
-from typing import Optional, Any
+from typing import Optional, Any, Iterable
 
+from duplicate_index import DuplicateIndex
+from entry_identifiers import EntryIdentifiers, IdentifierExtractor
 from normaliser import NormalisedEntry
+from pipeline_metrics import METRICS
+from sparse_scoring import SparseBinaryMatrix
 
 
 class DuplicateChecker():
     DUPLICATE_THRESHOLD: float = 0.75
+    TITLE_WEIGHT: float = 0.60
+    AUTHORS_WEIGHT: float = 0.30
+    YEAR_WEIGHT: float = 0.10
+    # What the checks, the duplicate index and the search index read of the existing entries.
+    FIELDS: tuple[str, ...] = ("norm", "raw.title", "raw.journal", "raw.booktitle", "raw.venue")
 
     @staticmethod
-    def __jaccard(a: list[str], b: list[str]) -> float:
-        if not a or not b:
+    def __as_set(values: Iterable[str]) -> frozenset[str] | set[str]:
+        return values if isinstance(values, (set, frozenset)) else set(values)
+
+    @staticmethod
+    def __jaccard(a: Iterable[str], b: Iterable[str]) -> float:
+        a_set, b_set = DuplicateChecker.__as_set(a), DuplicateChecker.__as_set(b)
+
+        if not a_set or not b_set:
             return 0.0
         else:
-            a_set, b_set = set(a), set(b)
-
             return len(a_set & b_set) / len(a_set | b_set)
 
     @staticmethod
-    def __author_match(a_new: list[str], a_old: list[str]) -> float:
+    def __author_match(a_new: Iterable[str], a_old: Iterable[str]) -> float:
         # Both are lists of normalized names
-        if not a_new or not a_old:
-            return 0.0
+        a_new_set, a_old_set = DuplicateChecker.__as_set(a_new), DuplicateChecker.__as_set(a_old)
 
-        a_new_set, a_old_set = set(a_new), set(a_old)
+        if not a_new_set or not a_old_set:
+            return 0.0
 
         # Full-set containment → strong signal
         if a_new_set.issubset(a_old_set) or a_old_set.issubset(a_new_set):
@@ -37,22 +50,175 @@ class DuplicateChecker():
         else:
             return 1.0 if y_new == y_old else 0.0
 
+    @staticmethod
+    def __weighted_score(score_title: float, score_authors: float, score_year: float) -> float:
+        return DuplicateChecker.TITLE_WEIGHT * score_title + DuplicateChecker.AUTHORS_WEIGHT * score_authors + DuplicateChecker.YEAR_WEIGHT * score_year
 
     @staticmethod
     def __duplicate_score(n_new: dict[str, Any], n_old: dict[str, Any]) -> float:
         score_title = DuplicateChecker.__jaccard(n_new["title_tokens"], n_old["title_tokens"])
-        score_authors = DuplicateChecker.__author_match(n_new["authors"], n_old["authors"])
+        score_authors = DuplicateChecker.__author_match(IdentifierExtractor.author_names(n_new), IdentifierExtractor.author_names(n_old))
         score_year = DuplicateChecker.__year_match(n_new["year"], n_old["year"])
 
         # Weighted sum
-        return 0.60 * score_title + 0.30 * score_authors + 0.10 * score_year
+        return DuplicateChecker.__weighted_score(score_title, score_authors, score_year)
+
+    @staticmethod
+    def score(normalised_entry: NormalisedEntry, existing_entry: NormalisedEntry) -> float:
+        return DuplicateChecker.__duplicate_score(normalised_entry["norm"], existing_entry["norm"])
 
     @staticmethod
-    def is_duplicate(normalised_entry: NormalisedEntry, normalised_entries: list[NormalisedEntry]) -> bool:
-        for existing_entry in normalised_entries:
+    def is_duplicate(normalised_entry: NormalisedEntry, normalised_entries: list[NormalisedEntry], duplicate_index: Optional[DuplicateIndex] = None) -> bool:
+        return DuplicateChecker.find_duplicate(normalised_entry, normalised_entries, duplicate_index) is not None
+
+    @staticmethod
+    def find_duplicate(normalised_entry: NormalisedEntry, normalised_entries: list[NormalisedEntry], duplicate_index: Optional[DuplicateIndex] = None) -> Optional[int]:
+        if duplicate_index is not None:
+            return DuplicateChecker.__find_indexed_duplicate(normalised_entry, normalised_entries, duplicate_index)
+
+        identifiers: EntryIdentifiers = IdentifierExtractor.extract(normalised_entry)
+        existing_identifiers: list[EntryIdentifiers] = [IdentifierExtractor.extract(existing_entry) for existing_entry in normalised_entries]
+
+        METRICS.count("duplicate_check", "checks")
+
+        # As with the index, an entry sharing a DOI, arXiv id or citation key is reported before any
+        # fuzzy match, even one earlier in the list, so both paths name the same entry.
+        for position, other_identifiers in enumerate(existing_identifiers):
+            if IdentifierExtractor.same_work(identifiers, other_identifiers):
+                METRICS.count("duplicate_check", "identity_matches")
+
+                return position
+
+        for position, existing_entry in enumerate(normalised_entries):
+            if IdentifierExtractor.distinct_works(identifiers, existing_identifiers[position]):
+                continue
+
             score: float = DuplicateChecker.__duplicate_score(normalised_entry["norm"], existing_entry["norm"])
 
             if score >= DuplicateChecker.DUPLICATE_THRESHOLD:
-                return True
+                METRICS.count("duplicate_check", "comparisons", position + 1)
+
+                return position
+
+        METRICS.count("duplicate_check", "comparisons", len(normalised_entries))
+
+        return None
+
+    @staticmethod
+    def __find_indexed_duplicate(normalised_entry: NormalisedEntry, normalised_entries: list[NormalisedEntry], duplicate_index: DuplicateIndex) -> Optional[int]:
+        if len(duplicate_index) != len(normalised_entries):
+            raise ValueError(f"The duplicate index covers {len(duplicate_index)} entries but {len(normalised_entries)} were given.")
+
+        identifiers: EntryIdentifiers = IdentifierExtractor.extract(normalised_entry)
+
+        # A shared DOI, arXiv id or citation key settles the question without any fuzzy scoring, unless
+        # conflicting identifiers mark a different work, and the first entry sharing one is reported ahead of any fuzzy match.
+        identity_matches: list[int] = [
+            position for position in duplicate_index.identity_matches(identifiers)
+            if not IdentifierExtractor.distinct_works(identifiers, duplicate_index.identifiers(position))
+        ]
 
-        return False
+        METRICS.count("duplicate_check", "checks")
+
+        if identity_matches:
+            METRICS.count("duplicate_check", "identity_matches")
+
+            return identity_matches[0]
+
+        norm: dict[str, Any] = normalised_entry["norm"]
+        title_set: frozenset[str] = frozenset(norm["title_tokens"])
+        author_set: frozenset[str] = frozenset(IdentifierExtractor.author_names(norm))
+        needs_title, needs_authors, needs_either = DuplicateChecker.__required_overlaps(DuplicateChecker.DUPLICATE_THRESHOLD)
+        candidates: dict[int, int] = duplicate_index.candidates(title_set, author_set, needs_title=needs_title, needs_authors=needs_authors, needs_either=needs_either)
+        comparisons: int = 0
+
+        METRICS.count("duplicate_check", "candidates", len(candidates))
+
+        for position, shared in candidates.items():
+            score_year: float = DuplicateChecker.__year_match(norm["year"], duplicate_index.year(position))
+            # Exact title Jaccard from the shared-token count, with the best possible author score.
+            title_bound: float = DuplicateChecker.__jaccard_from_counts(shared, len(title_set), len(duplicate_index.title_set(position)))
+            upper_bound: float = DuplicateChecker.__weighted_score(title_bound, 1.0, score_year)
+
+            if upper_bound < DuplicateChecker.DUPLICATE_THRESHOLD:
+                continue
+            elif IdentifierExtractor.distinct_works(identifiers, duplicate_index.identifiers(position)):
+                continue
+
+            score_title: float = DuplicateChecker.__jaccard(title_set, duplicate_index.title_set(position))
+            score_authors: float = DuplicateChecker.__author_match(author_set, duplicate_index.author_set(position))
+            comparisons += 1
+
+            if DuplicateChecker.__weighted_score(score_title, score_authors, score_year) >= DuplicateChecker.DUPLICATE_THRESHOLD:
+                METRICS.count("duplicate_check", "comparisons", comparisons)
+
+                return position
+
+        METRICS.count("duplicate_check", "comparisons", comparisons)
+
+        return None
+
+    @staticmethod
+    def duplicate_pairs(normalised_entries: list[NormalisedEntry], threshold: Optional[float] = None) -> list[tuple[int, int, float]]:
+        minimum_score: float = DuplicateChecker.DUPLICATE_THRESHOLD if threshold is None else threshold
+        titles: SparseBinaryMatrix = SparseBinaryMatrix(entry["norm"]["title_tokens"] for entry in normalised_entries)
+        authors: SparseBinaryMatrix = SparseBinaryMatrix(IdentifierExtractor.author_names(entry["norm"]) for entry in normalised_entries)
+        years: list[Optional[int]] = [entry["norm"]["year"] for entry in normalised_entries]
+
+        needs_title, needs_authors, needs_either = DuplicateChecker.__required_overlaps(minimum_score)
+        pairs: list[tuple[int, int, float]] = []
+
+        for i in range(len(normalised_entries)):
+            shared_titles: dict[int, int]
+            shared_authors: dict[int, int]
+
+            if needs_authors:
+                shared_authors = authors.upper_products(i)
+                shared_titles = {j: titles.product(i, j) for j in shared_authors}
+            elif needs_title:
+                shared_titles = titles.upper_products(i)
+                shared_authors = {j: authors.product(i, j) for j in shared_titles}
+            elif needs_either:
+                shared_titles = titles.upper_products(i)
+                shared_authors = authors.upper_products(i)
+            else:
+                shared_titles = {j: titles.product(i, j) for j in range(i + 1, len(normalised_entries))}
+                shared_authors = {j: authors.product(i, j) for j in shared_titles}
+
+            for j in sorted(shared_titles.keys() | shared_authors.keys()):
+                score: float = DuplicateChecker.__weighted_score(
+                    DuplicateChecker.__jaccard_from_counts(shared_titles.get(j, 0), titles.row_size(i), titles.row_size(j)),
+                    DuplicateChecker.__author_match_from_counts(shared_authors.get(j, 0), authors.row_size(i), authors.row_size(j)),
+                    DuplicateChecker.__year_match(years[i], years[j]),
+                )
+
+                if score >= minimum_score:
+                    pairs.append((i, j, score))
+
+        return pairs
+
+    @staticmethod
+    def __required_overlaps(minimum_score: float) -> tuple[bool, bool, bool]:
+        # Whether pairs sharing no title tokens, no authors, or neither fall short of the score even
+        # when everything else matches.
+        return (
+            DuplicateChecker.__weighted_score(0.0, 1.0, 1.0) < minimum_score,
+            DuplicateChecker.__weighted_score(1.0, 0.0, 1.0) < minimum_score,
+            DuplicateChecker.__weighted_score(0.0, 0.0, 1.0) < minimum_score,
+        )
+
+    @staticmethod
+    def __jaccard_from_counts(shared: int, a_size: int, b_size: int) -> float:
+        if not a_size or not b_size:
+            return 0.0
+        else:
+            return shared / (a_size + b_size - shared)
+
+    @staticmethod
+    def __author_match_from_counts(shared: int, a_new_size: int, a_old_size: int) -> float:
+        if not a_new_size or not a_old_size:
+            return 0.0
+        elif shared == min(a_new_size, a_old_size):
+            return 1.0
+        else:
+            return shared / max(a_new_size, a_old_size)
@@ -0,0 +1,368 @@
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from math import ceil
+from typing import Any, Iterable, Mapping, Optional
+from unicodedata import normalize as ud_normalise, combining as ud_combining
+
+from duplicate_checker import DuplicateChecker
+from entry_identifiers import EntryIdentifiers, IdentifierExtractor
+from normaliser import NormalisedEntry, Normaliser
+from pipeline_metrics import METRICS
+
+
+class DuplicateScorer(ABC):
+    # One similarity in [0, 1] between two entries, computed from features extracted once per entry.
+    # A scorer with blocking keys scores 0.0 for any pair sharing none of them, and bounds its score
+    # from the number of keys a pair shares; a scorer without keys bounds it from the features alone.
+    name: str = ""
+
+    @abstractmethod
+    def features(self, normalised_entry: NormalisedEntry) -> Any:
+        pass
+
+    @abstractmethod
+    def score(self, a: Any, b: Any) -> float:
+        pass
+
+    def keys(self, features: Any) -> Iterable[str]:
+        return ()
+
+    def bound(self, a: Any, b: Any, shared: int) -> float:
+        return 1.0
+
+    def minimum_shared(self, keys: frozenset[str], score: float) -> int:
+        # Fewest keys an entry with these keys must share with another for this scorer to reach the score.
+        return 1
+
+
+class TitleTokenScorer(DuplicateScorer):
+    # Jaccard similarity of the title token sets: exact from the shared-token count.
+    name: str = "title"
+
+    def features(self, normalised_entry: NormalisedEntry) -> frozenset[str]:
+        return frozenset(normalised_entry["norm"].get("title_tokens") or ())
+
+    def score(self, a: frozenset[str], b: frozenset[str]) -> float:
+        return len(a & b) / len(a | b) if a and b else 0.0
+
+    def keys(self, features: frozenset[str]) -> Iterable[str]:
+        return features
+
+    def bound(self, a: frozenset[str], b: frozenset[str], shared: int) -> float:
+        return shared / (len(a) + len(b) - shared) if shared else 0.0
+
+    def minimum_shared(self, keys: frozenset[str], score: float) -> int:
+        # Jaccard is at most shared / len(keys), reached when the other title is a subset.
+        return max(1, ceil(score * len(keys) - 1e-9))
+
+
+class TitleNgramScorer(DuplicateScorer):
+    # Jaccard similarity of character trigrams of the normalised title, so "formalisation" and
+    # "formalization" or a split word still largely agree where whole tokens do not.
+    name: str = "title_ngrams"
+    N: int = 3
+
+    def features(self, normalised_entry: NormalisedEntry) -> frozenset[str]:
+        text: str = f" {" ".join(normalised_entry["norm"].get("title_tokens") or ())} "
+
+        return frozenset(text[i:i + self.N] for i in range(len(text) - self.N + 1)) if text.strip() else frozenset()
+
+    def score(self, a: frozenset[str], b: frozenset[str]) -> float:
+        return len(a & b) / len(a | b) if a and b else 0.0
+
+    def bound(self, a: frozenset[str], b: frozenset[str], shared: int) -> float:
+        # Common trigrams make poor blocking keys; the size ratio is the most Jaccard can reach.
+        return min(len(a), len(b)) / max(len(a), len(b)) if a and b else 0.0
+
+
+class AuthorScorer(DuplicateScorer):
+    # DuplicateChecker's author match: 1.0 when one author list contains the other, else the overlap.
+    name: str = "authors"
+
+    def features(self, normalised_entry: NormalisedEntry) -> frozenset[str]:
+        return frozenset(IdentifierExtractor.author_names(normalised_entry["norm"]))
+
+    def score(self, a: frozenset[str], b: frozenset[str]) -> float:
+        return self.bound(a, b, len(a & b))
+
+    def keys(self, features: frozenset[str]) -> Iterable[str]:
+        return features
+
+    def bound(self, a: frozenset[str], b: frozenset[str], shared: int) -> float:
+        if not shared or not a or not b:
+            return 0.0
+
+        return 1.0 if shared == min(len(a), len(b)) else shared / max(len(a), len(b))
+
+
+class AuthorInitialsScorer(AuthorScorer):
+    # The same match on surname and first initial ("garcia j"), so abbreviated given names still agree.
+    name: str = "author_initials"
+
+    def features(self, normalised_entry: NormalisedEntry) -> frozenset[str]:
+        # The normalised names have lost the comma that tells the surname apart, so the raw ones are read.
+        raw: Mapping[str, Any] = normalised_entry.get("raw") or {}
+        authors: Any = raw.get("author") or raw.get("authors")
+        names: list[str] = (authors.split(" and ") if isinstance(authors, str) else [str(name) for name in authors]) if authors else IdentifierExtractor.author_names(normalised_entry["norm"])
+
+        return frozenset(key for key in map(self.__key, names) if key)
+
+    @staticmethod
+    @lru_cache(maxsize=1 << 16)
+    def __key(name: str) -> str:
+        # "Surname, Given" (or "Surname, Jr, Given") and "Given Surname"; without a comma the last word is the surname.
+        parts: list[str] = [AuthorInitialsScorer.__plain(part) for part in name.split(",")]
+        words: list[str] = parts[0].split()
+
+        if len(parts) > 1:
+            surname, given = parts[0], parts[-1]
+        elif words:
+            surname, given = words[-1], " ".join(words[:-1])
+        else:
+            return ""
+
+        return f"{surname} {given[:1]}".strip()
+
+    @staticmethod
+    def __plain(text: str) -> str:
+        # The Normaliser's text rules: LaTeX, braces, case, accents and punctuation removed.
+        text = Normaliser.BRACES_PATTERN.sub("", Normaliser.LATEX_COMMAND_PATTERN.sub(r"\1", text)).lower()
+        text = "".join(ch for ch in ud_normalise("NFKD", text) if not ud_combining(ch))
+
+        return Normaliser.WHITESPACE_PATTERN.sub(" ", Normaliser.PUNCTUATION_PATTERN.sub("", text)).strip()
+
+
+class YearScorer(DuplicateScorer):
+    name: str = "year"
+
+    def features(self, normalised_entry: NormalisedEntry) -> Optional[int]:
+        return normalised_entry["norm"].get("year")
+
+    def score(self, a: Optional[int], b: Optional[int]) -> float:
+        return 1.0 if a is not None and a == b else 0.0
+
+    def bound(self, a: Optional[int], b: Optional[int], shared: int) -> float:
+        return self.score(a, b)
+
+
+SCORERS: dict[str, type[DuplicateScorer]] = {scorer.name: scorer for scorer in (TitleTokenScorer, TitleNgramScorer, AuthorScorer, AuthorInitialsScorer, YearScorer)}
+
+# Scorer weights of the named configurations; "default" is DuplicateChecker's.
+CONFIGURATIONS: dict[str, dict[str, float]] = {
+    "default": {"title": DuplicateChecker.TITLE_WEIGHT, "authors": DuplicateChecker.AUTHORS_WEIGHT, "year": DuplicateChecker.YEAR_WEIGHT},
+    "ngrams": {"title_ngrams": DuplicateChecker.TITLE_WEIGHT, "authors": DuplicateChecker.AUTHORS_WEIGHT, "year": DuplicateChecker.YEAR_WEIGHT},
+    "initials": {"title": DuplicateChecker.TITLE_WEIGHT, "author_initials": DuplicateChecker.AUTHORS_WEIGHT, "year": DuplicateChecker.YEAR_WEIGHT},
+    "ngrams_initials": {"title_ngrams": DuplicateChecker.TITLE_WEIGHT, "author_initials": DuplicateChecker.AUTHORS_WEIGHT, "year": DuplicateChecker.YEAR_WEIGHT},
+}
+
+
+def parse_weights(specification: str) -> dict[str, float]:
+    # "title=0.6,authors=0.3,year=0.1" or the name of a configuration.
+    if specification in CONFIGURATIONS:
+        return dict(CONFIGURATIONS[specification])
+
+    weights: dict[str, float] = {}
+
+    for part in specification.split(","):
+        name, separator, weight = part.partition("=")
+
+        if not separator or name.strip() not in SCORERS:
+            raise ValueError(f"Invalid scorer weight {part!r}; expected name=weight with a name among {", ".join(SCORERS)}.")
+
+        weights[name.strip()] = float(weight)
+
+    return weights
+
+
+class DuplicateMatch():
+    __slots__ = ("position", "entry_id", "score", "breakdown", "identifier")
+
+    def __init__(self, position: int, entry_id: str, score: float, breakdown: dict[str, float], identifier: Optional[str] = None) -> None:
+        self.position: int = position
+        self.entry_id: str = entry_id
+        self.score: float = score
+        # Unweighted score of each scorer; empty when a shared identifier settled the match.
+        self.breakdown: dict[str, float] = breakdown
+        self.identifier: Optional[str] = identifier
+
+    def __repr__(self) -> str:
+        return f"DuplicateMatch({self.entry_id!r}, score={self.score:.4f}, breakdown={self.breakdown}, identifier={self.identifier!r})"
+
+
+class DuplicateEngine():
+    # Finds the best-scoring earlier entry for a new one. Candidates are the entries sharing a blocking
+    # key with it; each is first given an upper bound from its shared-key counts and the scorers' cheap
+    # bounds, and only those whose bound reaches the threshold are scored exactly.
+    def __init__(self, weights: Mapping[str, float], threshold: float = DuplicateChecker.DUPLICATE_THRESHOLD, normalised_entries: Iterable[NormalisedEntry] = ()) -> None:
+        if not weights or any(weight < 0.0 for weight in weights.values()):
+            raise ValueError("Duplicate scoring needs at least one scorer, with non-negative weights.")
+        elif unknown := [name for name in weights if name not in SCORERS]:
+            raise ValueError(f"Unknown scorers {", ".join(unknown)}; expected some of {", ".join(SCORERS)}.")
+
+        self.__scorers: list[DuplicateScorer] = [SCORERS[name]() for name in weights]
+        self.__weights: list[float] = [float(weight) for weight in weights.values()]
+        self.__threshold: float = threshold
+        self.__keyed: list[int] = [i for i, scorer in enumerate(self.__scorers) if type(scorer).keys is not DuplicateScorer.keys]
+        # Without blocking keys a pair can still reach this much, so when it meets the threshold every entry is a candidate.
+        self.__scan_all: bool = sum(weight for i, weight in enumerate(self.__weights) if i not in self.__keyed) >= threshold
+        # Scorers whose weight a pair cannot do without: a candidate must share at least one of their keys.
+        self.__required: list[int] = [i for i in self.__keyed if sum(self.__weights) - self.__weights[i] < threshold]
+        self.__postings: list[dict[str, list[int]]] = [{} for _ in self.__scorers]
+        self.__keys: list[list[frozenset[str]]] = []
+        self.__identity_postings: dict[tuple[str, str], list[int]] = {}
+        self.__features: list[list[Any]] = []
+        self.__identifiers: list[EntryIdentifiers] = []
+        self.__ids: list[str] = []
+        self.__comparisons: int = 0
+        self.__pruned: int = 0
+
+        for normalised_entry in normalised_entries:
+            self.add(normalised_entry)
+
+    def __len__(self) -> int:
+        return len(self.__ids)
+
+    @property
+    def threshold(self) -> float:
+        return self.__threshold
+
+    @property
+    def comparisons(self) -> int:
+        # Pairs scored exactly over all checks so far; candidates dropped by their upper bound are counted in pruned.
+        return self.__comparisons
+
+    @property
+    def pruned(self) -> int:
+        # Candidates dropped by their upper bound, without being scored, over all checks so far.
+        return self.__pruned
+
+    @property
+    def weights(self) -> dict[str, float]:
+        return {scorer.name: weight for scorer, weight in zip(self.__scorers, self.__weights)}
+
+    def add(self, normalised_entry: NormalisedEntry) -> int:
+        position: int = len(self.__ids)
+        features: list[Any] = [scorer.features(normalised_entry) for scorer in self.__scorers]
+        identifiers: EntryIdentifiers = IdentifierExtractor.extract(normalised_entry)
+
+        keys: list[frozenset[str]] = [frozenset(scorer.keys(features[i])) for i, scorer in enumerate(self.__scorers)]
+
+        for i in self.__keyed:
+            for key in keys[i]:
+                self.__postings[i].setdefault(key, []).append(position)
+
+        for kind, value in identifiers.items():
+            if value is not None:
+                self.__identity_postings.setdefault((kind, value), []).append(position)
+
+        self.__features.append(features)
+        self.__keys.append(keys)
+        self.__identifiers.append(identifiers)
+        self.__ids.append(str(normalised_entry["norm"].get("id", "")))
+
+        return position
+
+    def score(self, normalised_entry: NormalisedEntry, existing_entry: NormalisedEntry) -> DuplicateMatch:
+        # The full breakdown of one pair, without identifiers or pruning.
+        a: list[Any] = [scorer.features(normalised_entry) for scorer in self.__scorers]
+        b: list[Any] = [scorer.features(existing_entry) for scorer in self.__scorers]
+        breakdown: dict[str, float] = {scorer.name: scorer.score(a[i], b[i]) for i, scorer in enumerate(self.__scorers)}
+
+        return DuplicateMatch(-1, str(existing_entry["norm"].get("id", "")), self.__weighted(breakdown), breakdown)
+
+    def best_match(self, normalised_entry: NormalisedEntry) -> Optional[DuplicateMatch]:
+        identifiers: EntryIdentifiers = IdentifierExtractor.extract(normalised_entry)
+
+        METRICS.count("duplicate_engine", "checks")
+
+        # A shared DOI, arXiv id or citation key settles the question without any fuzzy scoring, unless
+        # conflicting arXiv ids or publisher DOIs mark a different work.
+        for kind, value in identifiers.items():
+            for position in self.__identity_postings.get((kind, value), []) if value is not None else []:
+                if not IdentifierExtractor.distinct_works(identifiers, self.__identifiers[position]):
+                    METRICS.count("duplicate_engine", "identity_matches")
+
+                    return DuplicateMatch(position, self.__ids[position], 1.0, {}, identifier=kind)
+
+        features: list[Any] = [scorer.features(normalised_entry) for scorer in self.__scorers]
+        shared: dict[int, list[int]] = self.__shared_keys(features)
+        candidates: Iterable[int] = range(len(self.__ids)) if self.__scan_all else sorted(shared)
+        no_keys: list[int] = [0] * len(self.__scorers)
+        best: Optional[DuplicateMatch] = None
+        comparisons: int = 0
+        pruned: int = 0
+
+        for position in candidates:
+            existing: list[Any] = self.__features[position]
+            counts: list[int] = shared.get(position, no_keys)
+            bound: float = sum(weight * scorer.bound(features[i], existing[i], counts[i]) for i, (scorer, weight) in enumerate(zip(self.__scorers, self.__weights)))
+
+            if bound < self.__threshold or (best is not None and bound <= best.score):
+                pruned += 1
+
+                continue
+            elif IdentifierExtractor.distinct_works(identifiers, self.__identifiers[position]):
+                continue
+
+            breakdown: dict[str, float] = {scorer.name: scorer.score(features[i], existing[i]) for i, scorer in enumerate(self.__scorers)}
+            score: float = self.__weighted(breakdown)
+            comparisons += 1
+
+            if score >= self.__threshold and (best is None or score > best.score):
+                best = DuplicateMatch(position, self.__ids[position], score, breakdown)
+
+        self.__comparisons += comparisons
+        self.__pruned += pruned
+        METRICS.count("duplicate_engine", "candidates", len(shared))
+        METRICS.count("duplicate_engine", "pruned", pruned)
+        METRICS.count("duplicate_engine", "comparisons", comparisons)
+
+        return best
+
+    def __shared_keys(self, features: list[Any]) -> dict[int, list[int]]:
+        # Position -> number of blocking keys shared with each scorer.
+        keys: list[frozenset[str]] = [frozenset(scorer.keys(features[i])) for i, scorer in enumerate(self.__scorers)]
+        shared: dict[int, list[int]] = {}
+
+        if not self.__required:
+            for i in self.__keyed:
+                for key in keys[i]:
+                    for position in self.__postings[i].get(key, ()):
+                        counts: Optional[list[int]] = shared.get(position)
+
+                        if counts is None:
+                            counts = shared[position] = [0] * len(self.__scorers)
+
+                        counts[i] += 1
+
+            return shared
+
+        # Prefix filtering: a pair reaching the threshold shares at least m keys of each required scorer, so it
+        # shares one of any len(keys) - m + 1 of them. Only the rarest such keys of the cheapest scorer are walked.
+        probes: list[tuple[int, list[str]]] = []
+
+        for i in self.__required:
+            needed: float = (self.__threshold - (sum(self.__weights) - self.__weights[i])) / self.__weights[i]
+            minimum: int = self.__scorers[i].minimum_shared(keys[i], needed)
+
+            if minimum > len(keys[i]):
+                return {}
+
+            probes.append((i, sorted(keys[i], key=lambda key: len(self.__postings[i].get(key, ())))[:len(keys[i]) - minimum + 1]))
+
+        driver, probe = min(probes, key=lambda item: sum(len(self.__postings[item[0]].get(key, ())) for key in item[1]))
+        candidates: set[int] = set()
+
+        for key in probe:
+            candidates.update(self.__postings[driver].get(key, ()))
+
+        for position in candidates:
+            counts = [len(keys[i] & self.__keys[position][i]) if i in self.__keyed else 0 for i in range(len(self.__scorers))]
+
+            if all(counts[i] for i in self.__required):
+                shared[position] = counts
+
+        return shared
+
+    def __weighted(self, breakdown: dict[str, float]) -> float:
+        return sum(weight * breakdown[scorer.name] for scorer, weight in zip(self.__scorers, self.__weights))
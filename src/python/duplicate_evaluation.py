@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+
+from argparse import ArgumentParser, Namespace
+from json import dump, load, loads
+from time import perf_counter
+from typing import Any, Mapping, Optional
+
+from duplicate_checker import DuplicateChecker
+from duplicate_engine import CONFIGURATIONS, DuplicateEngine, DuplicateMatch, parse_weights
+from normaliser import NormalisedEntry
+from synthetic_corpus import SyntheticCorpus
+
+
+class DuplicateEvaluation():
+    # Replays an import of labelled entries: each entry is checked against all earlier ones and then added,
+    # as bibtex_loader.py does. An entry is a known duplicate when an earlier entry belongs to the same work,
+    # and its match is correct when the matched entry does.
+    def __init__(self, entries: list[NormalisedEntry], works: list[int]) -> None:
+        if len(entries) != len(works):
+            raise ValueError(f"{len(works)} labels were given for {len(entries)} entries.")
+
+        self.__entries: list[NormalisedEntry] = entries
+        self.__works: list[int] = works
+
+    @staticmethod
+    def from_pairs(entries: list[NormalisedEntry], pairs: list[tuple[str, str]]) -> "DuplicateEvaluation":
+        # Entries linked by labelled duplicate pairs, directly or through others, are one work.
+        positions: dict[str, int] = {}
+
+        for position, entry in enumerate(entries):
+            positions.setdefault(str(entry["norm"]["id"]), position)
+
+        works: list[int] = list(range(len(entries)))
+
+        def find(position: int) -> int:
+            while works[position] != position:
+                works[position] = works[works[position]]
+                position = works[position]
+
+            return position
+
+        for a, b in pairs:
+            if a not in positions or b not in positions:
+                raise ValueError(f"The labelled pair ({a}, {b}) names a paper that is not in the database.")
+
+            works[find(positions[a])] = find(positions[b])
+
+        return DuplicateEvaluation(entries, [find(position) for position in range(len(entries))])
+
+    def evaluate(self, weights: Mapping[str, float], threshold: float) -> dict[str, Any]:
+        engine: DuplicateEngine = DuplicateEngine(weights, threshold=threshold)
+        seen: set[int] = set()
+        true_positives: int = 0
+        false_positives: int = 0
+        known_duplicates: int = 0
+        start: float = perf_counter()
+
+        for position, entry in enumerate(self.__entries):
+            match: Optional[DuplicateMatch] = engine.best_match(entry)
+            work: int = self.__works[position]
+
+            if work in seen:
+                known_duplicates += 1
+
+            if match is not None and self.__works[match.position] == work:
+                true_positives += 1
+            elif match is not None:
+                false_positives += 1
+
+            engine.add(entry)
+            seen.add(work)
+
+        elapsed: float = perf_counter() - start
+        precision: float = true_positives / (true_positives + false_positives) if true_positives + false_positives else 1.0
+        recall: float = true_positives / known_duplicates if known_duplicates else 1.0
+
+        return {
+            "weights": engine.weights,
+            "threshold": threshold,
+            "entries": len(self.__entries),
+            "known_duplicates": known_duplicates,
+            "true_positives": true_positives,
+            "false_positives": false_positives,
+            "precision": precision,
+            "recall": recall,
+            "f1": 2 * precision * recall / (precision + recall) if precision + recall else 0.0,
+            "seconds": elapsed,
+            "checks_per_second": len(self.__entries) / elapsed if elapsed else 0.0,
+            "comparisons": engine.comparisons,
+            "comparisons_per_second": engine.comparisons / elapsed if elapsed else 0.0,
+            "pruned": engine.pruned,
+        }
+
+
+if __name__ == "__main__":
+    argument_parser: ArgumentParser = ArgumentParser(description="Precision, recall and speed of duplicate scoring configurations on labelled duplicates.")
+    argument_parser.add_argument("--papers-json", default=None, help="papers to replay, labelled by --pairs (default: a synthetic corpus)")
+    argument_parser.add_argument("--pairs", default=None, help="JSON Lines file of {\"a\": id, \"b\": id} pairs of papers that are duplicates")
+    argument_parser.add_argument("--size", type=int, default=5000, help="entries of the synthetic corpus")
+    argument_parser.add_argument("--duplicate-rate", type=float, default=0.05)
+    argument_parser.add_argument("--seed", type=int, default=0)
+    argument_parser.add_argument("--hard-rate", type=float, default=0.2, help="fraction of the synthetic near-copies disguised further, and of new entries resembling an earlier one")
+    argument_parser.add_argument("--configurations", nargs="+", default=list(CONFIGURATIONS), help=f"configuration names ({", ".join(CONFIGURATIONS)}) or name=weight lists such as title_ngrams=0.5,authors=0.4,year=0.1")
+    argument_parser.add_argument("--threshold", type=float, default=DuplicateChecker.DUPLICATE_THRESHOLD)
+    argument_parser.add_argument("--output", default=None, help="also write the results as JSON")
+
+    arguments: Namespace = argument_parser.parse_args()
+    evaluation: DuplicateEvaluation
+
+    if arguments.papers_json is not None:
+        if arguments.pairs is None:
+            raise ValueError("Evaluating a papers JSON file needs its labelled duplicate --pairs.")
+
+        with open(arguments.papers_json, "r", encoding="utf-8") as papers_file:
+            entries: list[NormalisedEntry] = load(papers_file)["entries"]
+
+        with open(arguments.pairs, "r", encoding="utf-8") as pairs_file:
+            pairs: list[tuple[str, str]] = [(str(pair["a"]), str(pair["b"])) for pair in map(loads, pairs_file) if pair.get("duplicate", True)]
+
+        evaluation = DuplicateEvaluation.from_pairs(entries, pairs)
+    else:
+        corpus: SyntheticCorpus = SyntheticCorpus(size=arguments.size, duplicate_rate=arguments.duplicate_rate, seed=arguments.seed, hard_rate=arguments.hard_rate)
+        evaluation = DuplicateEvaluation(corpus.normalised_entries(), corpus.originals)
+
+    results: dict[str, dict[str, Any]] = {}
+
+    print(f"{"configuration":<24} {"precision":>9} {"recall":>7} {"f1":>6} {"checks/s":>10} {"comparisons":>11} {"pruned":>9}")
+
+    for configuration in arguments.configurations:
+        result: dict[str, Any] = evaluation.evaluate(parse_weights(configuration), arguments.threshold)
+        results[configuration] = result
+
+        print(f"{configuration:<24} {result["precision"]:>9.4f} {result["recall"]:>7.4f} {result["f1"]:>6.4f} {result["checks_per_second"]:>10,.0f} {result["comparisons"]:>11,} {result["pruned"]:>9,}")
+
+    if arguments.output is not None:
+        with open(arguments.output, "w", encoding="utf-8") as output_file:
+            dump(results, output_file, indent=4)
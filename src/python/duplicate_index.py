@@ -0,0 +1,105 @@
+from typing import Any, Iterable, Optional
+
+from entry_identifiers import EntryIdentifiers, IdentifierExtractor
+from normaliser import NormalisedEntry
+
+
+class DuplicateIndex():
+    # Held in memory only: it is built from entries the caller has already loaded, which costs about as
+    # much as reading a saved copy would, so unlike DatabaseReader's offsets it is not kept on disk.
+    def __init__(self, normalised_entries: Iterable[NormalisedEntry] = ()) -> None:
+        self.__title_postings: dict[str, list[int]] = {}
+        self.__author_postings: dict[str, list[int]] = {}
+        self.__identity_postings: dict[tuple[str, str], list[int]] = {}
+        self.__title_sets: list[frozenset[str]] = []
+        self.__author_sets: list[frozenset[str]] = []
+        self.__identifiers: list[EntryIdentifiers] = []
+        self.__years: list[Optional[int]] = []
+
+        for normalised_entry in normalised_entries:
+            self.add(normalised_entry)
+
+    def __len__(self) -> int:
+        return len(self.__title_sets)
+
+    def add(self, normalised_entry: NormalisedEntry) -> int:
+        norm: dict[str, Any] = normalised_entry["norm"]
+        position: int = len(self.__title_sets)
+        title_set: frozenset[str] = frozenset(norm["title_tokens"])
+        author_set: frozenset[str] = frozenset(IdentifierExtractor.author_names(norm))
+        identifiers: EntryIdentifiers = IdentifierExtractor.extract(normalised_entry)
+
+        self.__title_sets.append(title_set)
+        self.__author_sets.append(author_set)
+        self.__identifiers.append(identifiers)
+        self.__years.append(norm.get("year"))
+
+        for token in title_set:
+            self.__title_postings.setdefault(token, []).append(position)
+
+        for author in author_set:
+            self.__author_postings.setdefault(author, []).append(position)
+
+        for kind, value in identifiers.items():
+            if value is not None:
+                self.__identity_postings.setdefault((kind, value), []).append(position)
+
+        return position
+
+    def title_set(self, position: int) -> frozenset[str]:
+        return self.__title_sets[position]
+
+    def author_set(self, position: int) -> frozenset[str]:
+        return self.__author_sets[position]
+
+    def identifiers(self, position: int) -> EntryIdentifiers:
+        return self.__identifiers[position]
+
+    def identity_matches(self, identifiers: EntryIdentifiers) -> list[int]:
+        matches: set[int] = set()
+
+        for kind, value in identifiers.items():
+            if value is not None:
+                matches.update(self.__identity_postings.get((kind, value), []))
+
+        return sorted(matches)
+
+    def year(self, position: int) -> Optional[int]:
+        return self.__years[position]
+
+    def candidates(self, title_set: frozenset[str], author_set: frozenset[str], needs_title: bool = True, needs_authors: bool = True, needs_either: bool = True) -> dict[int, int]:
+        # Entries that can still reach the duplicate threshold, with the number of title tokens each shares.
+        # The flags say which overlaps the weights make necessary: a pair scores 0.0 on titles or authors
+        # unless it shares at least one title token or one author.
+        if not (needs_title or needs_authors or needs_either):
+            return {position: len(title_set & self.__title_sets[position]) for position in range(len(self))}
+
+        shares_author: set[int] = set()
+
+        if needs_authors or not needs_title:
+            # The author score only credits whole names in common, so postings are keyed by the whole name.
+            for author in author_set:
+                shares_author.update(self.__author_postings.get(author, []))
+
+        # Common title words have postings covering much of the index, so walk them only when the
+        # entries sharing an author are even more numerous; otherwise intersect those titles directly.
+        title_postings: list[list[int]] = [self.__title_postings.get(token, []) for token in title_set]
+
+        if needs_authors and (not needs_title or len(shares_author) <= sum(len(postings) for postings in title_postings)):
+            shared_counts: dict[int, int] = {position: len(title_set & self.__title_sets[position]) for position in sorted(shares_author)}
+
+            return {position: shared for position, shared in shared_counts.items() if shared or not needs_title}
+
+        shared_title_tokens: dict[int, int] = {}
+
+        for postings in title_postings:
+            for position in postings:
+                shared_title_tokens[position] = shared_title_tokens.get(position, 0) + 1
+
+        if needs_authors:
+            return {position: shared for position, shared in sorted(shared_title_tokens.items()) if position in shares_author}
+        elif not needs_title:
+            for position in shares_author:
+                shared_title_tokens.setdefault(position, 0)
+
+        return dict(sorted(shared_title_tokens.items()))
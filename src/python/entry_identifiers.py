@@ -0,0 +1,63 @@
+from re import compile as re_compile, Match, Pattern, IGNORECASE
+from typing import Any, Mapping, Optional, TypeAlias
+
+from normaliser import NormalisedEntry
+
+
+EntryIdentifiers: TypeAlias = dict[str, Optional[str]]
+
+
+class IdentifierExtractor():
+    ARXIV_DOI_PREFIX: str = "10.48550/arxiv."
+    ARXIV_PATTERN: Pattern[str] = re_compile(r"arxiv(?:\.org/(?:abs|pdf)/|[\s.:]*)(\d{4}\.\d{4,5}|[a-z\-]+(?:\.[a-z]{2})?/\d{7})(?:v\d+)?", IGNORECASE)
+
+    @staticmethod
+    def extract(normalised_entry: NormalisedEntry) -> EntryIdentifiers:
+        norm: dict[str, Any] = normalised_entry["norm"]
+        raw: dict[str, Any] = normalised_entry.get("raw", {})
+
+        return {
+            "key": norm.get("id") or None,
+            "doi": norm.get("doi") or None,
+            "arxiv": IdentifierExtractor.__arxiv_id(norm.get("doi"), norm.get("url"), raw.get("journal"), raw.get("booktitle"), raw.get("venue")),
+        }
+
+    @staticmethod
+    def author_names(norm: Mapping[str, Any]) -> list[str]:
+        authors: Any = norm.get("authors") or []
+
+        # Older entries store authors as {"text": "a and b", "tokens": [...]}.
+        return [name.strip() for name in (authors["text"].split(" and ") if isinstance(authors, Mapping) else authors) if name.strip()]
+
+    @staticmethod
+    def same_work(a: EntryIdentifiers, b: EntryIdentifiers) -> bool:
+        # Conflicting arXiv ids or publisher DOIs outweigh a shared identifier, such as a reused citation key.
+        return any(a[kind] is not None and a[kind] == b[kind] for kind in ("key", "doi", "arxiv")) and not IdentifierExtractor.distinct_works(a, b)
+
+    @staticmethod
+    def distinct_works(a: EntryIdentifiers, b: EntryIdentifiers) -> bool:
+        # An arXiv preprint and its published version carry different DOIs, so DOIs only
+        # separate two entries when neither is an arXiv DOI.
+        if a["arxiv"] is not None and b["arxiv"] is not None:
+            return a["arxiv"] != b["arxiv"]
+        elif IdentifierExtractor.__is_publisher_doi(a["doi"]) and IdentifierExtractor.__is_publisher_doi(b["doi"]):
+            return a["doi"] != b["doi"]
+        else:
+            return False
+
+    @staticmethod
+    def __is_publisher_doi(doi: Optional[str]) -> bool:
+        return doi is not None and not doi.startswith(IdentifierExtractor.ARXIV_DOI_PREFIX)
+
+    @staticmethod
+    def __arxiv_id(*sources: Any) -> Optional[str]:
+        for source in sources:
+            if not source:
+                continue
+
+            m: Optional[Match[str]] = IdentifierExtractor.ARXIV_PATTERN.search(str(source))
+
+            if m:
+                return m.group(1).lower()
+
+        return None
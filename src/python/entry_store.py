@@ -0,0 +1,222 @@
+from array import array
+from sys import intern
+from typing import Any, Iterable, Iterator, Mapping, Optional, Sequence, overload
+
+from database_journal import open_journaled_storage
+from normaliser import NormalisedEntry
+
+
+class Vocabulary():
+    def __init__(self) -> None:
+        self.__ids: dict[str, int] = {}
+        self.__tokens: list[str] = []
+
+    def __len__(self) -> int:
+        return len(self.__tokens)
+
+    def id(self, token: str) -> int:
+        token_id: Optional[int] = self.__ids.get(token)
+
+        if token_id is None:
+            token_id = len(self.__tokens)
+            self.__ids[token] = token_id
+            self.__tokens.append(intern(token))
+
+        return token_id
+
+    def token(self, token_id: int) -> str:
+        return self.__tokens[token_id]
+
+
+class TokenColumn():
+    # Variable-length runs of token ids, stored back to back with one offset per run.
+    def __init__(self, vocabulary: Vocabulary) -> None:
+        self.__vocabulary: Vocabulary = vocabulary
+        self.__ids: array[int] = array("I")
+        self.__offsets: array[int] = array("Q", [0])
+
+    def append(self, tokens: list[str]) -> int:
+        self.__ids.extend(self.__vocabulary.id(token) for token in tokens)
+        self.__offsets.append(len(self.__ids))
+
+        return len(self.__offsets) - 2
+
+    def tokens(self, run: int) -> list[str]:
+        return [self.__vocabulary.token(token_id) for token_id in self.__ids[self.__offsets[run]:self.__offsets[run + 1]]]
+
+
+class EntryRecord():
+    __slots__ = ("raw", "entry_id", "entrytype", "authors", "title", "title_run", "year", "doi", "url", "venue", "venue_run", "custom", "norm")
+
+    def __init__(self) -> None:
+        self.raw: dict[str, Any] = {}
+        self.entry_id: str = ""
+        self.entrytype: str = ""
+        self.authors: int | Any = -1
+        self.title: str = ""
+        self.title_run: int = -1
+        self.year: Optional[int] = None
+        self.doi: Optional[str] = None
+        self.url: Optional[str] = None
+        self.venue: str = ""
+        self.venue_run: int = -1
+        self.custom: tuple[tuple[str, str, int], ...] = ()
+        # Entries that do not have the shape Normaliser produces keep their norm dict as is.
+        self.norm: Optional[dict[str, Any]] = None
+
+
+class NormView(Mapping[str, Any]):
+    KEYS: tuple[str, ...] = ("id", "entrytype", "authors", "title", "title_tokens", "year", "doi", "url", "venue", "venue_tokens", "custom")
+
+    def __init__(self, store: "EntryStore", record: EntryRecord) -> None:
+        self.__store: EntryStore = store
+        self.__record: EntryRecord = record
+
+    def __getitem__(self, key: str) -> Any:
+        record: EntryRecord = self.__record
+
+        if record.norm is not None:
+            return record.norm[key]
+        elif key == "id":
+            return record.entry_id
+        elif key == "entrytype":
+            return record.entrytype
+        elif key == "authors":
+            return self.__store.authors(record.authors) if isinstance(record.authors, int) else record.authors
+        elif key == "title":
+            return record.title
+        elif key == "title_tokens":
+            return self.__store.tokens(record.title_run)
+        elif key == "year":
+            return record.year
+        elif key == "doi":
+            return record.doi
+        elif key == "url":
+            return record.url
+        elif key == "venue":
+            return record.venue
+        elif key == "venue_tokens":
+            return self.__store.tokens(record.venue_run)
+        elif key == "custom":
+            return {name: {"text": text, "tokens": self.__store.tokens(run)} for name, text, run in record.custom}
+        else:
+            raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.__record.norm if self.__record.norm is not None else self.KEYS)
+
+    def __len__(self) -> int:
+        return len(self.__record.norm) if self.__record.norm is not None else len(self.KEYS)
+
+
+class EntryView(Mapping[str, Any]):
+    def __init__(self, store: "EntryStore", record: EntryRecord) -> None:
+        self.__record: EntryRecord = record
+        self.__norm: NormView = NormView(store, record)
+
+    def __getitem__(self, key: str) -> Any:
+        if key == "raw":
+            return self.__record.raw
+        elif key == "norm":
+            return self.__norm
+        else:
+            raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(("raw", "norm"))
+
+    def __len__(self) -> int:
+        return 2
+
+    def to_dict(self) -> NormalisedEntry:
+        return {"raw": dict(self.__record.raw), "norm": {key: self.__norm[key] for key in self.__norm}}
+
+
+class EntryStore(Sequence[EntryView]):
+    def __init__(self, normalised_entries: Iterable[NormalisedEntry] = ()) -> None:
+        self.__records: list[EntryRecord] = []
+        self.__token_vocabulary: Vocabulary = Vocabulary()
+        self.__author_vocabulary: Vocabulary = Vocabulary()
+        self.__token_runs: TokenColumn = TokenColumn(self.__token_vocabulary)
+        self.__author_runs: TokenColumn = TokenColumn(self.__author_vocabulary)
+
+        for normalised_entry in normalised_entries:
+            self.append(normalised_entry)
+
+    @staticmethod
+    def load(papers_database: str) -> "EntryStore":
+        return EntryStore(open_journaled_storage(papers_database).entries())
+
+    def __len__(self) -> int:
+        return len(self.__records)
+
+    @overload
+    def __getitem__(self, index: int) -> EntryView: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[EntryView]: ...
+
+    def __getitem__(self, index: int | slice) -> EntryView | list[EntryView]:
+        if isinstance(index, slice):
+            return [EntryView(self, record) for record in self.__records[index]]
+        else:
+            return EntryView(self, self.__records[index])
+
+    @property
+    def vocabulary_size(self) -> int:
+        return len(self.__token_vocabulary)
+
+    def tokens(self, run: int) -> list[str]:
+        return self.__token_runs.tokens(run)
+
+    def authors(self, run: int) -> list[str]:
+        return self.__author_runs.tokens(run)
+
+    def append(self, normalised_entry: Mapping[str, Any]) -> None:
+        record: EntryRecord = EntryRecord()
+        norm: Mapping[str, Any] = normalised_entry["norm"]
+
+        record.raw = {intern(key): intern(value) if isinstance(value, str) else value for key, value in normalised_entry["raw"].items()}
+
+        if not self.__has_normaliser_shape(norm):
+            record.norm = dict(norm)
+        else:
+            record.entry_id = intern(norm["id"])
+            record.entrytype = intern(norm["entrytype"])
+            record.title = norm["title"]
+            record.title_run = self.__token_runs.append(norm["title_tokens"])
+            record.year = norm["year"]
+            record.doi = norm["doi"]
+            record.url = norm["url"]
+            record.venue = intern(norm["venue"])
+            record.venue_run = self.__token_runs.append(norm["venue_tokens"])
+            record.custom = tuple((intern(name), intern(value["text"]), self.__token_runs.append(value["tokens"])) for name, value in norm["custom"].items())
+
+            # Older entries store authors as a {"text", "tokens"} object rather than a list of names.
+            authors: Any = norm["authors"]
+            record.authors = self.__author_runs.append(authors) if isinstance(authors, list) else authors
+
+        self.__records.append(record)
+
+    def to_papers_data(self) -> dict[str, list[NormalisedEntry]]:
+        return {"entries": [EntryView(self, record).to_dict() for record in self.__records]}
+
+    @staticmethod
+    def __has_normaliser_shape(norm: Mapping[str, Any]) -> bool:
+        if tuple(norm.keys()) != NormView.KEYS or not isinstance(norm["custom"], dict):
+            return False
+        elif not all(isinstance(norm[key], str) for key in ("id", "entrytype", "title", "venue")):
+            return False
+        elif not all(EntryStore.__is_token_list(norm[key]) for key in ("title_tokens", "venue_tokens")):
+            return False
+        elif isinstance(norm["authors"], list) and not EntryStore.__is_token_list(norm["authors"]):
+            return False
+
+        return all(
+            isinstance(value, dict) and tuple(value.keys()) == ("text", "tokens") and isinstance(value["text"], str) and EntryStore.__is_token_list(value["tokens"])
+            for value in norm["custom"].values()
+        )
+
+    @staticmethod
+    def __is_token_list(value: Any) -> bool:
+        return isinstance(value, list) and all(isinstance(token, str) for token in value)
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+
+from argparse import ArgumentParser, Namespace
+from copy import deepcopy
+from json import dumps, load, loads
+from time import perf_counter
+from typing import Any, Callable
+
+from entry_store import EntryStore
+from normaliser import NormalisedEntry
+
+import gc
+import tracemalloc
+
+
+class EntryStoreBenchmark():
+    def __init__(self, papers_json: str, copies: int) -> None:
+        self.__papers_json: str = papers_json
+        self.__copies: int = copies
+
+    def run(self) -> None:
+        text: str = self.__load_catalogue()
+
+        print(f"Catalogue: {len(text.encode("utf-8")):,} bytes of JSON.")
+
+        dict_entries, dict_bytes = self.__measure("dicts", lambda: loads(text)["entries"])
+        store, store_bytes = self.__measure("EntryStore", lambda: EntryStore(loads(text)["entries"]))
+
+        print(f"EntryStore holds the catalogue in {store_bytes / dict_bytes:.1%} of the memory of nested dicts ({store.vocabulary_size:,} distinct tokens).")
+
+        if store.to_papers_data()["entries"] != dict_entries:
+            raise RuntimeError("EntryStore does not round-trip the catalogue.")
+
+        print("EntryStore round-trips the catalogue exactly.")
+
+    def __load_catalogue(self) -> str:
+        with open(self.__papers_json, "r", encoding="utf-8") as papers_file:
+            entries: list[NormalisedEntry] = load(papers_file)["entries"]
+
+        # Copies get their own ids and one extra title token so that the catalogue grows like a real one.
+        catalogue: list[NormalisedEntry] = []
+
+        for copy in range(self.__copies):
+            for entry in entries:
+                duplicate: NormalisedEntry = deepcopy(entry)
+
+                if copy:
+                    duplicate["raw"]["id"] = duplicate["norm"]["id"] = f"{entry["norm"]["id"]}-{copy}"
+                    duplicate["norm"]["title_tokens"].append(f"copy{copy}")
+
+                catalogue.append(duplicate)
+
+        return dumps({"entries": catalogue}, ensure_ascii=False)
+
+    def __measure(self, name: str, build: Callable[[], Any]) -> tuple[Any, int]:
+        gc.collect()
+        tracemalloc.start()
+
+        start: float = perf_counter()
+        # Peak memory includes the parsed JSON, which the store only holds while it is being built.
+        built: Any = build()
+        elapsed: float = perf_counter() - start
+        current, peak = tracemalloc.get_traced_memory()
+
+        tracemalloc.stop()
+
+        print(f"{name}: {current:,} bytes retained, {peak:,} bytes at peak, built in {elapsed:.3f}s.")
+
+        return built, current
+
+
+if __name__ == "__main__":
+    argument_parser: ArgumentParser = ArgumentParser(description="Compare the memory held by nested dicts and by EntryStore for the same catalogue.")
+    argument_parser.add_argument("--papers-json", default="papers.json")
+    argument_parser.add_argument("--copies", type=int, default=100, help="times papers.json is repeated to build a larger catalogue")
+
+    arguments: Namespace = argument_parser.parse_args()
+    benchmark: EntryStoreBenchmark = EntryStoreBenchmark(papers_json=arguments.papers_json, copies=arguments.copies)
+
+    benchmark.run()
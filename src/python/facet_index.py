@@ -0,0 +1,66 @@
+from re import compile as re_compile, Pattern
+from typing import Any, Iterable
+
+from normaliser import NormalisedEntry
+
+
+class FacetIndex():
+    # Positions refer to the deployed list, so the frontend filters by intersecting postings
+    # and draws its charts from the counts instead of scanning every paper.
+    FACETS: tuple[str, ...] = ("language", "type", "goal", "area", "repository")
+    # The same split as AutoFormalisationPaperIndexer.searchWords, so every paper the search matches is a candidate.
+    TOKEN_SEPARATOR_PATTERN: Pattern[str] = re_compile(r"[ \t\n\r\f\v]+")
+    BRACES_PATTERN: Pattern[str] = re_compile(r"[{}]")
+    VERSION: int = 2
+
+    def __init__(self, normalised_entries: Iterable[NormalisedEntry] = ()) -> None:
+        self.__size: int = 0
+        self.__facets: dict[str, dict[str, list[int]]] = {facet: {} for facet in self.FACETS}
+        self.__years: dict[str, int] = {}
+        self.__llms: dict[str, int] = {}
+        self.__tokens: dict[str, list[int]] = {}
+
+        for normalised_entry in normalised_entries:
+            self.add(normalised_entry)
+
+    def __len__(self) -> int:
+        return self.__size
+
+    def add(self, normalised_entry: NormalisedEntry) -> int:
+        raw: dict[str, Any] = normalised_entry["raw"]
+        position: int = self.__size
+
+        # The same values the frontend shows: raw strings, with its labels for missing ones.
+        for facet in self.FACETS:
+            value: Any = raw.get(facet)
+
+            if isinstance(value, str) and value:
+                self.__facets[facet].setdefault(value, []).append(position)
+
+        year: str = raw["year"] if isinstance(raw.get("year"), str) else "Unknown"
+        llm: str = raw["llm"] if isinstance(raw.get("llm"), str) else "None"
+
+        self.__years[year] = self.__years.get(year, 0) + 1
+        self.__llms[llm] = self.__llms.get(llm, 0) + 1
+
+        # Tokens of the title and authors as the frontend shows and searches them, rather than the normalised
+        # title tokens, which drop LaTeX commands and punctuation the search still matches.
+        title: str = self.BRACES_PATTERN.sub("", raw["title"]) if isinstance(raw.get("title"), str) else ""
+        author: str = raw["author"] if isinstance(raw.get("author"), str) else ""
+
+        for token in dict.fromkeys([*self.TOKEN_SEPARATOR_PATTERN.split(title.lower()), *self.TOKEN_SEPARATOR_PATTERN.split(author.lower())]):
+            if token:
+                self.__tokens.setdefault(token, []).append(position)
+
+        self.__size += 1
+
+        return position
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "version": self.VERSION,
+            "size": self.__size,
+            "facets": {facet: dict(sorted(postings.items())) for facet, postings in self.__facets.items()},
+            "counts": {"year": dict(sorted(self.__years.items())), "llm": dict(sorted(self.__llms.items()))},
+            "tokens": dict(sorted(self.__tokens.items())),
+        }
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+
+from argparse import ArgumentParser, Namespace
+from hashlib import blake2b
+from json import load
+from random import Random
+from time import perf_counter
+from typing import Optional
+
+from duplicate_checker import DuplicateChecker
+from normaliser import NormalisedEntry
+
+
+class MinHashLSHIndex():
+    MERSENNE_PRIME: int = (1 << 61) - 1
+
+    def __init__(self, num_permutations: int = 128, recall_target: float = 0.99, seed: int = 1) -> None:
+        if num_permutations < 1:
+            raise ValueError("The number of permutations must be at least 1.")
+        elif not 0.0 < recall_target < 1.0:
+            raise ValueError("The recall target must be strictly between 0 and 1.")
+
+        self.__num_permutations: int = num_permutations
+        self.__recall_target: float = recall_target
+        self.__similarity_threshold: float = self.__minimum_title_similarity()
+        self.__rows, self.__bands = self.__choose_banding()
+
+        rng: Random = Random(seed)
+
+        self.__permutations: list[tuple[int, int]] = [(rng.randrange(1, self.MERSENNE_PRIME), rng.randrange(0, self.MERSENNE_PRIME)) for _ in range(num_permutations)]
+        self.__buckets: list[dict[tuple[int, ...], list[int]]] = [{} for _ in range(self.__bands)]
+        self.__token_hashes: dict[str, int] = {}
+        self.__entries: list[NormalisedEntry] = []
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    @property
+    def bands(self) -> int:
+        return self.__bands
+
+    @property
+    def rows(self) -> int:
+        return self.__rows
+
+    @property
+    def similarity_threshold(self) -> float:
+        return self.__similarity_threshold
+
+    @property
+    def expected_recall(self) -> float:
+        return self.__collision_probability(self.__similarity_threshold, self.__rows, self.__bands)
+
+    def add(self, normalised_entry: NormalisedEntry) -> int:
+        position: int = len(self.__entries)
+        signature: Optional[tuple[int, ...]] = self.signature(normalised_entry["norm"]["title_tokens"])
+
+        self.__entries.append(normalised_entry)
+
+        if signature is not None:
+            for band, key in enumerate(self.__band_keys(signature)):
+                self.__buckets[band].setdefault(key, []).append(position)
+
+        return position
+
+    def signature(self, tokens: list[str]) -> Optional[tuple[int, ...]]:
+        # An empty title scores 0.0 on titles, so it can never reach the threshold and is not banded.
+        if not tokens:
+            return None
+
+        hashes: list[int] = [self.__token_hash(token) for token in set(tokens)]
+        prime: int = self.MERSENNE_PRIME
+
+        return tuple(min((a * h + b) % prime for h in hashes) for a, b in self.__permutations)
+
+    def candidates(self, normalised_entry: NormalisedEntry) -> list[int]:
+        signature: Optional[tuple[int, ...]] = self.signature(normalised_entry["norm"]["title_tokens"])
+        found: set[int] = set()
+
+        if signature is not None:
+            for band, key in enumerate(self.__band_keys(signature)):
+                found.update(self.__buckets[band].get(key, []))
+
+        return sorted(found)
+
+    def likely_duplicates(self, normalised_entry: NormalisedEntry) -> list[tuple[int, float]]:
+        matches: list[tuple[int, float]] = []
+
+        for position in self.candidates(normalised_entry):
+            score: float = DuplicateChecker.score(normalised_entry, self.__entries[position])
+
+            if score >= DuplicateChecker.DUPLICATE_THRESHOLD:
+                matches.append((position, score))
+
+        return sorted(matches, key=lambda match: (-match[1], match[0]))
+
+    def is_duplicate(self, normalised_entry: NormalisedEntry) -> bool:
+        return bool(self.likely_duplicates(normalised_entry))
+
+    def __token_hash(self, token: str) -> int:
+        if token not in self.__token_hashes:
+            self.__token_hashes[token] = int.from_bytes(blake2b(token.encode("utf-8"), digest_size=8).digest(), "big")
+
+        return self.__token_hashes[token]
+
+    def __band_keys(self, signature: tuple[int, ...]) -> list[tuple[int, ...]]:
+        return [signature[band * self.__rows:(band + 1) * self.__rows] for band in range(self.__bands)]
+
+    def __minimum_title_similarity(self) -> float:
+        # With perfect author and year scores, the title Jaccard still has to make up the rest.
+        remaining: float = DuplicateChecker.DUPLICATE_THRESHOLD - DuplicateChecker.AUTHORS_WEIGHT - DuplicateChecker.YEAR_WEIGHT
+
+        return max(0.0, remaining / DuplicateChecker.TITLE_WEIGHT)
+
+    def __choose_banding(self) -> tuple[int, int]:
+        # The most rows per band gives the fewest false candidates, as long as pairs at the
+        # minimum title similarity still collide in some band with the requested probability.
+        for rows in range(self.__num_permutations, 0, -1):
+            bands: int = self.__num_permutations // rows
+
+            if self.__collision_probability(self.__similarity_threshold, rows, bands) >= self.__recall_target:
+                return rows, bands
+
+        raise ValueError(f"{self.__num_permutations} permutations cannot reach a recall of {self.__recall_target}; use more permutations.")
+
+    @staticmethod
+    def __collision_probability(similarity: float, rows: int, bands: int) -> float:
+        return 1.0 - (1.0 - similarity ** rows) ** bands
+
+
+class LSHAccuracyReport():
+    def __init__(self, papers_json: str, num_permutations: int, recall_target: float) -> None:
+        self.__papers_json: str = papers_json
+        self.__num_permutations: int = num_permutations
+        self.__recall_target: float = recall_target
+
+    def run(self) -> None:
+        with open(self.__papers_json, "r", encoding="utf-8") as papers_file:
+            entries: list[NormalisedEntry] = load(papers_file)["entries"]
+
+        start: float = perf_counter()
+        exact_pairs: set[tuple[int, int]] = self.__brute_force_pairs(entries)
+        brute_force_seconds: float = perf_counter() - start
+
+        start = perf_counter()
+        lsh_index: MinHashLSHIndex = MinHashLSHIndex(num_permutations=self.__num_permutations, recall_target=self.__recall_target)
+
+        for entry in entries:
+            lsh_index.add(entry)
+
+        lsh_pairs: set[tuple[int, int]] = set()
+        candidates_scored: int = 0
+
+        for i, entry in enumerate(entries):
+            candidates_scored += sum(1 for position in lsh_index.candidates(entry) if position != i)
+            lsh_pairs.update((i, position) for position, _ in lsh_index.likely_duplicates(entry) if position != i)
+
+        lsh_seconds: float = perf_counter() - start
+        missed: set[tuple[int, int]] = exact_pairs - lsh_pairs
+        extra: set[tuple[int, int]] = lsh_pairs - exact_pairs
+        recall: float = 1.0 if not exact_pairs else len(exact_pairs & lsh_pairs) / len(exact_pairs)
+
+        print(f"Entries: {len(entries)}")
+        print(f"Banding: {lsh_index.bands} bands x {lsh_index.rows} rows (expected recall {lsh_index.expected_recall:.4f} at title Jaccard {lsh_index.similarity_threshold:.4f})")
+        print(f"Brute force: {len(exact_pairs)} duplicate pairs, {len(entries) * (len(entries) - 1)} comparisons, {brute_force_seconds:.3f}s")
+        print(f"LSH: {len(lsh_pairs)} duplicate pairs, {candidates_scored} comparisons, {lsh_seconds:.3f}s")
+        print(f"Recall: {recall:.4f} ({len(missed)} missed, {len(extra)} unexpected)")
+
+        for i, j in sorted(missed):
+            print(f"Missed: {entries[i]["norm"]["id"]} ~ {entries[j]["norm"]["id"]}")
+
+        for i, j in sorted(extra):
+            print(f"Unexpected: {entries[i]["norm"]["id"]} ~ {entries[j]["norm"]["id"]}")
+
+    def __brute_force_pairs(self, entries: list[NormalisedEntry]) -> set[tuple[int, int]]:
+        pairs: set[tuple[int, int]] = set()
+
+        for i, entry in enumerate(entries):
+            for j, other in enumerate(entries):
+                if i != j and DuplicateChecker.score(entry, other) >= DuplicateChecker.DUPLICATE_THRESHOLD:
+                    pairs.add((i, j))
+
+        return pairs
+
+
+if __name__ == "__main__":
+    argument_parser: ArgumentParser = ArgumentParser(description="Compare MinHash/LSH duplicate detection against the brute-force checker.")
+    argument_parser.add_argument("--papers-json", default="papers.json")
+    argument_parser.add_argument("--permutations", type=int, default=128)
+    argument_parser.add_argument("--recall-target", type=float, default=0.99)
+
+    arguments: Namespace = argument_parser.parse_args()
+    report: LSHAccuracyReport = LSHAccuracyReport(papers_json=arguments.papers_json, num_permutations=arguments.permutations, recall_target=arguments.recall_target)
+
+    report.run()
@@ -0,0 +1,426 @@
+#!/usr/bin/env python3
+
+from abc import ABC, abstractmethod
+from argparse import ArgumentParser, Namespace
+from hashlib import sha256
+from http.client import HTTPConnection, HTTPException, HTTPResponse, HTTPSConnection
+from json import dump, dumps, load, loads
+from re import Pattern, compile as re_compile
+from threading import Lock
+from time import time
+from typing import Any, Iterable, Optional, TypeAlias
+from urllib.parse import urlencode, urlsplit, SplitResult
+
+from normaliser import Normaliser, NormalisedEntry
+from pipeline_metrics import METRICS
+
+import asyncio
+import os
+import sqlite3
+
+
+# Raw fields found for an entry, e.g. {"doi": ..., "venue": ...}; None when the resolver knows nothing.
+Metadata: TypeAlias = dict[str, str]
+
+
+class MetadataResolver(ABC):
+    name: str = ""
+    # Requests per second the service allows by default; 0 for no limit.
+    rate: float = 0.0
+    # Raw fields the resolver can find; entries missing only other fields are not looked up.
+    fields: tuple[str, ...] = ()
+    TITLE_TOKEN_PATTERN: Pattern[str] = re_compile(r"\w+")
+
+    def query(self, raw: dict[str, Any]) -> Optional[dict[str, str]]:
+        # What identifies the entry to the resolver; it is also the response cache key.
+        if not str(raw.get("title", "")).strip():
+            return None
+
+        return {"title": str(raw["title"]), "authors": str(raw.get("authors", "")), "year": str(raw.get("year", ""))}
+
+    @abstractmethod
+    async def resolve(self, query: dict[str, str]) -> Optional[Metadata]:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    @classmethod
+    def title_key(cls, title: str) -> str:
+        return " ".join(cls.TITLE_TOKEN_PATTERN.findall(title.replace("{", "").replace("}", "").lower()))
+
+    @classmethod
+    def title_similarity(cls, title: str, other_title: str) -> float:
+        tokens: set[str] = set(cls.title_key(title).split())
+        other_tokens: set[str] = set(cls.title_key(other_title).split())
+
+        return len(tokens & other_tokens) / len(tokens | other_tokens) if tokens | other_tokens else 0.0
+
+
+class LocalResolver(MetadataResolver):
+    # Metadata from a JSON file of {"entries": [{"title": ..., "doi": ..., ...}]}, matched by title; for offline runs and tests.
+    name: str = "local"
+
+    def __init__(self, metadata_file: str) -> None:
+        with open(metadata_file, "r", encoding="utf-8") as f:
+            records: list[dict[str, str]] = load(f).get("entries", [])
+
+        self.__by_title: dict[str, Metadata] = {
+            self.title_key(record["title"]): {field: value for field, value in record.items() if field != "title"}
+            for record in records if record.get("title")
+        }
+        self.fields: tuple[str, ...] = tuple(sorted({field for metadata in self.__by_title.values() for field in metadata}))
+
+    async def resolve(self, query: dict[str, str]) -> Optional[Metadata]:
+        return self.__by_title.get(self.title_key(query["title"]))
+
+
+class HttpConnectionPool():
+    # Keeps connections to one host open between requests; each connection is used by one thread at a time.
+    def __init__(self, base_url: str, size: int = 8, timeout: float = 10.0) -> None:
+        parts: SplitResult = urlsplit(base_url)
+
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise ValueError(f"Unsupported resolver URL {base_url!r}.")
+
+        self.__scheme: str = parts.scheme
+        self.__host: str = parts.hostname
+        self.__port: Optional[int] = parts.port
+        self.__size: int = size
+        self.__timeout: float = timeout
+        self.__idle: list[HTTPConnection] = []
+        self.__lock: Lock = Lock()
+
+    def get(self, path: str, headers: dict[str, str]) -> tuple[int, bytes]:
+        connection: HTTPConnection = self.__acquire()
+
+        try:
+            connection.request("GET", path, headers=headers)
+
+            response: HTTPResponse = connection.getresponse()
+            body: bytes = response.read()
+        except (OSError, HTTPException):
+            connection.close()
+
+            raise
+
+        self.__release(connection, reusable=not response.will_close)
+
+        return response.status, body
+
+    def close(self) -> None:
+        with self.__lock:
+            for connection in self.__idle:
+                connection.close()
+
+            self.__idle.clear()
+
+    def __acquire(self) -> HTTPConnection:
+        with self.__lock:
+            if self.__idle:
+                return self.__idle.pop()
+
+        connection_type: type[HTTPConnection] = HTTPSConnection if self.__scheme == "https" else HTTPConnection
+
+        return connection_type(self.__host, self.__port, timeout=self.__timeout)
+
+    def __release(self, connection: HTTPConnection, reusable: bool) -> None:
+        with self.__lock:
+            if reusable and len(self.__idle) < self.__size:
+                self.__idle.append(connection)
+
+                return
+
+        connection.close()
+
+
+class CrossrefResolver(MetadataResolver):
+    # The best bibliographic match from the Crossref REST API, accepted only when its title matches.
+    name: str = "crossref"
+    rate: float = 10.0
+    fields: tuple[str, ...] = ("doi", "venue", "url")
+    TITLE_MATCH: float = 0.9
+
+    def __init__(self, base_url: str = "https://api.crossref.org", mailto: Optional[str] = None, pool_size: int = 8) -> None:
+        self.__pool: HttpConnectionPool = HttpConnectionPool(base_url, size=pool_size)
+        self.__prefix: str = urlsplit(base_url).path.rstrip("/")
+        self.__mailto: Optional[str] = mailto
+        # Crossref routes requests that identify a contact to its more reliable "polite" pool.
+        self.__headers: dict[str, str] = {
+            "Accept": "application/json",
+            "User-Agent": f"autoformalisation-papers/1.0{f" (mailto:{mailto})" if mailto else ""}",
+        }
+
+    async def resolve(self, query: dict[str, str]) -> Optional[Metadata]:
+        parameters: dict[str, str] = {
+            "query.bibliographic": f"{query["title"]} {query["year"]}".strip(),
+            "rows": "1",
+            "select": "DOI,title,container-title,URL",
+        }
+
+        if query["authors"]:
+            parameters["query.author"] = query["authors"]
+
+        if self.__mailto:
+            parameters["mailto"] = self.__mailto
+
+        # http.client blocks, so each request runs on a worker thread with its own pooled connection.
+        status, body = await asyncio.to_thread(self.__pool.get, f"{self.__prefix}/works?{urlencode(parameters)}", self.__headers)
+
+        if status == 429 or status >= 500:
+            raise ConnectionError(f"Crossref answered {status}.")
+        elif status == 404:
+            return None
+        elif status != 200:
+            raise ValueError(f"Crossref answered {status}: {body[:200]!r}.")
+
+        response: Any = loads(body)
+        message: Any = response.get("message") if isinstance(response, dict) else None
+        items: Any = message.get("items") if isinstance(message, dict) else None
+
+        if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+            raise ValueError(f"Crossref answered without a list of works: {body[:200]!r}.")
+
+        if not items or self.title_similarity(query["title"], " ".join(items[0].get("title", []))) < self.TITLE_MATCH:
+            return None
+
+        metadata: Metadata = {"doi": items[0].get("DOI", ""), "venue": " ".join(items[0].get("container-title", [])), "url": items[0].get("URL", "")}
+
+        return {field: value for field, value in metadata.items() if value}
+
+    def close(self) -> None:
+        self.__pool.close()
+
+
+class RateLimiter():
+    # Spaces request starts at least 1 / rate seconds apart, however many tasks are waiting.
+    def __init__(self, rate: float) -> None:
+        self.__interval: float = 1.0 / rate if rate > 0 else 0.0
+        self.__next: float = 0.0
+        self.__lock: asyncio.Lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        async with self.__lock:
+            loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+            delay: float = self.__next - loop.time()
+
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            self.__next = max(self.__next, loop.time()) + self.__interval
+
+
+class ResponseCache():
+    # Resolver answers by query, including "not found", so a repeat sync makes no requests for known entries.
+    # Misses are asked again after NEGATIVE_MAX_AGE seconds, as the metadata may have been registered since.
+    NEGATIVE_MAX_AGE: float = 30 * 24 * 3600
+
+    def __init__(self, cache_file: str) -> None:
+        if os.path.dirname(cache_file):
+            os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+
+        self.__connection: sqlite3.Connection = sqlite3.connect(cache_file)
+        self.__connection.execute("PRAGMA journal_mode=WAL")
+        self.__connection.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, metadata TEXT, fetched REAL NOT NULL)")
+
+    @staticmethod
+    def key(resolver: str, query: dict[str, str]) -> str:
+        return sha256(dumps([resolver, query], sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> tuple[bool, Optional[Metadata]]:
+        row: Optional[tuple[Optional[str], float]] = self.__connection.execute("SELECT metadata, fetched FROM responses WHERE key = ?", (key,)).fetchone()
+
+        if row is None or (row[0] is None and time() - row[1] > self.NEGATIVE_MAX_AGE):
+            return False, None
+
+        return True, None if row[0] is None else loads(row[0])
+
+    def put(self, key: str, metadata: Optional[Metadata]) -> None:
+        self.__connection.execute(
+            "INSERT OR REPLACE INTO responses (key, metadata, fetched) VALUES (?, ?, ?)",
+            (key, None if metadata is None else dumps(metadata, ensure_ascii=False), time()),
+        )
+
+    def close(self) -> None:
+        self.__connection.commit()
+        self.__connection.close()
+
+
+class MetadataEnricher():
+    # Raw fields that count as missing, and the placeholder curators use for an unknown repository.
+    FIELDS: tuple[str, ...] = ("doi", "venue", "url", "repository")
+    PLACEHOLDERS: tuple[str, ...] = ("", "NA")
+
+    def __init__(self, resolver: MetadataResolver, cache_file: str, concurrency: int = 8, rate: Optional[float] = None, retries: int = 3, backoff: float = 1.0) -> None:
+        if concurrency < 1:
+            raise ValueError("At least one request must be allowed in flight.")
+
+        self.__resolver: MetadataResolver = resolver
+        self.__cache_file: str = cache_file
+        self.__concurrency: int = concurrency
+        self.__rate: float = resolver.rate if rate is None else rate
+        self.__retries: int = retries
+        self.__backoff: float = backoff
+        self.__normaliser: Normaliser = Normaliser()
+        self.__statistics: dict[str, int] = {}
+
+    @property
+    def statistics(self) -> dict[str, int]:
+        return dict(self.__statistics)
+
+    @classmethod
+    def missing_fields(cls, raw: dict[str, Any]) -> list[str]:
+        return [field for field in cls.FIELDS if str(raw.get(field, "") or "").strip() in cls.PLACEHOLDERS]
+
+    def __wanted_fields(self, raw: dict[str, Any]) -> list[str]:
+        return [field for field in self.missing_fields(raw) if field in self.__resolver.fields]
+
+    def enrich(self, normalised_entries: list[NormalisedEntry]) -> list[NormalisedEntry]:
+        self.__statistics = {"candidates": 0, "cache_hits": 0, "requests": 0, "retries": 0, "failures": 0, "enriched": 0}
+        cache: ResponseCache = ResponseCache(self.__cache_file)
+
+        try:
+            metadata: list[Optional[Metadata]] = asyncio.run(self.__resolve_all(normalised_entries, cache))
+        finally:
+            cache.close()
+            self.__resolver.close()
+
+        enriched_entries: list[NormalisedEntry] = []
+
+        for normalised_entry, found in zip(normalised_entries, metadata):
+            raw: dict[str, Any] = normalised_entry["raw"]
+            updates: Metadata = {field: value for field, value in (found or {}).items() if field in self.__wanted_fields(raw) and value}
+
+            if updates:
+                # Only empty fields are filled, so curated values always win; the entry is normalised again to match.
+                enriched_entries.append(self.__normaliser.normalise_bibtex_entry({**raw, **updates}))
+                self.__statistics["enriched"] += 1
+            else:
+                enriched_entries.append(normalised_entry)
+
+        for counter, value in self.__statistics.items():
+            METRICS.count("enrichment", counter, value)
+
+        print(f"Metadata enrichment ({self.__resolver.name}): {self.__statistics["enriched"]} of {self.__statistics["candidates"]} incomplete entries enriched, "
+              f"{self.__statistics["requests"]} requests, {self.__statistics["cache_hits"]} cached, {self.__statistics["failures"]} failed.")
+
+        return enriched_entries
+
+    async def __resolve_all(self, normalised_entries: Iterable[NormalisedEntry], cache: ResponseCache) -> list[Optional[Metadata]]:
+        semaphore: asyncio.Semaphore = asyncio.Semaphore(self.__concurrency)
+        rate_limiter: RateLimiter = RateLimiter(self.__rate)
+        # Entries with the same query share a single lookup.
+        known: dict[str, Optional[Metadata]] = {}
+        lookups: dict[str, asyncio.Task[Optional[Metadata]]] = {}
+        keys: list[Optional[str]] = []
+
+        for normalised_entry in normalised_entries:
+            query: Optional[dict[str, str]] = self.__resolver.query(normalised_entry["raw"]) if self.__wanted_fields(normalised_entry["raw"]) else None
+
+            if query is None:
+                keys.append(None)
+
+                continue
+
+            key: str = ResponseCache.key(self.__resolver.name, query)
+            self.__statistics["candidates"] += 1
+            keys.append(key)
+
+            if key in known or key in lookups:
+                continue
+
+            cached, metadata = cache.get(key)
+
+            if cached:
+                self.__statistics["cache_hits"] += 1
+                known[key] = metadata
+            else:
+                lookups[key] = asyncio.create_task(self.__lookup(key, query, cache, semaphore, rate_limiter))
+
+        with METRICS.stage("enrichment"):
+            for key, metadata in zip(lookups, await asyncio.gather(*lookups.values())):
+                known[key] = metadata
+
+        return [None if key is None else known[key] for key in keys]
+
+    async def __lookup(self, key: str, query: dict[str, str], cache: ResponseCache, semaphore: asyncio.Semaphore, rate_limiter: RateLimiter) -> Optional[Metadata]:
+        async with semaphore:
+            for attempt in range(self.__retries + 1):
+                await rate_limiter.wait()
+
+                self.__statistics["requests"] += 1
+
+                try:
+                    metadata: Optional[Metadata] = await self.__resolver.resolve(query)
+                except (OSError, HTTPException) as e:
+                    # Connection failures, timeouts, throttling and server errors are worth another try.
+                    if attempt < self.__retries:
+                        self.__statistics["retries"] += 1
+
+                        await asyncio.sleep(self.__backoff * 2 ** attempt)
+
+                        continue
+
+                    print(f"Metadata lookup for {query["title"]!r} failed: {e}")
+                except ValueError as e:
+                    print(f"Metadata lookup for {query["title"]!r} failed: {e}")
+                else:
+                    cache.put(key, metadata)
+
+                    return metadata
+
+                break
+
+        # Failures are not cached, so the next sync asks again.
+        self.__statistics["failures"] += 1
+
+        return None
+
+
+RESOLVERS: tuple[str, ...] = ("crossref", "local")
+
+
+def create_resolver(resolver: str, metadata_file: Optional[str] = None, crossref_url: str = "https://api.crossref.org", mailto: Optional[str] = None) -> MetadataResolver:
+    if resolver == "local":
+        if metadata_file is None:
+            raise ValueError("The local resolver needs a metadata file.")
+
+        return LocalResolver(metadata_file)
+    elif resolver == "crossref":
+        return CrossrefResolver(base_url=crossref_url, mailto=mailto)
+    else:
+        raise ValueError(f"Unknown metadata resolver {resolver!r}; expected one of {", ".join(RESOLVERS)}.")
+
+
+if __name__ == "__main__":
+    argument_parser: ArgumentParser = ArgumentParser(description="Fill in missing DOIs, venues, URLs and repositories of a papers JSON file and report what was found.")
+    argument_parser.add_argument("--papers-json", default="papers.json")
+    argument_parser.add_argument("--resolver", default="crossref", choices=RESOLVERS)
+    argument_parser.add_argument("--metadata-file", default=None, help="JSON file of known metadata for the local resolver")
+    argument_parser.add_argument("--crossref-url", default="https://api.crossref.org")
+    argument_parser.add_argument("--mailto", default=None, help="contact address sent to Crossref")
+    argument_parser.add_argument("--cache-file", default=".cache/metadata_responses.sqlite3")
+    argument_parser.add_argument("--concurrency", type=int, default=8)
+    argument_parser.add_argument("--rate", type=float, default=None, help="requests per second (default: the resolver's own limit)")
+    argument_parser.add_argument("--output", default=None, help="write the enriched entries as a papers JSON file")
+
+    arguments: Namespace = argument_parser.parse_args()
+
+    with open(arguments.papers_json, "r", encoding="utf-8") as papers_file:
+        papers: list[NormalisedEntry] = load(papers_file).get("entries", [])
+
+    enricher: MetadataEnricher = MetadataEnricher(
+        resolver=create_resolver(arguments.resolver, arguments.metadata_file, arguments.crossref_url, arguments.mailto),
+        cache_file=arguments.cache_file,
+        concurrency=arguments.concurrency,
+        rate=arguments.rate,
+    )
+    enriched: list[NormalisedEntry] = enricher.enrich(papers)
+
+    for before, after in zip(papers, enriched):
+        if after is not before:
+            print(f"{after["raw"]["id"]}: {", ".join(f"{field}={after["raw"][field]!r}" for field in MetadataEnricher.missing_fields(before["raw"]) if after["raw"].get(field) != before["raw"].get(field))}")
+
+    if arguments.output is not None:
+        with open(arguments.output, "w", encoding="utf-8") as output_file:
+            dump({"entries": enriched}, output_file, indent=4, ensure_ascii=False)
@@ -0,0 +1,55 @@
+from hashlib import sha256
+from json import dumps, loads
+from typing import Any, Optional
+
+from normaliser import NormalisedEntry
+
+import os
+import sqlite3
+
+
+class NormalisationCache():
+    def __init__(self, cache_file: str, version: str, read_only: bool = False) -> None:
+        self.__version: str = version
+        self.__read_only: bool = read_only
+        self.__pending: list[tuple[str, str, str]] = []
+
+        if read_only:
+            self.__connection: sqlite3.Connection = sqlite3.connect(f"file:{cache_file}?mode=ro", uri=True)
+        else:
+            if os.path.dirname(cache_file):
+                os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+
+            self.__connection = sqlite3.connect(cache_file)
+            self.__connection.execute("PRAGMA journal_mode=WAL")
+            self.__connection.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, version TEXT NOT NULL, entry TEXT NOT NULL)")
+            # Entries normalised under different rules can never be hit again.
+            self.__connection.execute("DELETE FROM entries WHERE version != ?", (version,))
+            self.__connection.commit()
+
+    @staticmethod
+    def key(raw_entry: dict[str, Any]) -> str:
+        return sha256(dumps(raw_entry, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[NormalisedEntry]:
+        row: Optional[tuple[str]] = self.__connection.execute("SELECT entry FROM entries WHERE key = ? AND version = ?", (key, self.__version)).fetchone()
+
+        return None if row is None else loads(row[0])
+
+    def put(self, key: str, normalised_entry: NormalisedEntry) -> None:
+        if self.__read_only:
+            raise ValueError("Cannot store entries in a read-only normalisation cache.")
+
+        self.__pending.append((key, self.__version, dumps(normalised_entry, ensure_ascii=False)))
+
+    def commit(self) -> None:
+        if self.__pending:
+            self.__connection.executemany("INSERT OR REPLACE INTO entries (key, version, entry) VALUES (?, ?, ?)", self.__pending)
+            self.__connection.commit()
+            self.__pending.clear()
+
+    def close(self) -> None:
+        if not self.__read_only:
+            self.commit()
+
+        self.__connection.close()
@@ -1,15 +1,58 @@
-from typing import Any, Iterable, cast, Optional, TypeAlias
+from functools import lru_cache
+from hashlib import sha256
+from sys import intern
+from typing import Any, Callable, Iterable, cast, Optional, TypeAlias
 from unicodedata import normalize as ud_normalise, combining as ud_combining
-from re import sub as re_sub, split as re_split
+from re import compile as re_compile, Pattern
 
 
 NormalisedEntry: TypeAlias = dict[str, dict[str, Any]]
 
 
 class Normaliser():
-    def __init__(self) -> None:
+    LATEX_COMMAND_PATTERN: Pattern[str] = re_compile(r"\\[a-zA-Z]+\{([^}]*)\}")
+    BRACES_PATTERN: Pattern[str] = re_compile(r"[{}]")
+    PUNCTUATION_PATTERN: Pattern[str] = re_compile(r"[^\w\s]")
+    WHITESPACE_PATTERN: Pattern[str] = re_compile(r"\s+")
+    TOKEN_SEPARATOR_PATTERN: Pattern[str] = re_compile(r"\W+")
+
+    def __init__(self, cache_size: int = 1 << 16) -> None:
+        if cache_size < 0:
+            raise ValueError("The normalisation cache size cannot be negative.")
+
         self.__standard_keys: set[str] = {"id", "entrytype", "author", "authors", "title", "year", "doi", "url", "journal", "booktitle", "venue"}
 
+        # The text primitives are pure, and authors and venues repeat across many entries, so their
+        # results are memoised per instance. The caches wrap static functions rather than bound methods,
+        # so they do not keep the instance alive. Only tokens and author names, which repeat across
+        # entries, are interned; whole titles are mostly unique and would stay in the intern table.
+        self.__strip_latex: Callable[[str], str] = lru_cache(maxsize=cache_size)(Normaliser.__strip_latex_uncached)
+        self.__normalise_text: Callable[[str], str] = lru_cache(maxsize=cache_size)(Normaliser.__normalise_text_uncached)
+        self.__tokenise_cached: Callable[[str], tuple[str, ...]] = lru_cache(maxsize=cache_size)(Normaliser.__tokenise_uncached)
+
+    def cache_statistics(self) -> dict[str, dict[str, float]]:
+        statistics: dict[str, dict[str, float]] = {}
+
+        for name, primitive in (("strip_latex", self.__strip_latex), ("normalise_text", self.__normalise_text), ("tokenise", self.__tokenise_cached)):
+            hits, misses, maxsize, currsize = cast(Any, primitive).cache_info()
+            lookups: int = hits + misses
+
+            statistics[name] = {
+                "hits": hits,
+                "misses": misses,
+                "size": currsize,
+                "max_size": maxsize,
+                "hit_rate": hits / lookups if lookups else 0.0,
+            }
+
+        return statistics
+
+    @staticmethod
+    def rules_version() -> str:
+        # Any edit to the normalisation rules changes this module, and with it the version.
+        with open(__file__, "rb") as source:
+            return sha256(source.read()).hexdigest()
+
     def normalise_bibtex_entry(self, bibtex_entry: dict[str, str]) -> NormalisedEntry:
         self.__bibtex_entry: dict[str, str] = bibtex_entry
 
@@ -96,37 +139,37 @@ class Normaliser():
         normalised: list[str] = []
 
         for author in authors:
-            author_no_tex: str = self.__strip_latex(original_text=author)
-            normalised_author: str = self.__normalise_text(original_text=author_no_tex)
+            author_no_tex: str = self.__strip_latex(author)
+            normalised_author: str = self.__normalise_text(author_no_tex)
             parts: list[str] = normalised_author.split()
 
             if parts:
                 surname: str = parts[-1]
                 name: str = " ".join(parts[:-1])
-                normalised.append(f"{name} {surname}".strip())
+                normalised.append(intern(f"{name} {surname}".strip()))
             else:
                 normalised.append(author_no_tex)
 
         return sorted(normalised)
 
-    def __strip_latex(self, original_text: str) -> str:
-        text_without_latex: str = re_sub(r"\\[a-zA-Z]+\{([^}]*)\}", r"\1", original_text)
-        text_without_braces: str = re_sub(r"[{}]", "", text_without_latex)
+    @staticmethod
+    def __strip_latex_uncached(original_text: str) -> str:
+        text_without_latex: str = Normaliser.LATEX_COMMAND_PATTERN.sub(r"\1", original_text)
 
-        return text_without_braces
+        return Normaliser.BRACES_PATTERN.sub("", text_without_latex)
 
-
-    def __normalise_text(self, original_text: str) -> str:
+    @staticmethod
+    def __normalise_text_uncached(original_text: str) -> str:
         lowercase_text: str = original_text.lower()
 
         # Remove accents
         normalised_text: str = "".join(ch for ch in ud_normalise("NFKD", lowercase_text) if not ud_combining(ch))
 
         # Remove punctuation except whitespace
-        no_punctuation_text: str = re_sub(r"[^\w\s]", "", normalised_text)
+        no_punctuation_text: str = Normaliser.PUNCTUATION_PATTERN.sub("", normalised_text)
 
         # Collapse whitespace
-        return re_sub(r"\s+", " ", no_punctuation_text).strip()
+        return Normaliser.WHITESPACE_PATTERN.sub(" ", no_punctuation_text).strip()
 
     def __normalise_title_field(self, raw_title: Any) -> dict[str, str | list[str]]:
         return self.__normalise_to_text_and_tokens(raw_title)
@@ -146,7 +189,11 @@ class Normaliser():
         return prototype
 
     def __tokenise(self, text: str) -> list[str]:
-        return [t for t in re_split(r"\W+", text.lower()) if t]
+        return list(self.__tokenise_cached(text))
+
+    @staticmethod
+    def __tokenise_uncached(text: str) -> tuple[str, ...]:
+        return tuple(intern(t) for t in Normaliser.TOKEN_SEPARATOR_PATTERN.split(text.lower()) if t)
 
     def __normalise_year_field(self, raw_year: Any) -> Optional[int]:
         try:
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+
+from argparse import ArgumentParser, Namespace
+from contextlib import redirect_stdout
+from io import StringIO
+from json import dump, load
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from typing import Any, Callable, Optional
+
+from bibtex_parser import BibTeXStreamReader
+from duplicate_checker import DuplicateChecker
+from duplicate_index import DuplicateIndex
+from normaliser import Normaliser, NormalisedEntry
+from sync_database import SyncDatabase
+from synthetic_corpus import SyntheticCorpus
+
+import os
+import platform
+
+
+class PipelineBenchmark():
+    STAGES: tuple[str, ...] = ("bibtex_parsing", "normalisation", "duplicate_check", "sync")
+
+    def __init__(self, sizes: list[int], duplicate_rate: float, repeat: int, baseline_file: str, tolerance: float) -> None:
+        if repeat < 1:
+            raise ValueError("The benchmark must be repeated at least once.")
+
+        self.__sizes: list[int] = sizes
+        self.__duplicate_rate: float = duplicate_rate
+        self.__repeat: int = repeat
+        self.__baseline_file: str = baseline_file
+        self.__tolerance: float = tolerance
+        self.__duplicates_found: int = 0
+
+    def run(self) -> dict[str, Any]:
+        baseline: dict[str, Any] = self.__load_baseline()
+        results: dict[str, dict[str, dict[str, Any]]] = {}
+
+        for size in self.__sizes:
+            with TemporaryDirectory() as directory:
+                results[str(size)] = self.__run_size(size, directory)
+
+            for stage, result in results[str(size)].items():
+                baseline_seconds: Any = baseline.get("sizes", {}).get(str(size), {}).get(stage, {}).get("seconds")
+
+                if baseline_seconds:
+                    result["baseline_seconds"] = baseline_seconds
+                    result["ratio"] = round(result["seconds"] / baseline_seconds, 3)
+                    result["regression"] = result["ratio"] > 1.0 + self.__tolerance
+
+                print(f"{size:>7} {stage:<16} {result["seconds"]:>9.3f}s {result["entries_per_second"]:>12,.0f}/s" + (f"  x{result["ratio"]:.2f} of baseline{"  REGRESSION" if result["regression"] else ""}" if "ratio" in result else ""))
+
+        return {"python": platform.python_version(), "machine": platform.machine(), "repeat": self.__repeat, "tolerance": self.__tolerance, "sizes": results}
+
+    def save_baseline(self, report: dict[str, Any]) -> None:
+        sizes: dict[str, dict[str, dict[str, float]]] = {
+            size: {stage: {"seconds": result["seconds"], "entries_per_second": result["entries_per_second"]} for stage, result in stages.items()}
+            for size, stages in report["sizes"].items()
+        }
+        baseline: dict[str, Any] = self.__load_baseline()
+
+        baseline.update({"python": report["python"], "machine": report["machine"]})
+        baseline.setdefault("sizes", {}).update(sizes)
+
+        if os.path.dirname(self.__baseline_file):
+            os.makedirs(os.path.dirname(self.__baseline_file), exist_ok=True)
+
+        with open(self.__baseline_file, "w", encoding="utf-8") as f:
+            dump(baseline, f, indent=4)
+
+    def __load_baseline(self) -> dict[str, Any]:
+        if not os.path.isfile(self.__baseline_file):
+            return {}
+
+        with open(self.__baseline_file, "r", encoding="utf-8") as f:
+            return load(f)
+
+    def __run_size(self, size: int, directory: str) -> dict[str, dict[str, Any]]:
+        corpus: SyntheticCorpus = SyntheticCorpus(size=size, duplicate_rate=self.__duplicate_rate)
+        bibtex_file: str = os.path.join(directory, "papers.bib")
+        papers_json: str = os.path.join(directory, "papers.json")
+
+        corpus.write_bibtex(bibtex_file)
+
+        normalised_entries: list[NormalisedEntry] = corpus.normalised_entries()
+        raw_entries: list[dict[str, Any]] = [entry["raw"] for entry in normalised_entries]
+
+        with open(papers_json, "w", encoding="utf-8") as f:
+            dump({"entries": normalised_entries}, f, indent=4, ensure_ascii=False)
+
+        stages: dict[str, Callable[[], int]] = {
+            "bibtex_parsing": lambda: sum(1 for _ in BibTeXStreamReader(bibtex_file).entries()),
+            "normalisation": lambda: self.__normalise(raw_entries),
+            "duplicate_check": lambda: self.__check_duplicates(normalised_entries),
+            "sync": lambda: self.__sync(directory, papers_json, len(normalised_entries)),
+        }
+
+        # Every repeat of the sync starts from nothing deployed, as the first one does; otherwise the later
+        # ones would find the output already written and time an update that changes nothing.
+        resets: dict[str, Callable[[], None]] = {"sync": lambda: self.__reset_sync(directory, papers_json)}
+        results: dict[str, dict[str, Any]] = {stage: self.__time(stages[stage], resets.get(stage)) for stage in self.STAGES}
+
+        # Injected near-copies against what the checker flagged: a drop in recall shows up here, not in the timings.
+        results["duplicate_check"].update({"duplicates_injected": corpus.duplicates, "duplicates_found": self.__duplicates_found})
+
+        return results
+
+    def __time(self, stage: Callable[[], int], reset: Optional[Callable[[], None]] = None) -> dict[str, Any]:
+        timings: list[float] = []
+        entries: int = 0
+
+        for _ in range(self.__repeat):
+            if reset is not None:
+                reset()
+
+            start: float = perf_counter()
+            entries = stage()
+            timings.append(perf_counter() - start)
+
+        seconds: float = min(timings)
+
+        return {"entries": entries, "seconds": round(seconds, 6), "entries_per_second": round(entries / seconds, 1) if seconds else 0.0}
+
+    def __normalise(self, raw_entries: list[dict[str, Any]]) -> int:
+        # A fresh normaliser each time, so memoised text from the previous run does not carry over.
+        normaliser: Normaliser = Normaliser()
+
+        for raw_entry in raw_entries:
+            normaliser.normalise_bibtex_entry(raw_entry)
+
+        return len(raw_entries)
+
+    def __check_duplicates(self, normalised_entries: list[NormalisedEntry]) -> int:
+        # The same incremental check BibTeXLoader runs while importing into an empty database.
+        kept: list[NormalisedEntry] = []
+        duplicate_index: DuplicateIndex = DuplicateIndex()
+
+        for normalised_entry in normalised_entries:
+            if not DuplicateChecker.is_duplicate(normalised_entry=normalised_entry, normalised_entries=kept, duplicate_index=duplicate_index):
+                kept.append(normalised_entry)
+                duplicate_index.add(normalised_entry)
+
+        self.__duplicates_found = len(normalised_entries) - len(kept)
+
+        return len(normalised_entries)
+
+    @staticmethod
+    def __reset_sync(directory: str, papers_json: str) -> None:
+        # The offset index of papers.json is built by the first read of a fresh checkout, so it is timed too.
+        for path in (os.path.join(directory, "deployed.json"), os.path.join(directory, "deployed.json.bak"), f"{papers_json}.offsets"):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def __sync(self, directory: str, papers_json: str, entries: int) -> int:
+        syncer: SyncDatabase = SyncDatabase(
+            papers_json=papers_json,
+            db_path=os.path.join(directory, "deployed.json"),
+            db_backup_path=os.path.join(directory, "deployed.json.bak"),
+        )
+
+        with redirect_stdout(StringIO()):
+            syncer.sync_database()
+
+        return entries
+
+
+if __name__ == "__main__":
+    argument_parser: ArgumentParser = ArgumentParser(description="Time each stage of the ingestion pipeline on synthetic corpora and compare with a stored baseline.")
+    argument_parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    argument_parser.add_argument("--duplicate-rate", type=float, default=0.05)
+    argument_parser.add_argument("--repeat", type=int, default=3, help="runs per stage; the fastest is reported")
+    argument_parser.add_argument("--baseline", default="benchmarks/pipeline_baseline.json", help="stored timings to compare against")
+    argument_parser.add_argument("--tolerance", type=float, default=0.25, help="slowdown over the baseline reported as a regression")
+    argument_parser.add_argument("--output", default="pipeline_benchmark.json", help="machine-readable results of this run")
+    argument_parser.add_argument("--update-baseline", action="store_true", help="store this run's timings as the new baseline")
+    argument_parser.add_argument("--fail-on-regression", action="store_true")
+
+    arguments: Namespace = argument_parser.parse_args()
+    benchmark: PipelineBenchmark = PipelineBenchmark(
+        sizes=arguments.sizes,
+        duplicate_rate=arguments.duplicate_rate,
+        repeat=arguments.repeat,
+        baseline_file=arguments.baseline,
+        tolerance=arguments.tolerance,
+    )
+    report: dict[str, Any] = benchmark.run()
+
+    with open(arguments.output, "w", encoding="utf-8") as output_file:
+        dump(report, output_file, indent=4)
+
+    if arguments.update_baseline:
+        benchmark.save_baseline(report)
+
+    regressions: list[str] = [f"{stage} at {size}" for size, stages in report["sizes"].items() for stage, result in stages.items() if result.get("regression")]
+
+    if regressions and arguments.fail_on_regression:
+        raise RuntimeError(f"Slower than the baseline: {", ".join(regressions)}.")
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+
+from argparse import ArgumentParser, Namespace
+from json import dumps, loads
+from selectors import DefaultSelector, EVENT_READ
+from time import perf_counter
+from typing import Any, Optional, TypeAlias
+
+from add_paper import PaperEntryParser, ReportRow
+from bibtex_loader import BibTeXLoader, ConversionResult
+from bibtex_parser import BibTeXStreamReader, SourceEntry
+from daemon_client import DaemonClient
+from database_journal import JournaledStorage, open_journaled_storage
+from normaliser import NormalisedEntry
+from pipeline_metrics import METRICS, PipelineMetrics
+from related_papers import RelatedPapers
+from sync_database import SyncDatabase
+
+import os
+import signal
+import socket
+
+
+# (inode, size, mtime) of a watched file, or None while it does not exist.
+FileState: TypeAlias = Optional[tuple[int, int, int]]
+
+
+class PipelineDaemon():
+    # Seconds between checks of the watched files; inotify is not in the standard library, and a stat per file is cheap.
+    POLL_INTERVAL: float = 0.5
+    COMMANDS: tuple[str, ...] = ("add", "import", "sync", "status", "stop")
+
+    def __init__(self, papers_database: str = "papers.json", bibtex_file: str = "papers.bib", socket_path: str = DaemonClient.SOCKET, poll_interval: float = POLL_INTERVAL, cache_file: Optional[str] = None, syncer: Optional[SyncDatabase] = None) -> None:
+        if poll_interval <= 0:
+            raise ValueError("The poll interval must be positive.")
+
+        self.__papers_database: str = papers_database
+        self.__bibtex_file: str = bibtex_file
+        self.__socket_path: str = socket_path
+        self.__poll_interval: float = poll_interval
+        self.__storage: JournaledStorage = open_journaled_storage(papers_database)
+        # Whole entries are kept, so that the syncer reads them from memory rather than from papers_database.
+        self.__parser: PaperEntryParser = PaperEntryParser(papers_database, fields=None)
+        self.__loader: BibTeXLoader = BibTeXLoader(cache_file=cache_file, read_only_cache=True, output_file=papers_database)
+        self.__syncer: Optional[SyncDatabase] = syncer
+        # BibTeX entries already imported, by their text, so an edit to papers.bib only converts what changed.
+        # An edited entry is imported like a new one, and rejected as a duplicate of its earlier version.
+        self.__imported_blocks: set[str] = set()
+        self.__file_states: dict[str, FileState] = {}
+        self.__unsynced: bool = False
+        self.__running: bool = False
+        self.__statistics: dict[str, int] = {"added": 0, "rejected": 0, "imports": 0, "syncs": 0}
+
+    def serve(self) -> None:
+        start: float = perf_counter()
+
+        with METRICS.stage("warm_up"):
+            self.__parser.refresh()
+            self.__import_bibtex()
+            self.__sync()
+
+        for path in (self.__bibtex_file, self.__papers_database, self.__storage.journal_path):
+            self.__file_states[path] = self.__file_state(path)
+
+        print(f"Pipeline daemon ready in {perf_counter() - start:.2f}s with {len(self.__parser.entries)} papers, listening on {self.__socket_path}.")
+
+        listener: socket.socket = self.__listen()
+        selector: DefaultSelector = DefaultSelector()
+        previous_handlers: list[Any] = [signal.signal(signal_number, self.__stop_on_signal) for signal_number in (signal.SIGINT, signal.SIGTERM)]
+
+        selector.register(listener, EVENT_READ)
+        self.__running = True
+
+        try:
+            while self.__running:
+                # Requests are answered before their papers are synced, so a batch of them pays for one sync.
+                if selector.select(timeout=self.__poll_interval):
+                    self.__serve_connection(listener)
+                else:
+                    self.__poll()
+
+                if self.__unsynced:
+                    self.__sync()
+        finally:
+            for signal_number, handler in zip((signal.SIGINT, signal.SIGTERM), previous_handlers):
+                signal.signal(signal_number, handler)
+
+            selector.close()
+            listener.close()
+
+            if os.path.exists(self.__socket_path):
+                os.remove(self.__socket_path)
+
+        print("Pipeline daemon stopped.")
+
+    def stop(self) -> None:
+        self.__running = False
+
+    def __stop_on_signal(self, signal_number: int, frame: Any) -> None:
+        self.stop()
+
+    def __listen(self) -> socket.socket:
+        os.makedirs(os.path.dirname(os.path.abspath(self.__socket_path)), exist_ok=True)
+
+        if os.path.exists(self.__socket_path):
+            try:
+                DaemonClient(self.__socket_path, timeout=1.0).request({"command": "status"})
+            except (ConnectionError, OSError):
+                # Left behind by a daemon that did not shut down cleanly.
+                os.remove(self.__socket_path)
+            else:
+                raise RuntimeError(f"Another pipeline daemon is already listening on {self.__socket_path}.")
+
+        listener: socket.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind(self.__socket_path)
+        # Only the user running the daemon may submit papers.
+        os.chmod(self.__socket_path, 0o600)
+        listener.listen()
+
+        return listener
+
+    def __serve_connection(self, listener: socket.socket) -> None:
+        connection, _ = listener.accept()
+
+        with connection:
+            connection.settimeout(5.0)
+
+            try:
+                request: Any = loads(DaemonClient.read_line(connection))
+            except (ConnectionError, OSError) as e:
+                print(f"Dropping a request that could not be read: {e}")
+
+                return
+            except ValueError as e:
+                response: dict[str, Any] = {"ok": False, "error": f"Requests are JSON objects: {e}"}
+            else:
+                # A request that fails, whatever the reason, is answered with why rather than taking the daemon down.
+                try:
+                    response = {"ok": True, **self.__handle(request)}
+                except Exception as e:
+                    print(f"Could not complete a request: {e}")
+
+                    response = {"ok": False, "error": str(e)}
+
+            try:
+                connection.sendall((dumps(response, ensure_ascii=False) + "\n").encode("utf-8"))
+            except OSError as e:
+                print(f"Could not reply to a request: {e}")
+
+    def __handle(self, request: Any) -> dict[str, Any]:
+        if not isinstance(request, dict) or request.get("command") not in self.COMMANDS:
+            raise ValueError(f"Requests are JSON objects with a command, one of {", ".join(self.COMMANDS)}.")
+
+        command: str = request["command"]
+
+        with METRICS.stage(f"request_{command}"):
+            if command == "add":
+                entries: Any = request.get("entries")
+
+                if not isinstance(entries, list):
+                    raise ValueError("An add request needs a list of entries.")
+
+                self.__poll()
+
+                return {"report": self.__add([entry if isinstance(entry, dict) else None for entry in entries])}
+            elif command == "import":
+                return self.__import_bibtex()
+            elif command == "sync":
+                self.__poll()
+                self.__sync()
+
+                return {}
+            elif command == "status":
+                return {"papers": len(self.__parser.entries), "unsynced": self.__unsynced, **self.__statistics}
+            else:
+                self.stop()
+
+                return {}
+
+    def __add(self, entries: list[Optional[dict[str, Any]]]) -> list[ReportRow]:
+        report: list[ReportRow] = self.__parser.add_entries(entries)
+        accepted: int = self.__record_report(report)
+
+        print(f"{accepted} of {len(report)} submitted papers added to {self.__papers_database}.")
+
+        return report
+
+    def __record_report(self, report: list[ReportRow]) -> int:
+        accepted: int = sum(1 for _, _, status, _ in report if status == "accepted")
+
+        self.__statistics["added"] += accepted
+        self.__statistics["rejected"] += len(report) - accepted
+        self.__unsynced = self.__unsynced or accepted > 0
+        # The database changed because of this daemon, which is not a change to react to.
+        self.__file_states[self.__papers_database] = self.__file_state(self.__papers_database)
+        self.__file_states[self.__storage.journal_path] = self.__file_state(self.__storage.journal_path)
+
+        return accepted
+
+    def __poll(self) -> None:
+        if self.__changed(self.__bibtex_file):
+            self.__import_bibtex()
+
+        # Unlike a file state check, the refresh also tells papers this daemon added from those of other writers.
+        database_changed: bool = self.__changed(self.__papers_database)
+        journal_changed: bool = self.__changed(self.__storage.journal_path)
+
+        if (database_changed or journal_changed) and self.__parser.refresh():
+            print(f"{self.__papers_database} was changed by another writer; {len(self.__parser.entries)} papers loaded.")
+
+            self.__unsynced = True
+
+    def __changed(self, path: str) -> bool:
+        state: FileState = self.__file_state(path)
+        changed: bool = path in self.__file_states and self.__file_states[path] != state
+
+        self.__file_states[path] = state
+
+        return changed
+
+    @staticmethod
+    def __file_state(path: str) -> FileState:
+        try:
+            status: os.stat_result = os.stat(path)
+        except FileNotFoundError:
+            return None
+
+        return status.st_ino, status.st_size, status.st_mtime_ns
+
+    def __import_bibtex(self) -> dict[str, Any]:
+        self.__file_states[self.__bibtex_file] = self.__file_state(self.__bibtex_file)
+
+        if not os.path.isfile(self.__bibtex_file):
+            return {"converted": 0, "errors": 0, "report": []}
+
+        blocks: list[SourceEntry] = [(line, text) for line, text in BibTeXStreamReader(self.__bibtex_file).blocks() if text not in self.__imported_blocks]
+
+        if not blocks:
+            return {"converted": 0, "errors": 0, "report": []}
+
+        with METRICS.stage("conversion"):
+            results: list[ConversionResult] = self.__loader.convert_chunk(blocks)
+
+        converted: list[tuple[int, NormalisedEntry]] = [(line, entry) for line, entry, _, _ in results if entry is not None]
+
+        for line, _, error, _ in results:
+            if error is not None:
+                print(f"Skipping the BibTeX entry at {self.__bibtex_file}:{line}: {error}")
+
+        report: list[ReportRow] = self.__parser.add_normalised(converted)
+        accepted: int = self.__record_report(report)
+
+        self.__imported_blocks.update(text for _, text in blocks)
+        self.__statistics["imports"] += 1
+
+        print(f"{self.__bibtex_file}: {len(blocks)} new or changed entries, {accepted} added, {len(report) - accepted} duplicates, {len(results) - len(converted)} errors.")
+
+        return {"converted": len(converted), "errors": len(results) - len(converted), "report": report}
+
+    def __sync(self) -> None:
+        self.__unsynced = False
+
+        if self.__syncer is None:
+            return
+
+        try:
+            with METRICS.stage("sync"):
+                self.__syncer.sync_database(self.__parser.entries)
+        except (RuntimeError, ValueError, OSError) as e:
+            print(f"Sync failed and will be retried after the next change: {e}")
+
+            return
+
+        self.__statistics["syncs"] += 1
+
+
+if __name__ == "__main__":
+    argument_parser: ArgumentParser = ArgumentParser(description="Keep the papers database, its duplicate index and the deployed files up to date as papers are added.")
+    argument_parser.add_argument("--papers-database", default="papers.json", help="master database to add papers to (.json, .jsonl or .sqlite3)")
+    argument_parser.add_argument("--bibtex-file", default="papers.bib", help="BibTeX file whose new and changed entries are imported as it is edited")
+    argument_parser.add_argument("--socket", default=DaemonClient.SOCKET, help="Unix socket that add_paper.py --daemon submits papers to")
+    argument_parser.add_argument("--poll-interval", type=float, default=PipelineDaemon.POLL_INTERVAL, help="seconds between checks of the watched files")
+    argument_parser.add_argument("--cache-file", default=".cache/normalised_entries.sqlite3", help="normalised entries of bibtex_loader.py runs, reused when warming up")
+    argument_parser.add_argument("--no-sync", action="store_true", help="only keep papers_database up to date, not the deployed database")
+    argument_parser.add_argument("--index", default="_data/papers.index.json", help="facet and title/author token index of the deployed papers")
+    argument_parser.add_argument("--shards", default=None, help="also write the deployed papers as content-hashed shards to this directory")
+    argument_parser.add_argument("--related", default="_data/papers.related.json", help="top-k related papers of every deployed paper")
+    argument_parser.add_argument("--related-k", type=int, default=RelatedPapers.K, help="related papers kept per paper")
+    argument_parser.add_argument("--related-state", default=".cache/related_papers.json", help="what each sync needs to recompute only the affected neighbourhoods")
+    argument_parser.add_argument("--sync-state", default=".cache/sync_state.json", help="fingerprints of what the index, shards and related papers were last built from")
+    argument_parser.add_argument("--metrics-dir", default=None, help=f"write a per-stage JSON report here when the daemon stops (or set {PipelineMetrics.DIRECTORY_VARIABLE})")
+    argument_parser.add_argument("--profile", action="store_true", help=f"also dump cProfile and tracemalloc results (or set {PipelineMetrics.PROFILE_VARIABLE}=1)")
+
+    arguments: Namespace = argument_parser.parse_args()
+    daemon: PipelineDaemon = PipelineDaemon(
+        papers_database=arguments.papers_database,
+        bibtex_file=arguments.bibtex_file,
+        socket_path=arguments.socket,
+        poll_interval=arguments.poll_interval,
+        cache_file=arguments.cache_file if os.path.isfile(arguments.cache_file) else None,
+        syncer=None if arguments.no_sync else SyncDatabase(
+            papers_json=arguments.papers_database,
+            db_path="_data/papers.json",
+            db_backup_path="_data/papers.json.bak",
+            incremental=True,
+            index_path=arguments.index,
+            shard_directory=arguments.shards,
+            related_path=arguments.related,
+            related_state_path=arguments.related_state,
+            related_k=arguments.related_k,
+            state_path=arguments.sync_state,
+        ),
+    )
+
+    METRICS.start("pipeline_daemon", directory=arguments.metrics_dir, profile=arguments.profile)
+
+    try:
+        daemon.serve()
+    finally:
+        METRICS.finish()
@@ -0,0 +1,188 @@
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from json import dump
+from time import perf_counter
+from typing import Any, Iterable, Iterator, Optional, TypeVar
+
+import cProfile
+import os
+import resource
+import tracemalloc
+
+
+T = TypeVar("T")
+
+
+class PipelineMetrics():
+    # Set PIPELINE_METRICS to a directory to collect a report from every tool, and PIPELINE_PROFILE=1
+    # to also dump a cProfile and a tracemalloc snapshot there.
+    DIRECTORY_VARIABLE: str = "PIPELINE_METRICS"
+    PROFILE_VARIABLE: str = "PIPELINE_PROFILE"
+    TRACEMALLOC_TOP: int = 50
+
+    def __init__(self) -> None:
+        self.__tool: str = ""
+        self.__directory: Optional[str] = None
+        self.__collecting: bool = False
+        self.__profiler: Optional[cProfile.Profile] = None
+        self.__started: float = 0.0
+        self.__stages: dict[str, dict[str, float]] = {}
+        self.__counters: dict[str, dict[str, float]] = {}
+        self.__details: dict[str, Any] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.__collecting or self.__directory is not None
+
+    def start(self, tool: str, directory: Optional[str] = None, profile: bool = False) -> None:
+        self.__tool = tool
+        self.__directory = directory or os.environ.get(self.DIRECTORY_VARIABLE) or None
+        self.__started = perf_counter()
+        self.__stages.clear()
+        self.__counters.clear()
+        self.__details.clear()
+
+        if profile or os.environ.get(self.PROFILE_VARIABLE, "") not in ("", "0"):
+            self.__directory = self.__directory or "metrics"
+            self.__profiler = cProfile.Profile()
+
+            tracemalloc.start()
+            self.__profiler.enable()
+
+    def collect(self) -> None:
+        # Collects stage times and counters without a report, e.g. in a worker process whose parent merges them.
+        if self.__profiler is not None:
+            self.__profiler.disable()
+            self.__profiler = None
+
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+        self.__directory = None
+        self.__collecting = True
+        self.__stages.clear()
+        self.__counters.clear()
+        self.__details.clear()
+
+    def take(self) -> dict[str, Any]:
+        # What was collected since the last call, for merge() in another process.
+        taken: dict[str, Any] = {"stages": self.__stages, "counters": self.__counters}
+        self.__stages, self.__counters = {}, {}
+
+        return taken
+
+    def merge(self, taken: dict[str, Any]) -> None:
+        if not self.enabled:
+            return
+
+        for name, taken_stage in taken["stages"].items():
+            stage: dict[str, float] = self.__stages.setdefault(name, {"seconds": 0.0, "calls": 0})
+
+            for key, value in taken_stage.items():
+                stage[key] = max(stage.get(key, 0), value) if key.startswith("peak_") else stage.get(key, 0) + value
+
+        for stage_name, counters in taken["counters"].items():
+            for counter, value in counters.items():
+                self.count(stage_name, counter, value)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        if not self.enabled:
+            yield
+
+            return
+
+        # Traced peaks are only available with profiling on, and only meaningful for stages that do not nest.
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+
+        start: float = perf_counter()
+
+        try:
+            yield
+        finally:
+            self.add_time(name, perf_counter() - start)
+
+            stage: dict[str, float] = self.__stages[name]
+            stage["peak_rss_kib"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+            if tracemalloc.is_tracing():
+                stage["peak_traced_bytes"] = max(stage.get("peak_traced_bytes", 0), tracemalloc.get_traced_memory()[1])
+
+    def timed(self, name: str, iterable: Iterable[T]) -> Iterator[T]:
+        # Times the work done producing each item, e.g. reading and splitting a file lazily.
+        iterator: Iterator[T] = iter(iterable)
+
+        while True:
+            start: float = perf_counter()
+
+            try:
+                item: T = next(iterator)
+            except StopIteration:
+                self.add_time(name, perf_counter() - start)
+
+                return
+
+            self.add_time(name, perf_counter() - start)
+
+            yield item
+
+    def add_time(self, name: str, seconds: float) -> None:
+        if self.enabled:
+            stage: dict[str, float] = self.__stages.setdefault(name, {"seconds": 0.0, "calls": 0})
+            stage["seconds"] += seconds
+            stage["calls"] += 1
+
+    def count(self, stage: str, counter: str, value: float = 1) -> None:
+        if self.enabled:
+            counters: dict[str, float] = self.__counters.setdefault(stage, {})
+            counters[counter] = counters.get(counter, 0) + value
+
+    def record(self, name: str, details: Any) -> None:
+        if self.enabled:
+            self.__details[name] = details
+
+    def report(self) -> dict[str, Any]:
+        return {
+            "tool": self.__tool,
+            "finished": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "wall_seconds": round(perf_counter() - self.__started, 6),
+            "peak_rss_kib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+            "stages": {name: {key: round(value, 6) for key, value in stage.items()} for name, stage in self.__stages.items()},
+            "counters": self.__counters,
+            "details": self.__details,
+        }
+
+    def finish(self) -> Optional[str]:
+        if self.__directory is None:
+            return None
+
+        os.makedirs(self.__directory, exist_ok=True)
+
+        report_file: str = os.path.join(self.__directory, f"{self.__tool}.json")
+
+        if self.__profiler is not None:
+            self.__profiler.disable()
+            self.__profiler.dump_stats(os.path.join(self.__directory, f"{self.__tool}.prof"))
+            self.__save_tracemalloc_snapshot(os.path.join(self.__directory, f"{self.__tool}.tracemalloc.txt"))
+            self.__profiler = None
+
+        with open(report_file, "w", encoding="utf-8") as f:
+            dump(self.report(), f, indent=4)
+
+        print(f"Pipeline metrics written to {report_file}.")
+
+        return report_file
+
+    def __save_tracemalloc_snapshot(self, snapshot_file: str) -> None:
+        snapshot: tracemalloc.Snapshot = tracemalloc.take_snapshot()
+
+        tracemalloc.stop()
+
+        with open(snapshot_file, "w", encoding="utf-8") as f:
+            for statistic in snapshot.statistics("lineno")[:self.TRACEMALLOC_TOP]:
+                f.write(f"{statistic}\n")
+
+
+# Shared by every stage of the pipeline in this process; a no-op until start() enables it.
+METRICS: PipelineMetrics = PipelineMetrics()
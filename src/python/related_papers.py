@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+
+from argparse import ArgumentParser, Namespace
+from hashlib import sha256
+from heapq import nlargest
+from json import JSONDecodeError, dumps, load
+from math import log, sqrt
+from typing import Any, Mapping, Optional, Sequence, TypeAlias
+
+from entry_identifiers import IdentifierExtractor
+
+import os
+
+
+# (position of the related paper, similarity) for one neighbour.
+Neighbour: TypeAlias = tuple[int, float]
+
+
+class RelatedPapers():
+    # Shared authors say most about relatedness, then the formal language, title words and research area.
+    KIND_WEIGHTS: dict[str, float] = {"author": 2.0, "language": 1.5, "title": 1.0, "area": 1.0, "goal": 0.5, "venue": 0.5}
+    CUSTOM_FIELDS: tuple[str, ...] = ("area", "language", "goal")
+    PLACEHOLDERS: tuple[str, ...] = ("", "na")
+    K: int = 5
+    MINIMUM_SCORE: float = 0.05
+    # Features held by more papers than this are too common to propose candidates; they still count in the score
+    # of papers that share a rarer feature, and papers that share nothing else are not compared.
+    COMMON_FRACTION: float = 0.05
+    COMMON_MINIMUM: int = 50
+    # Neighbourhoods that did not change keep their scores while the weights of their features stay within this
+    # fraction of the weights they were scored with, and stay rare or common; papers with a feature that drifted
+    # further are rescored. Kept scores are then within about 8 * IDF_DRIFT of exact ones, so near ties may rank apart.
+    IDF_DRIFT: float = 0.02
+
+    def __init__(self, normalised_entries: Sequence[Mapping[str, Any]], k: int = K) -> None:
+        if k < 1:
+            raise ValueError("At least one related paper must be kept per paper.")
+
+        self.__k: int = k
+        self.__ids: list[str] = [str(entry["norm"]["id"]) for entry in normalised_entries]
+        self.__signatures: list[str] = []
+        self.__rows: list[dict[int, float]] = []
+        self.__norms: list[float] = []
+        self.__postings: list[list[int]] = []
+        self.__references: dict[str, tuple[float, bool]] = {}
+        self.__recomputed: int = 0
+
+        vocabulary: dict[tuple[str, str], int] = {}
+        features: list[list[int]] = []
+
+        for entry in normalised_entries:
+            entry_features: list[tuple[str, str]] = self.__features(entry["norm"])
+
+            self.__signatures.append(sha256(dumps(entry_features, ensure_ascii=False).encode("utf-8")).hexdigest()[:16])
+            features.append([vocabulary.setdefault(feature, len(vocabulary)) for feature in entry_features])
+
+        kinds: list[str] = [kind for kind, _ in vocabulary]
+        self.__keys: list[str] = [f"{kind}:{value}" for kind, value in vocabulary]
+        self.__postings = [[] for _ in vocabulary]
+
+        for row, row_features in enumerate(features):
+            for feature in row_features:
+                self.__postings[feature].append(row)
+
+        # Rarer features are stronger evidence: tf-idf style weights, compared by cosine similarity.
+        weights: list[float] = [self.KIND_WEIGHTS[kinds[feature]] * log(1.0 + len(features) / len(rows)) for feature, rows in enumerate(self.__postings)]
+        self.__weights: list[float] = weights
+        self.__common: int = max(self.COMMON_MINIMUM, int(self.COMMON_FRACTION * len(features)))
+
+        for row_features in features:
+            row: dict[int, float] = {feature: weights[feature] for feature in row_features}
+
+            self.__rows.append(row)
+            self.__norms.append(sqrt(sum(weight * weight for weight in row.values())))
+
+    def __len__(self) -> int:
+        return len(self.__rows)
+
+    @property
+    def recomputed(self) -> int:
+        return self.__recomputed
+
+    def neighbours(self, row: int) -> list[Neighbour]:
+        scores: dict[int, float] = self.__similarities(row)
+
+        return [(other, round(score, 3)) for other, score in nlargest(self.__k, scores.items(), key=lambda item: (item[1], -item[0])) if score >= self.MINIMUM_SCORE]
+
+    def compute(self, state: Optional[dict[str, Any]] = None) -> list[list[Neighbour]]:
+        previous: Optional[dict[str, list[Neighbour]]] = self.__previous_neighbours(state)
+
+        if previous is None:
+            table: list[list[Neighbour]] = [self.neighbours(row) for row in range(len(self))]
+            self.__recomputed = len(self)
+            self.__references = {key: (weight, len(rows) > self.__common) for key, weight, rows in zip(self.__keys, self.__weights, self.__postings)}
+
+            return table
+
+        affected: set[int] = self.__affected_rows(state or {}, previous)
+        position: dict[str, int] = {entry_id: row for row, entry_id in enumerate(self.__ids)}
+        self.__recomputed = len(affected)
+
+        return [
+            self.neighbours(row) if row in affected else [(position[entry_id], score) for entry_id, score in previous[self.__ids[row]]]
+            for row in range(len(self))
+        ]
+
+    def state(self, table: list[list[Neighbour]]) -> dict[str, Any]:
+        # What the next sync needs to tell which neighbourhoods changed; kept out of the deployed data.
+        return {
+            "k": self.__k,
+            "weights": self.__references,
+            "ids": self.__ids,
+            "signatures": self.__signatures,
+            "neighbours": [[(self.__ids[other], score) for other, score in neighbours] for neighbours in table],
+        }
+
+    def __features(self, norm: Mapping[str, Any]) -> list[tuple[str, str]]:
+        custom: Mapping[str, Any] = norm.get("custom") or {}
+        features: list[tuple[str, str]] = [("title", token) for token in norm.get("title_tokens", [])]
+
+        features += [("author", name) for name in IdentifierExtractor.author_names(norm)]
+        features.append(("venue", str(norm.get("venue") or "")))
+        features += [(field, str(custom[field]["text"])) for field in self.CUSTOM_FIELDS if isinstance(custom.get(field), Mapping)]
+
+        return sorted({(kind, value) for kind, value in features if value not in self.PLACEHOLDERS})
+
+    def __similarities(self, row: int) -> dict[int, float]:
+        # The row's slice of the similarity join: candidates come from its rarer features' postings,
+        # and the common features they also share are added afterwards, so candidates' scores are exact.
+        # Papers sharing only common features are never candidates, and are missed even if they would score.
+        features: dict[int, float] = self.__rows[row]
+        rare: list[int] = [feature for feature in features if len(self.__postings[feature]) <= self.__common]
+        common: list[int] = [feature for feature in features if len(self.__postings[feature]) > self.__common]
+        dot: dict[int, float] = {}
+
+        for feature in rare:
+            weight: float = features[feature] * features[feature]
+
+            for other in self.__postings[feature]:
+                dot[other] = dot.get(other, 0.0) + weight
+
+        dot.pop(row, None)
+
+        for other in dot:
+            dot[other] += sum(features[feature] * features[feature] for feature in common if feature in self.__rows[other])
+
+        return {other: product / (self.__norms[row] * self.__norms[other]) for other, product in dot.items() if self.__norms[other]}
+
+    def __previous_neighbours(self, state: Optional[dict[str, Any]]) -> Optional[dict[str, list[Neighbour]]]:
+        if not state or state.get("k") != self.__k or "weights" not in state or len(set(self.__ids)) != len(self.__ids):
+            return None
+
+        return {entry_id: [(other, score) for other, score in neighbours] for entry_id, neighbours in zip(state["ids"], state["neighbours"])}
+
+    def __affected_rows(self, state: dict[str, Any], previous: dict[str, list[Neighbour]]) -> set[int]:
+        old_signatures: dict[str, str] = dict(zip(state["ids"], state["signatures"]))
+        current: set[str] = set(self.__ids)
+        drifted: set[int] = self.__drifted_features(state["weights"])
+        changed: set[int] = {
+            row for row, entry_id in enumerate(self.__ids)
+            if old_signatures.get(entry_id) != self.__signatures[row] or any(feature in drifted for feature in self.__rows[row])
+        }
+        gone: set[str] = {entry_id for entry_id in old_signatures if entry_id not in current} | {self.__ids[row] for row in changed}
+        affected: set[int] = set(changed)
+
+        # A paper's neighbourhood changes when one of its neighbours changed or went, or when a changed paper now outranks its last neighbour.
+        for row, entry_id in enumerate(self.__ids):
+            if row not in changed and any(other in gone for other, _ in previous[entry_id]):
+                affected.add(row)
+
+        for row in changed:
+            for other, score in self.__similarities(row).items():
+                neighbours: list[Neighbour] = previous.get(self.__ids[other], [])
+
+                if other not in affected and score >= self.MINIMUM_SCORE and (len(neighbours) < self.__k or round(score, 3) >= neighbours[-1][1]):
+                    affected.add(other)
+
+        return affected
+
+    def __drifted_features(self, references: dict[str, tuple[float, bool]]) -> set[int]:
+        # A feature's reference is its weight, and whether it was common, when the papers holding it were last scored.
+        # It is kept while the weight stays within IDF_DRIFT of it, so small drifts cannot add up unnoticed over many syncs.
+        drifted: set[int] = set()
+        self.__references = {}
+
+        for feature, (key, weight, rows) in enumerate(zip(self.__keys, self.__weights, self.__postings)):
+            reference: Optional[tuple[float, bool]] = references.get(key)
+            common: bool = len(rows) > self.__common
+
+            if reference is None or abs(weight - reference[0]) > self.IDF_DRIFT * reference[0] or common != reference[1]:
+                drifted.add(feature)
+                reference = (weight, common)
+
+            self.__references[key] = reference
+
+        return drifted
+
+
+def load_related_state(state_file: str) -> Optional[dict[str, Any]]:
+    if not os.path.isfile(state_file):
+        return None
+
+    try:
+        with open(state_file, "r", encoding="utf-8") as f:
+            return load(f)
+    except JSONDecodeError:
+        return None
+
+
+if __name__ == "__main__":
+    argument_parser: ArgumentParser = ArgumentParser(description="Show the papers most related to one paper of papers.json.")
+    argument_parser.add_argument("paper_id")
+    argument_parser.add_argument("--papers-json", default="papers.json")
+    argument_parser.add_argument("-k", type=int, default=RelatedPapers.K)
+
+    arguments: Namespace = argument_parser.parse_args()
+
+    with open(arguments.papers_json, "r", encoding="utf-8") as papers_file:
+        papers: list[dict[str, Any]] = load(papers_file).get("entries", [])
+
+    ids: list[str] = [str(paper["norm"]["id"]) for paper in papers]
+
+    if arguments.paper_id not in ids:
+        raise ValueError(f"No paper with id {arguments.paper_id!r} in {arguments.papers_json}.")
+
+    related: RelatedPapers = RelatedPapers(papers, k=arguments.k)
+
+    for other, score in related.neighbours(ids.index(arguments.paper_id)):
+        print(f"{score:.3f}  {ids[other]}  {papers[other]["raw"].get("title", "")}")
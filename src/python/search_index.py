@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+
+from argparse import ArgumentParser, Namespace
+from hashlib import sha256
+from math import log
+from re import Pattern, compile as re_compile
+from time import perf_counter
+from typing import Any, Iterable, Mapping, Optional, Sequence, TypeAlias
+
+from database_journal import JournaledStorage, open_journaled_storage
+from entry_store import EntryStore
+from normaliser import Normaliser
+
+import os
+import sqlite3
+
+
+# (paper id, BM25 score, title) of one search result.
+SearchResult: TypeAlias = tuple[str, float, str]
+# Token -> positions within one field of one paper.
+FieldPostings: TypeAlias = dict[str, list[int]]
+
+
+class SearchIndex():
+    # Titles say most about what a paper covers; venues and curated fields (area, goal, language...) count once.
+    FIELD_WEIGHTS: dict[str, float] = {"title": 3.0, "venue": 1.0}
+    CUSTOM_WEIGHT: float = 1.0
+    K1: float = 1.2
+    B: float = 0.75
+    PHRASE_PATTERN: Pattern[str] = re_compile(r"\"([^\"]*)\"")
+
+    def __init__(self, index_file: str) -> None:
+        if os.path.dirname(index_file):
+            os.makedirs(os.path.dirname(index_file), exist_ok=True)
+
+        self.__connection: sqlite3.Connection = sqlite3.connect(index_file)
+        self.__connection.execute("PRAGMA journal_mode=WAL")
+
+        # Indexes written before documents had fingerprints are rebuilt from scratch.
+        if self.__connection.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'documents'").fetchone() is not None and "fingerprint" not in {column for _, column, *_ in self.__connection.execute("PRAGMA table_info(documents)")}:
+            self.__connection.execute("DROP TABLE documents")
+            self.__connection.execute("DROP TABLE IF EXISTS postings")
+
+        self.__connection.execute("CREATE TABLE IF NOT EXISTS documents (doc INTEGER PRIMARY KEY, id TEXT NOT NULL, title TEXT NOT NULL, length REAL NOT NULL, fingerprint TEXT NOT NULL)")
+        # Ranking reads only frequencies; positions are decoded for phrase checks of the papers that ranked.
+        self.__connection.execute("CREATE TABLE IF NOT EXISTS postings (term TEXT NOT NULL, doc INTEGER NOT NULL, field TEXT NOT NULL, frequency INTEGER NOT NULL, positions TEXT NOT NULL)")
+        self.__connection.execute("CREATE INDEX IF NOT EXISTS postings_term ON postings (term, doc)")
+        self.__connection.commit()
+        self.__normaliser: Normaliser = Normaliser()
+        self.__lengths: Optional[list[float]] = None
+
+    @staticmethod
+    def index_file_for(papers_database: str) -> str:
+        # papers.json -> papers.search.sqlite3, whatever the storage format.
+        return f"{os.path.splitext(papers_database)[0]}.search.sqlite3"
+
+    def __len__(self) -> int:
+        return self.__connection.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def close(self) -> None:
+        self.__connection.close()
+
+    def sync(self, entries: Sequence[Mapping[str, Any]], changed: Optional[Iterable[int]] = None) -> int:
+        # Papers are mostly appended, so when the indexed ids are a prefix of the database only the new
+        # entries and those whose indexed fields were edited are indexed; papers that were removed or
+        # reordered rebuild the index. A writer that kept the index up to date passes the positions it
+        # changed, and only those are fingerprinted; without them every indexed paper is.
+        indexed_ids: list[str] = [entry_id for (entry_id,) in self.__connection.execute("SELECT id FROM documents ORDER BY doc")]
+
+        if len(indexed_ids) > len(entries) or any(entries[doc]["norm"]["id"] != entry_id for doc, entry_id in enumerate(indexed_ids)):
+            with self.__connection:
+                self.__connection.execute("DELETE FROM documents")
+                self.__connection.execute("DELETE FROM postings")
+
+            indexed_ids = []
+
+        if changed is None:
+            indexed: dict[int, str] = dict(self.__connection.execute("SELECT doc, fingerprint FROM documents"))
+        else:
+            checked: list[int] = sorted({doc for doc in changed if 0 <= doc < len(indexed_ids)})
+            indexed = dict(self.__connection.execute("SELECT doc, fingerprint FROM documents WHERE doc IN (SELECT value FROM json_each(?))", (f"[{",".join(map(str, checked))}]",)))
+
+        edited: list[int] = [doc for doc, fingerprint in sorted(indexed.items()) if self.__fingerprint(entries[doc]) != fingerprint]
+        indexing: list[int] = edited + list(range(len(indexed_ids), len(entries)))
+
+        self.__add([(doc, entries[doc], self.__fingerprint(entries[doc])) for doc in indexing], replaced=edited)
+
+        return len(indexing)
+
+    def search(self, query: str, limit: int = 10) -> list[SearchResult]:
+        # Words are ranked with BM25 over all fields; a "quoted phrase" must also appear as such in one field.
+        phrases: list[list[str]] = [tokens for tokens in map(self.__tokenise, self.PHRASE_PATTERN.findall(query)) if tokens]
+        terms: list[str] = list(dict.fromkeys(self.__tokenise(self.PHRASE_PATTERN.sub(" ", query)) + [term for phrase in phrases for term in phrase]))
+        postings: dict[str, dict[int, dict[str, int]]] = {term: self.__postings(term) for term in terms}
+        lengths: list[float] = self.__document_lengths()
+
+        if not terms or not lengths:
+            return []
+
+        average_length: float = sum(lengths) / len(lengths)
+        scores: dict[int, float] = {}
+
+        for term, term_postings in postings.items():
+            idf: float = log(1.0 + (len(lengths) - len(term_postings) + 0.5) / (len(term_postings) + 0.5))
+
+            for doc, fields in term_postings.items():
+                frequency: float = sum(self.__weight(field) * field_frequency for field, field_frequency in fields.items())
+                norm: float = self.K1 * (1.0 - self.B + self.B * lengths[doc] / average_length)
+
+                scores[doc] = scores.get(doc, 0.0) + idf * frequency * (self.K1 + 1.0) / (frequency + norm)
+
+        for phrase in phrases:
+            matches: set[int] = self.__phrase_matches(phrase, set(scores))
+            scores = {doc: score for doc, score in scores.items() if doc in matches}
+
+        ranked: list[tuple[int, float]] = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:limit]
+        documents: dict[int, tuple[str, str]] = self.__documents([doc for doc, _ in ranked])
+
+        return [(documents[doc][0], round(score, 4), documents[doc][1]) for doc, score in ranked]
+
+    def __add(self, entries: Iterable[tuple[int, Mapping[str, Any], str]], replaced: list[int]) -> None:
+        documents: list[tuple[int, str, str, float, str]] = []
+        postings: list[tuple[str, int, str, int, str]] = []
+
+        for doc, entry, fingerprint in entries:
+            fields: dict[str, FieldPostings] = self.__fields(entry["norm"])
+
+            for field, field_postings in fields.items():
+                for term, positions in field_postings.items():
+                    postings.append((term, doc, field, len(positions), ",".join(map(str, positions))))
+
+            length: float = sum(self.__weight(field) * sum(map(len, field_postings.values())) for field, field_postings in fields.items())
+
+            documents.append((doc, str(entry["norm"]["id"]), str(entry["raw"].get("title", "")), length, fingerprint))
+
+        # The postings of edited papers are replaced in the same transaction, in one pass over the table.
+        with self.__connection:
+            if replaced:
+                self.__connection.execute("DELETE FROM postings WHERE doc IN (SELECT value FROM json_each(?))", (f"[{",".join(map(str, replaced))}]",))
+
+            self.__connection.executemany("INSERT OR REPLACE INTO documents (doc, id, title, length, fingerprint) VALUES (?, ?, ?, ?, ?)", documents)
+            self.__connection.executemany("INSERT INTO postings (term, doc, field, frequency, positions) VALUES (?, ?, ?, ?, ?)", postings)
+
+        self.__lengths = None
+
+    def __token_lists(self, norm: Mapping[str, Any]) -> dict[str, list[str]]:
+        token_lists: dict[str, list[str]] = {"title": list(norm.get("title_tokens", [])), "venue": list(norm.get("venue_tokens", []))}
+
+        for key, value in (norm.get("custom") or {}).items():
+            if isinstance(value, Mapping):
+                token_lists[f"custom.{key}"] = list(value.get("tokens", []))
+
+        return token_lists
+
+    def __fingerprint(self, entry: Mapping[str, Any]) -> str:
+        # Everything a document is indexed and shown by; a paper whose fingerprint changed is indexed again.
+        parts: list[str] = [str(entry["norm"]["id"]), str(entry["raw"].get("title", ""))]
+
+        for field, tokens in self.__token_lists(entry["norm"]).items():
+            parts.append(f"{field}:{" ".join(tokens)}")
+
+        return sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+    def __fields(self, norm: Mapping[str, Any]) -> dict[str, FieldPostings]:
+        fields: dict[str, FieldPostings] = {}
+
+        for field, tokens in self.__token_lists(norm).items():
+            for position, token in enumerate(tokens):
+                fields.setdefault(field, {}).setdefault(token, []).append(position)
+
+        return fields
+
+    def __weight(self, field: str) -> float:
+        return self.FIELD_WEIGHTS.get(field, self.CUSTOM_WEIGHT)
+
+    def __tokenise(self, text: str) -> list[str]:
+        # Queries go through the same normaliser as titles, so accents, case and LaTeX match the index.
+        return list(self.__normaliser.normalise_bibtex_entry({"id": "query", "entrytype": "query", "title": text})["norm"]["title_tokens"])
+
+    def __postings(self, term: str) -> dict[int, dict[str, int]]:
+        postings: dict[int, dict[str, int]] = {}
+
+        for doc, field, frequency in self.__connection.execute("SELECT doc, field, frequency FROM postings WHERE term = ?", (term,)):
+            postings.setdefault(doc, {})[field] = frequency
+
+        return postings
+
+    def __positions(self, term: str, docs: set[int]) -> dict[int, dict[str, set[int]]]:
+        positions: dict[int, dict[str, set[int]]] = {}
+
+        for doc, field, field_positions in self.__connection.execute("SELECT doc, field, positions FROM postings WHERE term = ?", (term,)):
+            if doc in docs:
+                positions.setdefault(doc, {})[field] = {int(position) for position in field_positions.split(",")}
+
+        return positions
+
+    def __phrase_matches(self, phrase: list[str], docs: set[int]) -> set[int]:
+        positions: list[dict[int, dict[str, set[int]]]] = [self.__positions(term, docs) for term in phrase]
+        matches: set[int] = set()
+
+        for doc in set(positions[0]).intersection(*positions[1:]):
+            for field, first_positions in positions[0][doc].items():
+                following: list[set[int]] = [term_positions[doc].get(field, set()) for term_positions in positions[1:]]
+
+                if any(all(position + offset in term_field for offset, term_field in enumerate(following, start=1)) for position in first_positions):
+                    matches.add(doc)
+
+                    break
+
+        return matches
+
+    def __document_lengths(self) -> list[float]:
+        if self.__lengths is None:
+            self.__lengths = [length for (length,) in self.__connection.execute("SELECT length FROM documents ORDER BY doc")]
+
+        return self.__lengths
+
+    def __documents(self, docs: list[int]) -> dict[int, tuple[str, str]]:
+        rows: Iterable[tuple[int, str, str]] = self.__connection.execute(f"SELECT doc, id, title FROM documents WHERE doc IN ({", ".join("?" * len(docs))})", docs)
+
+        return {doc: (entry_id, title) for doc, entry_id, title in rows}
+
+
+def update_search_index(papers_database: str, entries: Sequence[Mapping[str, Any]], changed: Optional[Iterable[int]] = None) -> None:
+    search_index: SearchIndex = SearchIndex(SearchIndex.index_file_for(papers_database))
+
+    try:
+        search_index.sync(entries, changed)
+    finally:
+        search_index.close()
+
+
+if __name__ == "__main__":
+    argument_parser: ArgumentParser = ArgumentParser(description="Ranked search of the master database by title, venue and curated fields.")
+    argument_parser.add_argument("query", nargs="*", help="words to rank by; \"quoted phrases\" must appear as written")
+    argument_parser.add_argument("--papers-database", default="papers.json", help="master database whose index to search (.json, .jsonl or .sqlite3)")
+    argument_parser.add_argument("--limit", type=int, default=10)
+    argument_parser.add_argument("--no-update", action="store_true", help="search the index as it is, without first indexing new papers")
+
+    arguments: Namespace = argument_parser.parse_args()
+    search_index: SearchIndex = SearchIndex(SearchIndex.index_file_for(arguments.papers_database))
+
+    try:
+        if not arguments.no_update:
+            storage: JournaledStorage = open_journaled_storage(arguments.papers_database)
+
+            if not storage.exists():
+                raise FileNotFoundError(f"The database {arguments.papers_database} does not exist.")
+
+            indexed: int = search_index.sync(EntryStore(storage.entries()))
+
+            if indexed:
+                print(f"Indexed {indexed} papers.")
+
+        start: float = perf_counter()
+        results: list[SearchResult] = search_index.search(" ".join(arguments.query), limit=arguments.limit)
+        elapsed: float = perf_counter() - start
+
+        for rank, (entry_id, score, title) in enumerate(results, start=1):
+            print(f"{rank:>3}. {score:>7.3f}  {entry_id}  {title}")
+
+        print(f"{len(results)} results in {elapsed * 1000:.1f} ms.")
+    finally:
+        search_index.close()
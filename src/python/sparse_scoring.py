@@ -0,0 +1,71 @@
+from array import array
+from bisect import bisect_right
+from typing import Hashable, Iterable
+
+
+class SparseBinaryMatrix():
+    def __init__(self, rows: Iterable[Iterable[Hashable]]) -> None:
+        self.__vocabulary: dict[Hashable, int] = {}
+        self.__indptr: array[int] = array("q", [0])
+        self.__indices: array[int] = array("q")
+
+        for row in rows:
+            columns: list[int] = sorted({self.__vocabulary.setdefault(value, len(self.__vocabulary)) for value in row})
+
+            self.__indices.extend(columns)
+            self.__indptr.append(len(self.__indices))
+
+        self.__column_rows: list[array[int]] = [array("q") for _ in range(len(self.__vocabulary))]
+
+        # Rows are visited in order, so every column's row list ends up sorted.
+        for row in range(len(self)):
+            for column in self.row(row):
+                self.__column_rows[column].append(row)
+
+    def __len__(self) -> int:
+        return len(self.__indptr) - 1
+
+    @property
+    def vocabulary_size(self) -> int:
+        return len(self.__vocabulary)
+
+    @property
+    def nnz(self) -> int:
+        return len(self.__indices)
+
+    def row(self, row: int) -> array[int]:
+        return self.__indices[self.__indptr[row]:self.__indptr[row + 1]]
+
+    def row_size(self, row: int) -> int:
+        return self.__indptr[row + 1] - self.__indptr[row]
+
+    def upper_products(self, row: int) -> dict[int, int]:
+        # Row `row` of A·Aᵀ restricted to the upper triangle: shared columns with every later row.
+        products: dict[int, int] = {}
+
+        for column in self.row(row):
+            rows: array[int] = self.__column_rows[column]
+
+            for other in rows[bisect_right(rows, row):]:
+                products[other] = products.get(other, 0) + 1
+
+        return products
+
+    def product(self, row: int, other: int) -> int:
+        a: array[int] = self.row(row)
+        b: array[int] = self.row(other)
+        i: int = 0
+        j: int = 0
+        shared: int = 0
+
+        while i < len(a) and j < len(b):
+            if a[i] == b[j]:
+                shared += 1
+                i += 1
+                j += 1
+            elif a[i] < b[j]:
+                i += 1
+            else:
+                j += 1
+
+        return shared
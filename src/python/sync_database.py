@@ -1,26 +1,65 @@
 #!/usr/bin/env python3
 
-from json import load, dump
+from argparse import ArgumentParser, Namespace
+from hashlib import sha256
+from json import JSONDecodeError, load, dump, dumps
+from typing import Any, Callable, Optional, Sequence, TypeAlias
 
+from database_journal import JournaledStorage, open_journaled_storage
+from database_storage import write_atomically
+from facet_index import FacetIndex
 from normaliser import NormalisedEntry
+from pipeline_metrics import METRICS, PipelineMetrics
+from related_papers import Neighbour, RelatedPapers, load_related_state
 
 import os
 
 
+# Ids of the deployed entries that were "added", "removed" or "modified" by a sync.
+ChangeSet: TypeAlias = dict[str, list[str]]
+
+
 class SyncDatabase():
-    def __init__(self, papers_json: str, db_path: str, db_backup_path: str) -> None:
+    # Papers per shard; the same as the page size of the browse view, so the first page is one request.
+    SHARD_SIZE: int = 20
+    MANIFEST_FILE: str = "manifest.json"
+    # What the deployed list, the filter index and the related papers read of each entry.
+    FIELDS: tuple[str, ...] = ("raw", "norm.id", "norm.title_tokens", "norm.authors", "norm.venue", "norm.custom")
+
+    def __init__(self, papers_json: str, db_path: str, db_backup_path: str, incremental: bool = False, change_set_path: Optional[str] = None, index_path: Optional[str] = None, shard_directory: Optional[str] = None, shard_size: int = SHARD_SIZE, related_path: Optional[str] = None, related_state_path: Optional[str] = None, related_k: int = RelatedPapers.K, state_path: Optional[str] = None) -> None:
+        if shard_size < 1:
+            raise ValueError("Shards must hold at least one paper.")
+
         self.__papers_json: str = papers_json
+        self.__storage: JournaledStorage = open_journaled_storage(papers_json)
         self.__db_path: str = db_path
         self.__db_backup_path: str = db_backup_path
+        self.__incremental: bool = incremental
+        self.__change_set_path: Optional[str] = change_set_path
+        self.__index_path: Optional[str] = index_path
+        self.__shard_directory: Optional[str] = shard_directory
+        self.__shard_size: int = shard_size
+        self.__related_path: Optional[str] = related_path
+        self.__related_state_path: Optional[str] = related_state_path
+        self.__related_k: int = related_k
+        self.__state_path: Optional[str] = state_path
+        # Fingerprint of the entries and settings each derived output was last written from.
+        self.__output_fingerprints: Optional[dict[str, str]] = None
+        # Fingerprints of the deployed database as last written, valid while its file state is unchanged.
+        self.__deployed_state: Optional[tuple[int, int, int]] = None
+        self.__deployed_fingerprints: list[tuple[str, str]] = []
 
-    def sync_database(self) -> None:
+    def sync_database(self, entries: Optional[Sequence[NormalisedEntry]] = None) -> None:
+        # Entries already held in memory, such as by the pipeline daemon, are synced without reading papers_json again.
         if not os.path.isfile(self.__papers_json):
             raise FileNotFoundError(f"The papers JSON file {self.__papers_json} does not exist.")
         elif self.__is_papers_json_empty():
             raise ValueError(f"The papers JSON file {self.__papers_json} is empty.")
+        elif self.__incremental:
+            self.__update_database_incrementally(entries)
         else:
             self.__backup_database()
-            self.__update_database()
+            self.__update_database(entries)
 
     def __is_papers_json_empty(self) -> bool:
         return os.path.getsize(self.__papers_json) == 0
@@ -37,31 +76,282 @@ class SyncDatabase():
 
             os.remove(self.__db_backup_path)
 
-    def __update_database(self) -> None:
-        try:
-            papers: list[dict[str, str]] = []
+    def __read_entries(self, entries: Optional[Sequence[NormalisedEntry]]) -> list[NormalisedEntry]:
+        return list(self.__storage.project(self.FIELDS)) if entries is None else list(entries)
 
-            with open(self.__papers_json, "r") as papers_file:
-                papers_data: dict[str, list[NormalisedEntry]] = load(papers_file)
+    def __update_database(self, source_entries: Optional[Sequence[NormalisedEntry]]) -> None:
+        try:
+            with METRICS.stage("database_read"):
+                entries: list[NormalisedEntry] = self.__read_entries(source_entries)
+                papers: list[dict[str, str]] = [paper["raw"] for paper in entries]
 
-                for paper in papers_data["entries"]:
-                    papers.append(paper["raw"])
+            METRICS.count("database_read", "entries", len(papers))
 
-            with open(self.__db_path, "w", encoding="utf-8") as db_file:
+            with METRICS.stage("database_write"), open(self.__db_path, "w", encoding="utf-8") as db_file:
                 dump(papers, db_file, indent=4, ensure_ascii=False)
-
-            print(f"Database successfully updated at {self.__db_path}.")
         except Exception as e:
-            os.replace(self.__db_backup_path, self.__db_path)
+            # Only a database that was not written is rolled back, and only when there is a backup to roll back to.
+            if os.path.isfile(self.__db_backup_path):
+                os.replace(self.__db_backup_path, self.__db_path)
 
             raise RuntimeError(f"Failed to update the database from {self.__papers_json}: {e}") from e
 
+        print(f"Database successfully updated at {self.__db_path}.")
+
+        self.__save_outputs(entries, papers, rebuild=True)
+
+    def __update_database_incrementally(self, source_entries: Optional[Sequence[NormalisedEntry]]) -> None:
+        try:
+            with METRICS.stage("database_read"):
+                entries: list[NormalisedEntry] = self.__read_entries(source_entries)
+                papers: list[dict[str, Any]] = [paper["raw"] for paper in entries]
+
+            METRICS.count("database_read", "entries", len(papers))
+
+            with METRICS.stage("fingerprinting"):
+                fingerprints: list[tuple[str, str]] = [self.__fingerprint(paper) for paper in papers]
+                deployed_fingerprints: Optional[list[tuple[str, str]]] = self.__load_deployed_fingerprints()
+
+            if deployed_fingerprints is not None and fingerprints == deployed_fingerprints:
+                print(f"Database at {self.__db_path} is already up to date.")
+
+                # A run that failed after writing the database, or changed settings, still leaves outputs to rebuild.
+                self.__save_outputs(entries, papers, rebuild=False)
+                # The change set of an earlier run must not be applied again.
+                self.__save_change_set({"added": [], "removed": [], "modified": []})
+
+                return
+
+            change_set: ChangeSet = self.__change_set(deployed_fingerprints or [], fingerprints)
+
+            with METRICS.stage("database_write"):
+                write_atomically(self.__db_path, lambda target_file: target_file.write(dumps(papers, indent=4, ensure_ascii=False)))
+
+            self.__deployed_state, self.__deployed_fingerprints = self.__file_state(self.__db_path), fingerprints
+
+            for change, paper_ids in change_set.items():
+                METRICS.count("database_write", change, len(paper_ids))
+
+            print(f"Database successfully updated at {self.__db_path}: {len(change_set["added"])} added, {len(change_set["removed"])} removed, {len(change_set["modified"])} modified.")
+
+            self.__save_outputs(entries, papers, rebuild=False)
+            self.__save_change_set(change_set)
+        except Exception as e:
+            raise RuntimeError(f"Failed to update the database from {self.__papers_json}: {e}") from e
+
+    def __save_change_set(self, change_set: ChangeSet) -> None:
+        if self.__change_set_path is not None:
+            with open(self.__change_set_path, "w", encoding="utf-8") as change_set_file:
+                dump(change_set, change_set_file, ensure_ascii=False)
+
+    def __save_outputs(self, entries: list[NormalisedEntry], papers: list[dict[str, Any]], rebuild: bool) -> None:
+        # Each output is rewritten unless it exists and was last written from the same entries and settings.
+        # Its fingerprint is recorded only once it is written, so an interrupted sync redoes the rest.
+        if self.__index_path is None and self.__shard_directory is None and self.__related_path is None:
+            return
+
+        with METRICS.stage("fingerprinting"):
+            digest: Any = sha256()
+
+            # Entries held in an EntryStore are mappings rather than dicts; they hash the same as the dicts they stand for.
+            for entry in entries:
+                digest.update(dumps(entry, sort_keys=True, ensure_ascii=False, default=dict).encode("utf-8") + b"\n")
+
+        outputs: dict[str, tuple[Optional[str], list[Any], Callable[[], None]]] = {
+            "index": (self.__index_path, [], lambda: self.__save_index(entries)),
+            "shards": (None if self.__shard_directory is None else os.path.join(self.__shard_directory, self.MANIFEST_FILE), [self.__shard_size], lambda: self.__save_shards(papers)),
+            "related": (self.__related_path, [self.__related_k], lambda: self.__save_related(entries)),
+        }
+        written: dict[str, str] = self.__load_output_fingerprints()
+
+        for name, (path, settings, save) in outputs.items():
+            if path is None:
+                continue
+
+            fingerprint: str = sha256(dumps([name, digest.hexdigest(), *settings]).encode("utf-8")).hexdigest()
+
+            if not rebuild and os.path.isfile(path) and written.get(name) == fingerprint:
+                continue
+
+            save()
+            written[name] = fingerprint
+            self.__save_output_fingerprints(written)
+
+    def __load_output_fingerprints(self) -> dict[str, str]:
+        if self.__output_fingerprints is None:
+            self.__output_fingerprints = {}
+
+            if self.__state_path is not None and os.path.isfile(self.__state_path):
+                try:
+                    with open(self.__state_path, "r", encoding="utf-8") as state_file:
+                        state: Any = load(state_file)
+                except JSONDecodeError:
+                    state = None
+
+                if isinstance(state, dict) and isinstance(state.get("outputs"), dict):
+                    self.__output_fingerprints = state["outputs"]
+
+        return self.__output_fingerprints
+
+    def __save_output_fingerprints(self, fingerprints: dict[str, str]) -> None:
+        self.__output_fingerprints = fingerprints
+
+        if self.__state_path is not None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.__state_path)), exist_ok=True)
+            write_atomically(self.__state_path, lambda target_file: target_file.write(dumps({"outputs": fingerprints})))
+
+    def __save_index(self, entries: list[NormalisedEntry]) -> None:
+        if self.__index_path is None:
+            return
+
+        with METRICS.stage("indexing"):
+            facet_index: FacetIndex = FacetIndex(entries)
+
+            write_atomically(self.__index_path, lambda target_file: target_file.write(dumps(facet_index.to_dict(), ensure_ascii=False, separators=(",", ":"))))
+
+        print(f"Filter index of {len(facet_index)} papers written to {self.__index_path}.")
+
+    def __save_shards(self, papers: list[dict[str, Any]]) -> None:
+        if self.__shard_directory is None:
+            return
+
+        os.makedirs(self.__shard_directory, exist_ok=True)
+
+        shards: list[dict[str, Any]] = []
+        written: int = 0
+
+        # Shards are named by their content, so one that did not change keeps its name and stays cached.
+        with METRICS.stage("sharding"):
+            for start in range(0, len(papers), self.__shard_size):
+                content: str = dumps(papers[start:start + self.__shard_size], ensure_ascii=False, separators=(",", ":"))
+                shard_file: str = f"papers-{sha256(content.encode("utf-8")).hexdigest()[:16]}.json"
+
+                if not os.path.isfile(os.path.join(self.__shard_directory, shard_file)):
+                    write_atomically(os.path.join(self.__shard_directory, shard_file), lambda target_file: target_file.write(content))
+                    written += 1
+
+                shards.append({"file": shard_file, "start": start, "count": min(self.__shard_size, len(papers) - start)})
+
+            manifest: dict[str, Any] = {"version": 1, "size": len(papers), "shard_size": self.__shard_size, "shards": shards}
+
+            write_atomically(os.path.join(self.__shard_directory, self.MANIFEST_FILE), lambda target_file: target_file.write(dumps(manifest, separators=(",", ":"))))
+
+            current: set[str] = {shard["file"] for shard in shards}
+
+            for shard_file in os.listdir(self.__shard_directory):
+                if shard_file.startswith("papers-") and shard_file.endswith(".json") and shard_file not in current:
+                    os.remove(os.path.join(self.__shard_directory, shard_file))
+
+        METRICS.count("sharding", "shards", len(shards))
+        METRICS.count("sharding", "written", written)
+
+        print(f"{len(shards)} shards of {self.__shard_size} papers in {self.__shard_directory}, {written} of them new.")
+
+    def __save_related(self, entries: list[NormalisedEntry]) -> None:
+        if self.__related_path is None:
+            return
+
+        # Only the neighbourhoods touched by added, changed or removed papers are recomputed when the state of the last sync is at hand.
+        with METRICS.stage("related_papers"):
+            related: RelatedPapers = RelatedPapers(entries, k=self.__related_k)
+            state: Optional[dict[str, Any]] = None if self.__related_state_path is None else load_related_state(self.__related_state_path)
+            table: list[list[Neighbour]] = related.compute(state)
+            neighbours: dict[str, Any] = {"version": 1, "size": len(related), "k": self.__related_k, "neighbours": table}
+
+            write_atomically(self.__related_path, lambda target_file: target_file.write(dumps(neighbours, separators=(",", ":"))))
+
+            if self.__related_state_path is not None:
+                os.makedirs(os.path.dirname(os.path.abspath(self.__related_state_path)), exist_ok=True)
+                write_atomically(self.__related_state_path, lambda target_file: target_file.write(dumps(related.state(table), ensure_ascii=False, separators=(",", ":"))))
+
+        METRICS.count("related_papers", "recomputed", related.recomputed)
+
+        print(f"Related papers of {len(related)} papers written to {self.__related_path}, {related.recomputed} neighbourhoods recomputed.")
+
+    def __load_deployed_papers(self) -> Optional[list[dict[str, Any]]]:
+        if not os.path.isfile(self.__db_path):
+            return None
+
+        try:
+            with open(self.__db_path, "r", encoding="utf-8") as db_file:
+                deployed: Any = load(db_file)
+        except JSONDecodeError:
+            print(f"The database at {self.__db_path} is not valid JSON and will be rewritten.")
+
+            return None
+
+        return deployed if isinstance(deployed, list) else None
+
+    def __load_deployed_fingerprints(self) -> Optional[list[tuple[str, str]]]:
+        # A long-running syncer skips reading back the database it wrote itself.
+        if self.__deployed_state is not None and self.__deployed_state == self.__file_state(self.__db_path):
+            return self.__deployed_fingerprints
+
+        deployed: Optional[list[dict[str, Any]]] = self.__load_deployed_papers()
+
+        return None if deployed is None else [self.__fingerprint(paper) for paper in deployed]
+
+    @staticmethod
+    def __file_state(path: str) -> Optional[tuple[int, int, int]]:
+        if not os.path.isfile(path):
+            return None
+
+        status: os.stat_result = os.stat(path)
+
+        return status.st_ino, status.st_size, status.st_mtime_ns
+
+    @staticmethod
+    def __fingerprint(paper: dict[str, Any]) -> tuple[str, str]:
+        canonical: str = dumps(paper, sort_keys=True, ensure_ascii=False)
+
+        return str(paper.get("id", "")), sha256(canonical.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def __change_set(old: list[tuple[str, str]], new: list[tuple[str, str]]) -> ChangeSet:
+        old_by_id: dict[str, str] = dict(old)
+        new_by_id: dict[str, str] = dict(new)
+
+        return {
+            "added": [paper_id for paper_id in new_by_id if paper_id not in old_by_id],
+            "removed": [paper_id for paper_id in old_by_id if paper_id not in new_by_id],
+            "modified": [paper_id for paper_id, fingerprint in new_by_id.items() if paper_id in old_by_id and old_by_id[paper_id] != fingerprint],
+        }
+
 
 if __name__ == "__main__":
+    argument_parser: ArgumentParser = ArgumentParser(description="Sync the raw entries of papers.json into the deployed database.")
+    argument_parser.add_argument("--incremental", action="store_true", help="only rewrite the deployed database when entries changed, atomically and without a backup")
+    argument_parser.add_argument("--papers-database", default="papers.json", help="master database to sync from (.json, .jsonl or .sqlite3)")
+    argument_parser.add_argument("--change-set", default=None, help="write the added/removed/modified ids of an incremental sync to this JSON file")
+    argument_parser.add_argument("--index", default="_data/papers.index.json", help="facet and title/author token index of the deployed papers, for the frontend")
+    argument_parser.add_argument("--shards", default=None, help="also write the deployed papers as minified, content-hashed shards with a manifest to this directory")
+    argument_parser.add_argument("--shard-size", type=int, default=SyncDatabase.SHARD_SIZE, help="papers per shard (default: the browse page size)")
+    argument_parser.add_argument("--related", default="_data/papers.related.json", help="top-k related papers of every deployed paper, for the frontend")
+    argument_parser.add_argument("--related-k", type=int, default=RelatedPapers.K, help="related papers kept per paper")
+    argument_parser.add_argument("--related-state", default=".cache/related_papers.json", help="what the next sync needs to recompute only the affected neighbourhoods")
+    argument_parser.add_argument("--sync-state", default=".cache/sync_state.json", help="fingerprints of what the index, shards and related papers were last built from")
+    argument_parser.add_argument("--metrics-dir", default=None, help=f"write a per-stage JSON report here (or set {PipelineMetrics.DIRECTORY_VARIABLE})")
+    argument_parser.add_argument("--profile", action="store_true", help=f"also dump cProfile and tracemalloc results (or set {PipelineMetrics.PROFILE_VARIABLE}=1)")
+
+    arguments: Namespace = argument_parser.parse_args()
     syncer: SyncDatabase = SyncDatabase(
-        papers_json="papers.json",
+        papers_json=arguments.papers_database,
         db_path="_data/papers.json",
-        db_backup_path="_data/papers.json.bak"
+        db_backup_path="_data/papers.json.bak",
+        incremental=arguments.incremental,
+        change_set_path=arguments.change_set,
+        index_path=arguments.index,
+        shard_directory=arguments.shards,
+        shard_size=arguments.shard_size,
+        related_path=arguments.related,
+        related_state_path=arguments.related_state,
+        related_k=arguments.related_k,
+        state_path=arguments.sync_state,
     )
 
-    syncer.sync_database()
+    METRICS.start("sync_database", directory=arguments.metrics_dir, profile=arguments.profile)
+
+    try:
+        syncer.sync_database()
+    finally:
+        METRICS.finish()
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+
+from argparse import ArgumentParser, Namespace
+from json import dump
+from random import Random
+from typing import Iterator
+
+from bibtex_loader import BibTeXLoader, ConversionResult
+from normaliser import NormalisedEntry
+
+
+class SyntheticCorpus():
+    TITLE_WORDS: tuple[str, ...] = (
+        "autoformalization", "theorem", "proving", "language", "models", "formal", "verification", "proof", "synthesis",
+        "mathematics", "reasoning", "neural", "symbolic", "translation", "benchmark", "agents", "retrieval", "specification",
+        "program", "repair", "tactic", "prediction", "premise", "selection", "informal", "statements", "curriculum", "learning",
+        "large", "scale", "evaluation", "datasets", "semantic", "parsing", "logic", "knowledge", "graphs", "planning",
+    )
+    LATEX_TERMS: tuple[str, ...] = (
+        "{Lean}", "{Coq}", "{Isabelle/HOL}", "{LLM}s", "\\emph{zero-shot}", "\\textsc{MiniF2F}", "$\\mathcal{O}(n)$",
+        "{G}{\\\"o}del", "$\\lambda$-calculus", "{\\LaTeX}", "\\textit{via}", "{PDDL}", "{SMT}", "{\\'E}tude",
+    )
+    GIVEN_NAMES: tuple[str, ...] = (
+        "Jos{\\'e}", "Fran{\\c{c}}ois", "J{\\\"u}rgen", "Zo{\\\"e}", "Ang{\\'e}lica", "Bj{\\o}rn", "Li", "Wei", "Anna",
+        "Ren{\\'e}e", "Mar{\\'\\i}a", "S{\\o}ren", "Priya", "Kenji", "Łukasz", "Chloé", "Ιωάννης", "Dmitri", "Aisha", "Tomás",
+    )
+    SURNAMES: tuple[str, ...] = (
+        "M{\\\"u}ller", "Garc{\\'\\i}a", "Nguyen", "Schr{\\\"o}der", "Wang", "Zhang", "Kowalski", "O'Brien", "Dubois",
+        "Sj{\\\"o}berg", "Rossi", "Papadopoulos", "Tanaka", "Smith", "Ivanova", "Núñez", "Hernández", "Øster", "Chen", "Patel",
+    )
+    SYLLABLES: tuple[str, ...] = (
+        "ka", "lo", "mi", "ne", "ro", "sa", "ti", "va", "ber", "dor", "han", "kov", "lin", "mar", "nov", "ström", "sen", "ski",
+        "ton", "wic", "yam", "zel", "gui", "bri", "cas", "der", "fel", "gar", "hel", "jon", "lam", "mor", "pet", "ric", "sil",
+    )
+    VENUES: tuple[tuple[str, str], ...] = (
+        ("article", "journal = {Journal of Automated Reasoning}"),
+        ("article", "journal = {Transactions on Machine Learning Research}"),
+        ("inproceedings", "booktitle = {Proceedings of the International Conference on Learning Representations ({ICLR})}"),
+        ("inproceedings", "booktitle = {Advances in Neural Information Processing Systems}"),
+        ("inproceedings", "booktitle = {Conference on Intelligent Computer Mathematics ({CICM})}"),
+        ("misc", "journal = {arXiv preprint arXiv:{arxiv}}"),
+    )
+    # American and British spellings that two submissions of the same paper may differ in.
+    SPELLINGS: tuple[tuple[str, str], ...] = (("ization", "isation"), ("izing", "ising"), ("eling", "elling"), ("program", "programme"))
+
+    def __init__(self, size: int, duplicate_rate: float = 0.05, seed: int = 0, hard_rate: float = 0.0) -> None:
+        if not 0.0 <= duplicate_rate < 1.0:
+            raise ValueError("The duplicate rate must be in [0, 1).")
+        elif not 0.0 <= hard_rate <= 1.0:
+            raise ValueError("The hard case rate must be in [0, 1].")
+
+        self.__size: int = size
+        self.__duplicate_rate: float = duplicate_rate
+        self.__seed: int = seed
+        self.__hard_rate: float = hard_rate
+        self.__duplicates: int = 0
+        self.__originals: list[int] = []
+
+    @property
+    def duplicates(self) -> int:
+        # Entries written as near-copies of an earlier one; known once the corpus has been generated.
+        return self.__duplicates
+
+    @property
+    def originals(self) -> list[int]:
+        # For each entry, the position of the entry it copies, or its own position; known once generated.
+        return list(self.__originals)
+
+    def bibtex_entries(self) -> Iterator[str]:
+        rng: Random = Random(self.__seed)
+        originals: list[tuple[str, list[str], str, int, str, str, int]] = []
+        self.__duplicates = 0
+        self.__originals = []
+
+        for i in range(self.__size):
+            if originals and rng.random() < self.__duplicate_rate:
+                title, authors, year, venue, doi, arxiv, original = rng.choice(originals)
+                if self.__hard_rate and rng.random() < self.__hard_rate:
+                    title, authors = self.__disguise(rng, title, authors)
+
+                title, authors, doi = self.__perturb(rng, title, authors, doi)
+                self.__duplicates += 1
+                self.__originals.append(original)
+            else:
+                title = self.__title(rng)
+                authors = [f"{self.__name(rng, self.SURNAMES)}, {self.__name(rng, self.GIVEN_NAMES)}" for _ in range(rng.randint(1, 6))]
+                year = str(rng.randint(2015, 2026))
+
+                if self.__hard_rate and originals and rng.random() < self.__hard_rate:
+                    title, authors, year = self.__lookalike(rng, rng.choice(originals))
+
+                venue = rng.randrange(len(self.VENUES))
+                doi = f"10.{rng.randint(1000, 9999)}/{rng.randint(10 ** 6, 10 ** 7 - 1)}" if rng.random() < 0.6 else ""
+                arxiv = f"{rng.randint(15, 26)}{rng.randint(1, 12):02d}.{rng.randint(0, 99999):05d}"
+                originals.append((title, authors, year, venue, doi, arxiv, i))
+                self.__originals.append(i)
+
+            entrytype, venue_field = self.VENUES[venue]
+            fields: list[str] = [
+                f"  title = {{{title}}}",
+                f"  author = {{{" and ".join(authors)}}}",
+                f"  year = {year}" if rng.random() < 0.5 else f"  year = \"{year}\"",
+                f"  {venue_field.replace("{arxiv}", arxiv)}",
+            ]
+
+            if doi:
+                fields.append(f"  doi = {{{doi}}}")
+
+            if rng.random() < 0.3:
+                fields.append(f"  url = {{https://example.org/papers/{i}}}")
+
+            yield f"@{entrytype}{{synthetic{i},\n{",\n".join(fields)}\n}}"
+
+    def write_bibtex(self, bibtex_file: str) -> None:
+        with open(bibtex_file, "w", encoding="utf-8") as f:
+            for entry in self.bibtex_entries():
+                f.write(f"{entry}\n\n")
+
+    def normalised_entries(self) -> list[NormalisedEntry]:
+        loader: BibTeXLoader = BibTeXLoader()
+        results: list[ConversionResult] = loader.convert_chunk([(line, entry) for line, entry in enumerate(self.bibtex_entries(), start=1)])
+
+        return [normalised_entry for _, normalised_entry, _, _ in results if normalised_entry is not None]
+
+    def write_papers_json(self, papers_json: str) -> None:
+        with open(papers_json, "w", encoding="utf-8") as f:
+            dump({"entries": self.normalised_entries()}, f, indent=4, ensure_ascii=False)
+
+    def __title(self, rng: Random) -> str:
+        words: list[str] = rng.sample(self.TITLE_WORDS, rng.randint(4, 9))
+
+        for _ in range(rng.randint(1, 3)):
+            words.insert(rng.randrange(len(words) + 1), self.__term(rng))
+
+        for _ in range(rng.randint(0, 2)):
+            words.insert(rng.randrange(len(words) + 1), rng.choice(self.LATEX_TERMS))
+
+        words[0] = words[0].capitalize()
+
+        return " ".join(words)
+
+    def __name(self, rng: Random, names: tuple[str, ...]) -> str:
+        # Real catalogues have thousands of distinct names; a short list would make every pair a candidate.
+        return f"{rng.choice(names)}{"".join(rng.choice(self.SYLLABLES) for _ in range(rng.randint(0, 2)))}"
+
+    def __term(self, rng: Random) -> str:
+        # Rarer technical terms, so that titles share common words but are not drawn from a tiny vocabulary.
+        return f"{rng.choice(self.SYLLABLES).capitalize()}{rng.choice(self.SYLLABLES)}{rng.choice(self.SYLLABLES)}"
+
+    def __perturb(self, rng: Random, title: str, authors: list[str], doi: str) -> tuple[str, list[str], str]:
+        # The kind of differences seen between two submissions of the same paper: case, braces,
+        # punctuation, a dropped co-author, and a DOI that one of them lacks.
+        variant: int = rng.randrange(4)
+
+        if variant == 0:
+            title = title.upper()
+        elif variant == 1:
+            title = title.replace("{", "").replace("}", "") + "."
+        elif variant == 2:
+            title = title.replace(" ", ": ", 1)
+        else:
+            title = f"{{{title}}}"
+
+        if len(authors) > 1 and rng.random() < 0.3:
+            authors = authors[:-1]
+
+        return title, authors, doi if rng.random() < 0.5 else ""
+
+    def __disguise(self, rng: Random, title: str, authors: list[str]) -> tuple[str, list[str]]:
+        # Harder differences between two submissions of the same paper: given names cut to initials,
+        # and another spelling or a dropped word in the title.
+        variant: int = rng.randrange(3)
+
+        if variant != 1:
+            authors = [f"{surname}, {given[0]}." if given else surname for surname, _, given in (author.partition(", ") for author in authors)]
+
+        if variant != 0:
+            respelled: str = title
+
+            for american, british in self.SPELLINGS:
+                respelled = respelled.replace(american, british)
+
+            if respelled != title:
+                title = respelled
+            else:
+                words: list[str] = title.split(" ")
+                del words[rng.randrange(1, len(words))]
+                title = " ".join(words)
+
+        return title, authors
+
+    def __lookalike(self, rng: Random, original: tuple[str, list[str], str, int, str, str, int]) -> tuple[str, list[str], str]:
+        # A different paper that resembles an earlier one: the same title from other authors or in another
+        # year, such as a workshop series, or authors with the same surnames and a title sharing most words.
+        title, authors, year = original[0], original[1], original[2]
+        variant: int = rng.randrange(3)
+
+        if variant == 0:
+            return title, [f"{self.__name(rng, self.SURNAMES)}, {self.__name(rng, self.GIVEN_NAMES)}" for _ in range(rng.randint(1, 6))], year
+        elif variant == 1:
+            return title, authors, str(int(year) + rng.choice((-2, -1, 1, 2)))
+
+        words: list[str] = title.split(" ")
+        words[rng.randrange(len(words))] = self.__term(rng)
+
+        return " ".join(words), [f"{author.partition(", ")[0]}, {self.__name(rng, self.GIVEN_NAMES)}" for author in authors], year
+
+
+if __name__ == "__main__":
+    argument_parser: ArgumentParser = ArgumentParser(description="Generate a synthetic BibTeX file and papers.json for benchmarks.")
+    argument_parser.add_argument("--size", type=int, default=1000)
+    argument_parser.add_argument("--duplicate-rate", type=float, default=0.05, help="fraction of entries written as near-copies of an earlier entry")
+    argument_parser.add_argument("--seed", type=int, default=0)
+    argument_parser.add_argument("--hard-rate", type=float, default=0.0, help="fraction of near-copies disguised further, and of new entries resembling an earlier one")
+    argument_parser.add_argument("--bibtex-file", default=None)
+    argument_parser.add_argument("--papers-json", default=None)
+
+    arguments: Namespace = argument_parser.parse_args()
+    corpus: SyntheticCorpus = SyntheticCorpus(size=arguments.size, duplicate_rate=arguments.duplicate_rate, seed=arguments.seed, hard_rate=arguments.hard_rate)
+
+    if arguments.bibtex_file is not None:
+        corpus.write_bibtex(arguments.bibtex_file)
+
+    if arguments.papers_json is not None:
+        corpus.write_papers_json(arguments.papers_json)
+
+    print(f"Generated {arguments.size} entries, {corpus.duplicates} of them near-duplicates.")
@@ -0,0 +1,61 @@
+from contextlib import redirect_stdout
+from io import StringIO
+from tempfile import TemporaryDirectory
+from unittest import TestCase, main
+
+from bibtex_loader import BibTeXLoader
+from synthetic_corpus import SyntheticCorpus
+
+import os
+
+
+class BibTeXLoaderTest(TestCase):
+    BROKEN: tuple[str, ...] = ("@article{unclosed,\n  title = {Never closed", "@article{, title = {No key}}", "@misc{nofields}")
+
+    def setUp(self) -> None:
+        self.__directory: TemporaryDirectory[str] = TemporaryDirectory()
+        self.__working_directory: str = os.getcwd()
+        entries: list[str] = list(SyntheticCorpus(size=120, duplicate_rate=0.1, seed=9).bibtex_entries())
+
+        # Entries that fail to parse, spread over several chunks.
+        for position, broken in zip((5, 47, 100), self.BROKEN):
+            entries.insert(position, broken)
+
+        # BibTeXLoader reads papers.bib from the working directory.
+        os.chdir(self.__directory.name)
+
+        with open("papers.bib", "w", encoding="utf-8") as bibtex_file:
+            bibtex_file.write("\n\n".join(entries) + "\n")
+
+    def tearDown(self) -> None:
+        os.chdir(self.__working_directory)
+        self.__directory.cleanup()
+
+    def __load(self, workers: int, output_file: str) -> tuple[bytes, list[str]]:
+        output: StringIO = StringIO()
+
+        with redirect_stdout(output):
+            BibTeXLoader(workers=workers, chunk_size=16, output_file=output_file).main()
+
+        with open(output_file, "rb") as papers_file:
+            return papers_file.read(), [line for line in output.getvalue().splitlines() if line.startswith(("Skipping", "Duplicate"))]
+
+    def test_workers_match_a_sequential_run(self) -> None:
+        sequential, sequential_messages = self.__load(1, "sequential.json")
+        parallel, parallel_messages = self.__load(3, "parallel.json")
+
+        self.assertEqual(parallel, sequential)
+        self.assertIn("Duplicate", "".join(sequential_messages))
+        self.assertEqual(parallel_messages, sequential_messages)
+
+        # Each entry that fails to parse is reported at the line it starts on.
+        with open("papers.bib", "r", encoding="utf-8") as bibtex_file:
+            bibtex: str = bibtex_file.read()
+
+        lines: list[int] = [bibtex.count("\n", 0, bibtex.index(broken)) + 1 for broken in self.BROKEN]
+
+        self.assertEqual([message.split(":")[1] for message in sequential_messages if message.startswith("Skipping")], [str(line) for line in lines])
+
+
+if __name__ == "__main__":
+    main()
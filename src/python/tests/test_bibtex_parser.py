@@ -0,0 +1,171 @@
+from random import Random
+from tempfile import TemporaryDirectory
+from unittest import TestCase, main
+
+from bibtex_parser import BibTeXParser, BibTeXStreamReader, ParsedEntry, SourceEntry
+from synthetic_corpus import SyntheticCorpus
+
+import os
+
+
+class BibTeXStreamReaderTest(TestCase):
+    BIBTEX: str = """@string{acm = "ACM"}
+@comment{ready {for} anything}
+A stray @ sign in free text.
+
+@article{quoted,
+  title = "Braces } and { inside quotes",
+  author = "Smith, Anna and Chen, Wei",
+  year = 2024
+}
+
+@inproceedings{braced,
+  title = {Nested {Braces {Deep}} and "quotes" with an @ sign},
+  booktitle = {Proceedings of {ICLR}},
+  note = {A value
+spanning lines},
+  year = {2023},
+}
+@misc{bare, title = {Last}, year = 2020}
+"""
+
+    def setUp(self) -> None:
+        self.__directory: TemporaryDirectory[str] = TemporaryDirectory()
+
+    def tearDown(self) -> None:
+        self.__directory.cleanup()
+
+    def __write(self, bibtex: str) -> str:
+        bibtex_file: str = os.path.join(self.__directory.name, "papers.bib")
+
+        with open(bibtex_file, "w", encoding="utf-8") as f:
+            f.write(bibtex)
+
+        return bibtex_file
+
+    def __line_of(self, bibtex: str, text: str) -> int:
+        return bibtex.count("\n", 0, bibtex.index(text)) + 1
+
+    def test_blocks_do_not_depend_on_chunk_boundaries(self) -> None:
+        bibtex_file: str = self.__write(self.BIBTEX)
+        whole: list[SourceEntry] = list(BibTeXStreamReader(bibtex_file, chunk_size=len(self.BIBTEX) + 1).blocks())
+
+        self.assertEqual([line for line, _ in whole], [self.__line_of(self.BIBTEX, key) for key in ("@article{quoted", "@inproceedings{braced", "@misc{bare")])
+        self.assertTrue(whole[1][1].startswith("@inproceedings{braced,") and whole[1][1].endswith("year = {2023},\n}"))
+
+        # Between them, these chunk sizes split every quoted and braced value and every "\n@".
+        for chunk_size in range(1, len(self.BIBTEX) + 1):
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual(list(BibTeXStreamReader(bibtex_file, chunk_size=chunk_size).blocks()), whole)
+
+    def test_entries_keep_delimiters_inside_values(self) -> None:
+        bibtex_file: str = self.__write(self.BIBTEX)
+
+        for chunk_size in (1, 2, 3, 7, 16, 1 << 16):
+            with self.subTest(chunk_size=chunk_size):
+                entries: list[ParsedEntry] = list(BibTeXStreamReader(bibtex_file, chunk_size=chunk_size).entries())
+
+                self.assertEqual([(entrytype, key) for entrytype, key, _ in entries], [("article", "quoted"), ("inproceedings", "braced"), ("misc", "bare")])
+                self.assertEqual(entries[0][2]["title"], "Braces } and { inside quotes")
+                self.assertEqual(entries[1][2]["title"], 'Nested {Braces {Deep}} and "quotes" with an @ sign')
+                self.assertEqual(entries[1][2]["note"], "A value\nspanning lines")
+
+    def test_unclosed_entry_ends_at_next_entry(self) -> None:
+        bibtex: str = "@article{broken,\n  title = {Never closed\n@misc{after, title = {After}}\n"
+        bibtex_file: str = self.__write(bibtex)
+
+        for chunk_size in range(1, len(bibtex) + 1):
+            with self.subTest(chunk_size=chunk_size):
+                blocks: list[SourceEntry] = list(BibTeXStreamReader(bibtex_file, chunk_size=chunk_size).blocks())
+
+                self.assertEqual(blocks, [(1, "@article{broken,\n  title = {Never closed"), (3, "@misc{after, title = {After}}")])
+
+
+class BibTeXParserEnginesTest(TestCase):
+    PAPERS_BIB: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "papers.bib")
+    # Hand-written entries in the styles of Google Scholar, Zotero and DBLP exports, with malformed ones besides.
+    ENTRIES: tuple[str, ...] = (
+        """@article{boppana2026reasoning,
+  title={Reasoning Theater: Disentangling Model Beliefs from Chain-of-Thought},
+  author={Boppana, Siddharth and Ma, Annabel and Loeffler, Max},
+  journal={arXiv preprint arXiv:2603.05488},
+  year={2026},
+  url={https://arxiv.org/abs/2603.05488}
+}""",
+        """@inproceedings{DBLP:conf/esws/GiglouDSA23,
+  author       = {Hamed Babaei Giglou and
+                  S{\\"{o}}ren Auer and Mar{\\'{\\i}}a Poveda{-}Villal{\\'{o}}n},
+  title        = {{LLMs4OL:} Large Language Models for Ontology Learning},
+  booktitle    = {The Semantic Web - {ISWC} 2023},
+  pages        = {408--427},
+  year         = {2023},
+}""",
+        """@misc{agrawal_towards_2022,
+\ttitle = {Towards a {Mathematics} {Formalisation} {Assistant} using {Large} {Language} {Models}},
+\turl = {http://arxiv.org/abs/2211.07524},
+\tdoi = {10.48550/arXiv.2211.07524},
+\tauthor = {Agrawal, Ayush and Gadgil, Siddhartha},
+\tmonth = nov,
+\tyear = {2022},
+\tnote = {arXiv:2211.07524 [cs]},
+}""",
+        '@article{quoted, title = "Braces } and { inside quotes", year = 2024, note = "a \\"quoted\\" word"}',
+        "@misc{empty,}",
+        "@misc{nofields}",
+        "@article{unclosed, title = {Never closed}",
+        "@article{, title = {No key}}",
+        "no entry at all",
+    )
+    FUZZ_ALPHABET: str = "ab =,{}\"\n\t\r  \x1c@%\\"
+    FUZZ_CASES: int = 5000
+
+    def setUp(self) -> None:
+        self.__engines: dict[str, BibTeXParser] = {engine: BibTeXParser(engine=engine) for engine in BibTeXParser.ENGINES}
+
+    def __assert_engines_agree(self, entry: str) -> None:
+        outcomes: dict[str, ParsedEntry | str] = {}
+
+        for engine, parser in self.__engines.items():
+            try:
+                outcomes[engine] = parser.parse_entry(entry)
+            except ValueError as e:
+                outcomes[engine] = f"ValueError: {e}"
+
+        self.assertEqual(outcomes["scanner"], outcomes["character"], entry)
+
+    def test_engines_agree_on_papers_bib_entries(self) -> None:
+        blocks: list[str] = [block for _, block in BibTeXStreamReader(self.PAPERS_BIB).blocks()]
+
+        self.assertGreater(len(blocks), 0)
+
+        for block in blocks:
+            with self.subTest(block=block[:40]):
+                self.__assert_engines_agree(block)
+
+    def test_engines_agree_on_written_entries(self) -> None:
+        synthetic: list[str] = list(SyntheticCorpus(size=200, duplicate_rate=0.1, seed=6).bibtex_entries())
+
+        for entry in (*self.ENTRIES, *synthetic):
+            with self.subTest(entry=entry[:40]):
+                self.__assert_engines_agree(entry)
+
+        self.assertEqual(self.__engines["scanner"].parse_entry(self.ENTRIES[1])[2]["title"], "{LLMs4OL:} Large Language Models for Ontology Learning")
+
+    def test_engines_agree_on_fuzzed_entries(self) -> None:
+        rng: Random = Random(0)
+
+        for _ in range(self.FUZZ_CASES):
+            parts: list[str] = ["@article{fuzz,"]
+
+            for _ in range(rng.randint(0, 6)):
+                name: str = "".join(rng.choice(self.FUZZ_ALPHABET) for _ in range(rng.randint(0, 4)))
+                value: str = "".join(rng.choice(self.FUZZ_ALPHABET) for _ in range(rng.randint(0, 12)))
+                opening, closing = rng.choice([("{", "}"), ('"', '"'), ("", ""), ("{", ""), ('"', "")])
+
+                parts.append(f"{name}={opening}{value}{closing}{rng.choice([",", ",\n", "\n", " ,,"])}")
+
+            self.__assert_engines_agree("".join(parts) + rng.choice(["}", "\n}", "}}"]))
+
+
+if __name__ == "__main__":
+    main()
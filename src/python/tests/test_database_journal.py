@@ -0,0 +1,240 @@
+from json import dumps, load
+from tempfile import TemporaryDirectory
+from typing import Any, Iterator, TextIO
+from unittest import TestCase, main
+from unittest.mock import patch
+
+from add_paper import PaperEntryParser
+from database_journal import JournaledStorage, open_journaled_storage
+from database_reader import DatabaseReader
+from database_storage import write_atomically
+from normaliser import NormalisedEntry
+from synthetic_corpus import SyntheticCorpus
+
+import fcntl
+import os
+import shutil
+
+
+class JournaledStorageTest(TestCase):
+    def setUp(self) -> None:
+        self.__directory: TemporaryDirectory[str] = TemporaryDirectory()
+        self.__papers_json: str = os.path.join(self.__directory.name, "papers.json")
+        entries: list[NormalisedEntry] = SyntheticCorpus(size=12, duplicate_rate=0.0, seed=1).normalised_entries()
+        self.__existing: list[NormalisedEntry] = entries[:10]
+        self.__new: list[NormalisedEntry] = entries[10:]
+
+        open_journaled_storage(self.__papers_json).save(self.__existing)
+
+    def tearDown(self) -> None:
+        self.__directory.cleanup()
+
+    def __rewrite_with_same_content(self) -> None:
+        # What git checkout or a fresh clone does: the same bytes in a new file.
+        copy: str = f"{self.__papers_json}.copy"
+
+        shutil.copyfile(self.__papers_json, copy)
+        os.replace(copy, self.__papers_json)
+
+    def __replace_database(self, entries: list[NormalisedEntry]) -> None:
+        # Saving through the storage removes the journal, which is put back as it was.
+        journal_path: str = f"{self.__papers_json}.journal"
+
+        shutil.copyfile(journal_path, f"{journal_path}.kept")
+        open_journaled_storage(self.__papers_json).save(entries)
+        os.replace(f"{journal_path}.kept", journal_path)
+
+    def __ids(self, storage: JournaledStorage) -> list[str]:
+        return [entry["norm"]["id"] for entry in storage.entries()]
+
+    def test_journal_survives_same_content_rewrite(self) -> None:
+        storage: JournaledStorage = open_journaled_storage(self.__papers_json)
+
+        storage.append(self.__new[:1])
+        self.__rewrite_with_same_content()
+
+        reader: JournaledStorage = open_journaled_storage(self.__papers_json)
+
+        self.assertEqual(len(self.__ids(reader)), 11)
+
+        # Appending after the rewrite extends the journal rather than starting it afresh.
+        reader.append(self.__new[1:])
+
+        self.assertEqual(self.__ids(open_journaled_storage(self.__papers_json)), [entry["norm"]["id"] for entry in self.__existing + self.__new])
+        self.assertEqual(reader.compact(), 2)
+        self.assertFalse(os.path.exists(reader.journal_path))
+
+    def test_interrupted_compaction_is_not_applied_twice(self) -> None:
+        storage: JournaledStorage = open_journaled_storage(self.__papers_json)
+
+        storage.append(self.__new)
+        # The entries reached the database, but the journal was never removed.
+        self.__replace_database(self.__existing + self.__new)
+
+        reader: JournaledStorage = open_journaled_storage(self.__papers_json)
+
+        self.assertEqual(len(self.__ids(reader)), 12)
+        self.assertEqual(reader.compact(), 0)
+        self.assertEqual(len(self.__ids(reader)), 12)
+
+    def test_journal_of_a_changed_database_is_kept_and_reported(self) -> None:
+        storage: JournaledStorage = open_journaled_storage(self.__papers_json)
+
+        storage.append(self.__new[:1])
+        self.__replace_database(self.__existing[:5])
+
+        reader: JournaledStorage = open_journaled_storage(self.__papers_json)
+
+        with self.assertRaises(ValueError):
+            self.__ids(reader)
+
+        with self.assertRaises(ValueError):
+            reader.append(self.__new[1:])
+
+        with open(storage.journal_path, "r", encoding="utf-8") as journal_file:
+            self.assertEqual(len(journal_file.readlines()), 2)
+
+    def test_journal_without_entry_count_is_reported(self) -> None:
+        storage: JournaledStorage = open_journaled_storage(self.__papers_json)
+
+        with open(storage.journal_path, "w", encoding="utf-8") as journal_file:
+            journal_file.write(dumps({"base": [1, 2, 3]}) + "\n" + dumps(self.__new[0]) + "\n")
+
+        with self.assertRaises(ValueError):
+            self.__ids(storage)
+
+    def __database_size(self) -> int:
+        with open(self.__papers_json, "r", encoding="utf-8") as papers_file:
+            return len(load(papers_file)["entries"])
+
+    def test_added_papers_are_journaled_without_rewriting_the_database(self) -> None:
+        modified: int = os.stat(self.__papers_json).st_mtime_ns
+        parser: PaperEntryParser = PaperEntryParser(self.__papers_json)
+
+        parser.add_entries([dict(entry["raw"]) for entry in self.__new])
+
+        self.assertEqual(os.stat(self.__papers_json).st_mtime_ns, modified)
+        self.assertEqual(self.__database_size(), 10)
+        self.assertEqual(len(self.__ids(open_journaled_storage(self.__papers_json))), 12)
+
+    def test_failed_write_leaves_no_temporary_file(self) -> None:
+        with open(self.__papers_json, "rb") as papers_file:
+            before: bytes = papers_file.read()
+
+        def write(target_file: TextIO) -> None:
+            target_file.write("[")
+
+            raise TypeError("not serialisable")
+
+        with self.assertRaises(TypeError):
+            write_atomically(self.__papers_json, write)
+
+        with open(self.__papers_json, "rb") as papers_file:
+            self.assertEqual(papers_file.read(), before)
+
+        self.assertEqual([name for name in os.listdir(self.__directory.name) if name.endswith(".tmp")], [])
+
+    def test_offsets_are_built_in_a_temporary_file_of_their_own(self) -> None:
+        # What a concurrent builder of the same index is still writing.
+        other_builder: str = f"{self.__papers_json}.offsets.tmp"
+
+        with open(other_builder, "wb") as other_file:
+            other_file.write(b"half written")
+
+        with DatabaseReader(self.__papers_json) as reader:
+            self.assertTrue(reader.rebuilt)
+
+        with DatabaseReader(self.__papers_json) as reader:
+            self.assertFalse(reader.rebuilt)
+            self.assertEqual(reader.ids(), [entry["raw"]["id"] for entry in self.__existing])
+
+        with open(other_builder, "rb") as other_file:
+            self.assertEqual(other_file.read(), b"half written")
+
+        self.assertEqual([name for name in os.listdir(self.__directory.name) if name.endswith(".tmp")], ["papers.json.offsets.tmp"])
+
+    def test_offsets_follow_the_opened_file(self) -> None:
+        build_index: Any = getattr(DatabaseReader, "_DatabaseReader__build_index")
+
+        def build_then_replace(reader: DatabaseReader) -> None:
+            build_index(reader)
+            # The database is replaced after the reader opened it, but before it saves its offsets.
+            open_journaled_storage(self.__papers_json).save(self.__new + self.__existing)
+
+        with patch.object(DatabaseReader, "_DatabaseReader__build_index", build_then_replace), DatabaseReader(self.__papers_json) as reader:
+            self.assertEqual(reader.ids(), [entry["raw"]["id"] for entry in self.__existing])
+
+        # The saved offsets describe the old file, so they are not used for the new one.
+        with DatabaseReader(self.__papers_json) as reader:
+            self.assertTrue(reader.rebuilt)
+            self.assertEqual([entry["raw"]["id"] for entry in reader.entries(["raw.id"])], [entry["raw"]["id"] for entry in self.__new + self.__existing])
+
+    def test_append_compacts_at_the_threshold(self) -> None:
+        storage: JournaledStorage = open_journaled_storage(self.__papers_json, compact_threshold=2)
+
+        storage.append(self.__new[:1])
+
+        self.assertEqual(self.__database_size(), 10)
+
+        storage.append(self.__new[1:])
+
+        self.assertEqual(self.__database_size(), 12)
+        self.assertFalse(os.path.exists(storage.journal_path))
+
+    def test_append_repairs_an_incomplete_last_line(self) -> None:
+        papers_jsonl: str = os.path.join(self.__directory.name, "papers.jsonl")
+        storage: JournaledStorage = open_journaled_storage(papers_jsonl, compact_threshold=1)
+
+        storage.save(self.__existing)
+
+        with open(papers_jsonl, "rb") as papers_file:
+            lines: list[bytes] = papers_file.readlines()
+
+        # A write cut off mid-line is skipped and then cut off; a whole last entry without its newline is kept.
+        for tail, expected in ((lines[-1][:40], self.__existing[:9]), (lines[-1][:-1], self.__existing)):
+            with self.subTest(tail=tail[-10:]):
+                with open(papers_jsonl, "wb") as papers_file:
+                    papers_file.writelines(lines[:-1])
+                    papers_file.write(tail)
+
+                self.assertEqual(self.__ids(storage), [entry["norm"]["id"] for entry in expected])
+
+                storage.append(self.__new)
+
+                self.assertEqual(self.__ids(storage), [entry["norm"]["id"] for entry in expected + self.__new])
+
+    def test_projections_are_read_before_they_are_returned(self) -> None:
+        storage: JournaledStorage = open_journaled_storage(self.__papers_json)
+        entries: Iterator[NormalisedEntry] = storage.project(("norm.id",))
+        ids: list[str] = [next(entries)["norm"]["id"]]
+
+        # No lock is held while the projection is gone through, so another process can write meanwhile.
+        with open(f"{self.__papers_json}.lock", "a", encoding="utf-8") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+        storage.append(self.__new)
+
+        ids += [entry["norm"]["id"] for entry in entries]
+
+        self.assertEqual(ids, [entry["norm"]["id"] for entry in self.__existing])
+
+    def test_exclusive_lock_inside_a_shared_one_is_refused(self) -> None:
+        storage: JournaledStorage = open_journaled_storage(self.__papers_json)
+
+        with storage.locked():
+            with storage.locked(exclusive=False):
+                pass
+
+        with storage.locked(exclusive=False):
+            with self.assertRaises(RuntimeError):
+                storage.append(self.__new)
+
+        # The failed request left the lock as it was, and released it.
+        storage.append(self.__new)
+
+        self.assertEqual(len(self.__ids(storage)), 12)
+
+
+if __name__ == "__main__":
+    main()
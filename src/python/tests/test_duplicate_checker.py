@@ -0,0 +1,147 @@
+from typing import Any, Optional
+from unittest import TestCase, main
+from unittest.mock import patch
+
+from duplicate_checker import DuplicateChecker
+from duplicate_index import DuplicateIndex
+from normaliser import Normaliser, NormalisedEntry
+from synthetic_corpus import SyntheticCorpus
+
+
+class DuplicateCheckerTest(TestCase):
+    # Threshold and title, author and year weights, covering each combination of required overlaps.
+    CONFIGURATIONS: tuple[tuple[float, float, float, float], ...] = (
+        (0.75, 0.60, 0.30, 0.10),
+        (0.75, 0.20, 0.70, 0.10),
+        (0.75, 0.80, 0.10, 0.10),
+        (0.50, 0.45, 0.45, 0.10),
+        (0.05, 0.60, 0.30, 0.10),
+    )
+
+    def setUp(self) -> None:
+        self.__entries: list[NormalisedEntry] = SyntheticCorpus(size=300, duplicate_rate=0.3, seed=5).normalised_entries()
+
+        # Every third entry in the older {"text", "tokens"} author layout.
+        for entry in self.__entries[::3]:
+            entry["norm"] = {**entry["norm"], "authors": self.__legacy_authors(entry["norm"]["authors"])}
+
+    @staticmethod
+    def __legacy_authors(names: list[str]) -> dict[str, Any]:
+        text: str = " and ".join(names)
+
+        return {"text": text, "tokens": text.split()}
+
+    @staticmethod
+    def __entry(entry_id: str, title: str, **fields: str) -> NormalisedEntry:
+        return Normaliser().normalise_bibtex_entry({"id": entry_id, "entrytype": "article", "title": title, "author": "Smith, Anna and Chen, Wei", "year": "2024", **fields})
+
+    def __find_duplicates(self, entry: NormalisedEntry, entries: list[NormalisedEntry]) -> tuple[Optional[int], Optional[int]]:
+        return DuplicateChecker.find_duplicate(entry, entries), DuplicateChecker.find_duplicate(entry, entries, DuplicateIndex(entries))
+
+    def __verdicts(self, indexed: bool) -> list[Optional[int]]:
+        duplicate_index: Optional[DuplicateIndex] = DuplicateIndex() if indexed else None
+        verdicts: list[Optional[int]] = []
+
+        for position, entry in enumerate(self.__entries):
+            verdicts.append(DuplicateChecker.find_duplicate(entry, self.__entries[:position], duplicate_index))
+
+            if duplicate_index is not None:
+                duplicate_index.add(entry)
+
+        return verdicts
+
+    def test_indexed_verdicts_match_linear_scan(self) -> None:
+        for threshold, title_weight, authors_weight, year_weight in self.CONFIGURATIONS:
+            with self.subTest(threshold=threshold, title=title_weight, authors=authors_weight, year=year_weight), \
+                    patch.object(DuplicateChecker, "DUPLICATE_THRESHOLD", threshold), \
+                    patch.object(DuplicateChecker, "TITLE_WEIGHT", title_weight), \
+                    patch.object(DuplicateChecker, "AUTHORS_WEIGHT", authors_weight), \
+                    patch.object(DuplicateChecker, "YEAR_WEIGHT", year_weight):
+                linear: list[Optional[int]] = self.__verdicts(indexed=False)
+
+                self.assertTrue(any(position is not None for position in linear))
+                self.assertEqual(self.__verdicts(indexed=True), linear)
+
+    def test_duplicate_pairs_match_brute_force(self) -> None:
+        scores: dict[tuple[int, int], float] = {
+            (i, j): DuplicateChecker.score(self.__entries[i], self.__entries[j]) for i in range(len(self.__entries)) for j in range(i + 1, len(self.__entries))
+        }
+
+        # Thresholds on either side of each weight, so every branch of the candidate generation is taken.
+        for threshold in (0.0, 0.05, 0.2, 0.5, 0.75, 0.95, 1.0):
+            with self.subTest(threshold=threshold):
+                pairs: list[tuple[int, int, float]] = DuplicateChecker.duplicate_pairs(self.__entries, threshold)
+
+                self.assertEqual({(i, j) for i, j, _ in pairs}, {pair for pair, score in scores.items() if score >= threshold})
+
+                for i, j, score in pairs:
+                    self.assertAlmostEqual(score, scores[(i, j)])
+
+        # Duplicates in the legacy author layout are among the pairs found.
+        self.assertTrue(any(i % 3 == 0 or j % 3 == 0 for i, j, _ in DuplicateChecker.duplicate_pairs(self.__entries)))
+
+    def test_legacy_authors_are_compared_by_name(self) -> None:
+        a: NormalisedEntry = {"raw": {}, "norm": {"title_tokens": ["formal", "proof"], "authors": ["anna smith"], "year": 2024}}
+        b: NormalisedEntry = {"raw": {}, "norm": {"title_tokens": ["formal", "proof", "search"], "authors": ["wei chen"], "year": 2024}}
+        score: float = DuplicateChecker.score(a, b)
+
+        legacy_a: NormalisedEntry = {"raw": {}, "norm": {**a["norm"], "authors": self.__legacy_authors(a["norm"]["authors"])}}
+        legacy_b: NormalisedEntry = {"raw": {}, "norm": {**b["norm"], "authors": self.__legacy_authors(b["norm"]["authors"])}}
+
+        self.assertLess(score, DuplicateChecker.DUPLICATE_THRESHOLD)
+        self.assertEqual(DuplicateChecker.score(legacy_a, legacy_b), score)
+        self.assertFalse(DuplicateChecker.is_duplicate(legacy_b, [legacy_a]))
+        self.assertFalse(DuplicateChecker.is_duplicate(legacy_b, [legacy_a], DuplicateIndex([legacy_a])))
+
+    def test_shared_identifiers_are_duplicates(self) -> None:
+        existing: list[NormalisedEntry] = [
+            self.__entry("lean_proofs", "Proof Search in Lean", doi="10.1145/1234567"),
+            self.__entry("isabelle_sledgehammer", "Hammers for Isabelle", journal="arXiv preprint arXiv:2301.01234"),
+            self.__entry("coq_tactics", "Learning Coq Tactics"),
+        ]
+
+        # Titles that share nothing with the existing entries, so only the identifiers can match.
+        self.assertEqual(self.__find_duplicates(self.__entry("other", "Unrelated Words Here", doi="https://doi.org/10.1145/1234567"), existing), (0, 0))
+        self.assertEqual(self.__find_duplicates(self.__entry("other", "Unrelated Words Here", url="https://arxiv.org/abs/2301.01234v2"), existing), (1, 1))
+        self.assertEqual(self.__find_duplicates(self.__entry("coq_tactics", "Unrelated Words Here"), existing), (2, 2))
+        self.assertEqual(self.__find_duplicates(self.__entry("other", "Unrelated Words Here", doi="10.1145/7654321"), existing), (None, None))
+
+    def test_shared_identifiers_come_before_fuzzy_matches(self) -> None:
+        existing: list[NormalisedEntry] = [
+            self.__entry("near_copy", "Autoformalising Mathematics with Language Models"),
+            self.__entry("published", "A Different Title Altogether", doi="10.1007/978-3-031-1"),
+        ]
+        new: NormalisedEntry = self.__entry("new", "Autoformalising Mathematics with Language Models", doi="10.1007/978-3-031-1")
+
+        self.assertGreaterEqual(DuplicateChecker.score(new, existing[0]), DuplicateChecker.DUPLICATE_THRESHOLD)
+        self.assertEqual(self.__find_duplicates(new, existing), (1, 1))
+
+    def test_distinct_identifiers_are_not_scored(self) -> None:
+        title: str = "Autoformalising Mathematics with Language Models"
+        existing: list[NormalisedEntry] = [
+            self.__entry("journal_version", title, doi="10.1007/978-3-031-1"),
+            self.__entry("preprint", title, journal="arXiv preprint arXiv:2301.01234"),
+        ]
+
+        # Two publisher DOIs, or two arXiv ids, that differ mark the same title as a different work.
+        self.assertEqual(self.__find_duplicates(self.__entry("new", title, doi="10.1007/978-3-031-2"), existing[:1]), (None, None))
+        self.assertEqual(self.__find_duplicates(self.__entry("new", title, journal="arXiv preprint arXiv:2302.04321"), existing[1:]), (None, None))
+        # A preprint and its published version carry different DOIs, and are still scored.
+        self.assertEqual(self.__find_duplicates(self.__entry("new", title, doi="10.48550/arXiv.2302.04321"), existing[:1]), (0, 0))
+
+    def test_distinct_identifiers_outweigh_a_shared_key(self) -> None:
+        existing: list[NormalisedEntry] = [
+            self.__entry("smith2024", "Proof Search in Lean", doi="10.1145/1234567"),
+            self.__entry("smith2024b", "Hammers for Isabelle", journal="arXiv preprint arXiv:2301.01234"),
+            self.__entry("near_copy", "Learning Coq Tactics"),
+        ]
+
+        # A citation key reused for another paper: the conflicting DOI or arXiv id wins, and fuzzy matches are still found.
+        self.assertEqual(self.__find_duplicates(self.__entry("smith2024", "Learning Coq Tactics", doi="10.1145/7654321"), existing), (2, 2))
+        self.assertEqual(self.__find_duplicates(self.__entry("smith2024b", "Unrelated Words Here", journal="arXiv preprint arXiv:2302.04321"), existing), (None, None))
+        # Without a conflict, the shared key is enough.
+        self.assertEqual(self.__find_duplicates(self.__entry("smith2024", "Unrelated Words Here"), existing), (0, 0))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+from typing import Any
+from unittest import TestCase, main
+
+from duplicate_checker import DuplicateChecker
+from duplicate_engine import CONFIGURATIONS, DuplicateEngine
+from duplicate_index import DuplicateIndex
+from entry_identifiers import IdentifierExtractor
+from normaliser import NormalisedEntry, Normaliser
+from synthetic_corpus import SyntheticCorpus
+
+
+class DuplicateEngineTest(TestCase):
+    def setUp(self) -> None:
+        self.__entries: list[NormalisedEntry] = SyntheticCorpus(size=300, duplicate_rate=0.3, seed=11).normalised_entries()
+
+        # Every third entry in the older {"text", "tokens"} author layout, as most of papers.json is.
+        for entry in self.__entries[::3]:
+            entry["norm"] = {**entry["norm"], "authors": self.__legacy_authors(entry["norm"]["authors"])}
+
+    @staticmethod
+    def __legacy_authors(names: list[str]) -> dict[str, Any]:
+        text: str = " and ".join(names)
+
+        return {"text": text, "tokens": text.split()}
+
+    def test_default_configuration_matches_checker(self) -> None:
+        engine: DuplicateEngine = DuplicateEngine(CONFIGURATIONS["default"])
+        duplicate_index: DuplicateIndex = DuplicateIndex()
+        engine_verdicts: list[bool] = []
+        checker_verdicts: list[bool] = []
+
+        for position, entry in enumerate(self.__entries):
+            engine_verdicts.append(engine.best_match(entry) is not None)
+            checker_verdicts.append(DuplicateChecker.is_duplicate(entry, self.__entries[:position], duplicate_index))
+            engine.add(entry)
+            duplicate_index.add(entry)
+
+        self.assertTrue(any(checker_verdicts))
+        self.assertEqual(engine_verdicts, checker_verdicts)
+
+    def test_distinct_identifiers_outweigh_a_shared_key(self) -> None:
+        engine: DuplicateEngine = DuplicateEngine(CONFIGURATIONS["default"])
+        normaliser: Normaliser = Normaliser()
+        entry: dict[str, str] = {"id": "smith2024", "entrytype": "article", "title": "Proof Search in Lean", "author": "Smith, Anna", "year": "2024", "doi": "10.1145/1234567"}
+
+        engine.add(normaliser.normalise_bibtex_entry(dict(entry)))
+
+        self.assertIsNone(engine.best_match(normaliser.normalise_bibtex_entry({**entry, "title": "Hammers for Isabelle", "doi": "10.1145/7654321"})))
+        self.assertEqual(engine.best_match(normaliser.normalise_bibtex_entry({**entry, "title": "Hammers for Isabelle", "doi": ""})).identifier, "key")
+
+    def test_legacy_authors_score_as_names(self) -> None:
+        engine: DuplicateEngine = DuplicateEngine(CONFIGURATIONS["default"])
+
+        for a, b in zip(self.__entries[0:60:3], self.__entries[3:63:3]):
+            listed_a: NormalisedEntry = {**a, "norm": {**a["norm"], "authors": IdentifierExtractor.author_names(a["norm"])}}
+            listed_b: NormalisedEntry = {**b, "norm": {**b["norm"], "authors": IdentifierExtractor.author_names(b["norm"])}}
+
+            self.assertEqual(engine.score(a, b).breakdown, engine.score(listed_a, listed_b).breakdown)
+            self.assertAlmostEqual(DuplicateChecker.score(a, b), DuplicateChecker.score(listed_a, listed_b))
+            self.assertAlmostEqual(engine.score(a, b).score, DuplicateChecker.score(a, b))
+
+    def test_author_initials_in_either_name_order(self) -> None:
+        normaliser: Normaliser = Normaliser()
+        title: str = "Autoformalization of Competition Mathematics"
+        written: list[NormalisedEntry] = [
+            normaliser.normalise_bibtex_entry({"id": f"paper{i}", "entrytype": "article", "title": title, "author": authors, "year": "2024"})
+            for i, authors in enumerate(("Garc{\\'\\i}a, Jos{\\'e} and Smith, Anna", "José García and Anna Smith", "J. Garcia and A. Smith", "Garcia, J. and Smith, A."))
+        ]
+        engine: DuplicateEngine = DuplicateEngine(CONFIGURATIONS["initials"])
+
+        for entry in written:
+            self.assertEqual(engine.score(written[0], entry).breakdown["author_initials"], 1.0)
+
+        engine.add(written[0])
+
+        for entry in written[1:]:
+            self.assertEqual(engine.best_match(entry).entry_id, "paper0")
+
+        # Normalised names alone are read as "Given Surname".
+        legacy: NormalisedEntry = {"raw": {}, "norm": {**written[1]["norm"], "authors": {"text": "jose garcia and anna smith", "tokens": []}}}
+
+        self.assertEqual(engine.score(written[0], legacy).breakdown["author_initials"], 1.0)
+
+
+if __name__ == "__main__":
+    main()
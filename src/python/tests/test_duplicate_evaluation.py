@@ -0,0 +1,37 @@
+from typing import Any
+from unittest import TestCase, main
+
+from duplicate_engine import CONFIGURATIONS
+from duplicate_evaluation import DuplicateEvaluation
+from normaliser import NormalisedEntry
+from synthetic_corpus import SyntheticCorpus
+
+
+class DuplicateEvaluationTest(TestCase):
+    def test_pairs_are_grouped_transitively(self) -> None:
+        entries: list[NormalisedEntry] = [{"raw": {}, "norm": {"id": entry_id}} for entry_id in ("a", "b", "c", "d", "e", "f")]
+        # c is linked to a only through b, and the pairs are given in both directions and out of order.
+        evaluation: DuplicateEvaluation = DuplicateEvaluation.from_pairs(entries, [("c", "b"), ("e", "d"), ("b", "a"), ("d", "e")])
+        works: list[int] = getattr(evaluation, "_DuplicateEvaluation__works")
+
+        self.assertEqual(works[0], works[1])
+        self.assertEqual(works[1], works[2])
+        self.assertEqual(works[3], works[4])
+        self.assertEqual(len({works[0], works[3], works[5]}), 3)
+
+        with self.assertRaises(ValueError):
+            DuplicateEvaluation.from_pairs(entries, [("a", "missing")])
+
+    def test_hard_cases_tell_configurations_apart(self) -> None:
+        corpus: SyntheticCorpus = SyntheticCorpus(size=600, duplicate_rate=0.1, seed=3, hard_rate=0.5)
+        evaluation: DuplicateEvaluation = DuplicateEvaluation(corpus.normalised_entries(), corpus.originals)
+        results: dict[str, dict[str, Any]] = {name: evaluation.evaluate(weights, 0.75) for name, weights in CONFIGURATIONS.items()}
+
+        # Look-alike papers are taken for duplicates, and initials hide some duplicates from whole-name matching.
+        self.assertLess(results["default"]["precision"], 1.0)
+        self.assertLess(results["default"]["recall"], 1.0)
+        self.assertGreater(results["initials"]["recall"], results["default"]["recall"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+from random import Random
+from typing import Any
+from unittest import TestCase, main
+
+from facet_index import FacetIndex
+from normaliser import NormalisedEntry
+from synthetic_corpus import SyntheticCorpus
+
+
+class FacetIndexTest(TestCase):
+    def setUp(self) -> None:
+        entries: list[NormalisedEntry] = SyntheticCorpus(size=40, duplicate_rate=0.0, seed=4).normalised_entries()
+        latex: list[dict[str, Any]] = [
+            {"id": "latex_title", "title": "{Vysko\\v{c}il}'s {GPT-4}: Proofs, \\emph{Automatically}", "author": "Vysko{\\v{c}}il, Ji{\\v{r}}{\\'\\i} and S{\\\"{o}}ren Auer"},
+            {"id": "no_author", "title": "Autoformalisation\twith  Lean 4"},
+        ]
+
+        self.__papers: list[dict[str, Any]] = [entry["raw"] for entry in entries] + latex
+        self.__index: dict[str, Any] = FacetIndex({"raw": paper, "norm": {}} for paper in self.__papers).to_dict()
+
+    def __scan(self, search: str) -> list[int]:
+        # AutoFormalisationMainContainerDiv without an index: the search occurs in the title, shown without braces, or the authors.
+        s: str = search.lower()
+
+        return [
+            position for position, paper in enumerate(self.__papers)
+            if s in paper.get("title", "").replace("{", "").replace("}", "").lower() or s in paper.get("author", "").lower()
+        ]
+
+    def __candidates(self, search: str) -> set[int]:
+        # AutoFormalisationPaperIndexer.matchingPositions before each candidate is checked.
+        candidates: set[int] = set(range(self.__index["size"]))
+
+        for word in FacetIndex.TOKEN_SEPARATOR_PATTERN.split(search.lower()):
+            if word:
+                candidates &= {position for token, postings in self.__index["tokens"].items() if word in token for position in postings}
+
+        return candidates
+
+    def test_token_candidates_cover_the_search(self) -> None:
+        searches: list[str] = ["proofs", "gpt-4", "\\vcil's", "s, \\emph{auto", "with  lean", "ji{\\v{r}", "auer", "nothing like it"]
+        random: Random = Random(5)
+
+        # Substrings of the shown texts, including ones that start or end inside a word.
+        for paper in self.__papers:
+            text: str = paper.get("title", "").replace("{", "").replace("}", "")
+
+            for _ in range(5):
+                start: int = random.randrange(len(text))
+                searches.append(text[start:start + random.randint(1, 20)])
+
+        for search in searches:
+            matches: list[int] = self.__scan(search)
+
+            self.assertLessEqual(set(matches), self.__candidates(search), search)
+
+        self.assertEqual(self.__scan("\\vcil's"), [40])
+        self.assertEqual(self.__candidates("proofs, \\emph"), {40})
+
+    def test_postings(self) -> None:
+        self.assertEqual(self.__index["version"], FacetIndex.VERSION)
+        self.assertIn(41, self.__index["tokens"]["lean"])
+        self.assertEqual(self.__index["tokens"]["vysko\\vcil's"], [40])
+        self.assertTrue(all(postings == sorted(set(postings)) for postings in self.__index["tokens"].values()))
+
+
+if __name__ == "__main__":
+    main()
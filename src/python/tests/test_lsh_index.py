@@ -0,0 +1,54 @@
+from typing import Optional
+from unittest import TestCase, main
+
+from duplicate_checker import DuplicateChecker
+from lsh_index import MinHashLSHIndex
+from normaliser import NormalisedEntry
+from synthetic_corpus import SyntheticCorpus
+
+
+class MinHashLSHIndexTest(TestCase):
+    RECALL_TARGETS: tuple[float, ...] = (0.5, 0.9, 0.99, 0.999)
+
+    def setUp(self) -> None:
+        self.__entries: list[NormalisedEntry] = SyntheticCorpus(size=300, duplicate_rate=0.3, seed=5).normalised_entries()
+
+    def test_banding_reaches_the_recall_target(self) -> None:
+        for recall_target in self.RECALL_TARGETS:
+            with self.subTest(recall_target=recall_target):
+                lsh_index: MinHashLSHIndex = MinHashLSHIndex(num_permutations=128, recall_target=recall_target)
+                rows: int = lsh_index.rows + 1
+                bands: int = 128 // rows
+                # One more row per band would fall short of the target, so no banding gives fewer false candidates.
+                recall: float = 1.0 - (1.0 - lsh_index.similarity_threshold ** rows) ** bands
+
+                self.assertLessEqual(lsh_index.rows * lsh_index.bands, 128)
+                self.assertGreaterEqual(lsh_index.expected_recall, recall_target)
+                self.assertLess(recall, recall_target)
+
+        with self.assertRaises(ValueError):
+            MinHashLSHIndex(num_permutations=1, recall_target=0.99)
+
+    def test_verdicts_match_the_duplicate_checker(self) -> None:
+        for recall_target in self.RECALL_TARGETS[1:]:
+            with self.subTest(recall_target=recall_target):
+                lsh_index: MinHashLSHIndex = MinHashLSHIndex(recall_target=recall_target)
+                duplicates: int = 0
+
+                for position, entry in enumerate(self.__entries):
+                    expected: Optional[int] = DuplicateChecker.find_duplicate(entry, self.__entries[:position])
+                    matches: list[int] = [match for match, _ in lsh_index.likely_duplicates(entry)]
+
+                    self.assertEqual(lsh_index.is_duplicate(entry), expected is not None, entry["norm"]["id"])
+
+                    if expected is not None:
+                        self.assertIn(expected, matches)
+                        duplicates += 1
+
+                    lsh_index.add(entry)
+
+                self.assertGreater(duplicates, 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+from contextlib import redirect_stdout
+from io import StringIO
+from json import dump, dumps
+from tempfile import TemporaryDirectory
+from typing import Optional
+from unittest import TestCase, main
+from unittest.mock import patch
+
+from metadata_enrichment import CrossrefResolver, HttpConnectionPool, LocalResolver, Metadata, MetadataEnricher, MetadataResolver
+from normaliser import NormalisedEntry, Normaliser
+
+import os
+
+
+class StubResolver(MetadataResolver):
+    name: str = "stub"
+    fields: tuple[str, ...] = ("doi", "venue", "url")
+
+    def __init__(self, metadata: Optional[Metadata]) -> None:
+        self.__metadata: Optional[Metadata] = metadata
+        self.queries: list[dict[str, str]] = []
+
+    async def resolve(self, query: dict[str, str]) -> Optional[Metadata]:
+        self.queries.append(query)
+
+        return self.__metadata
+
+
+class MetadataEnricherTest(TestCase):
+    def setUp(self) -> None:
+        self.__directory: TemporaryDirectory[str] = TemporaryDirectory()
+        self.__normaliser: Normaliser = Normaliser()
+
+    def tearDown(self) -> None:
+        self.__directory.cleanup()
+
+    def __path(self, name: str) -> str:
+        return os.path.join(self.__directory.name, name)
+
+    def __entry(self, title: str, **fields: str) -> NormalisedEntry:
+        return self.__normaliser.normalise_bibtex_entry({"id": title.lower().replace(" ", "_"), "entrytype": "article", "title": title, "author": "Smith, Anna", "year": "2024", **fields})
+
+    def __enrich(self, resolver: MetadataResolver, entries: list[NormalisedEntry]) -> tuple[list[NormalisedEntry], dict[str, int]]:
+        enricher: MetadataEnricher = MetadataEnricher(resolver, cache_file=self.__path("responses.sqlite3"), backoff=0.0)
+
+        with redirect_stdout(StringIO()):
+            enriched: list[NormalisedEntry] = enricher.enrich(entries)
+
+        return enriched, enricher.statistics
+
+    def test_local_resolver_fills_only_missing_fields(self) -> None:
+        with open(self.__path("metadata.json"), "w", encoding="utf-8") as metadata_file:
+            dump({"entries": [
+                {"title": "Formal Proof Search", "doi": "10.1/found", "venue": "Found Venue", "repository": "https://example.org/repo"},
+                {"title": "Curated Paper", "doi": "10.1/other", "venue": "Other Venue"},
+            ]}, metadata_file)
+
+        entries: list[NormalisedEntry] = [
+            self.__entry("Formal Proof Search", repository="NA"),
+            self.__entry("Curated Paper", doi="10.1/curated", venue="Curated Venue"),
+            self.__entry("Unknown Paper"),
+        ]
+        enriched, statistics = self.__enrich(LocalResolver(self.__path("metadata.json")), entries)
+
+        self.assertEqual({field: enriched[0]["raw"].get(field) for field in ("doi", "venue", "repository")}, {"doi": "10.1/found", "venue": "Found Venue", "repository": "https://example.org/repo"})
+        self.assertEqual(enriched[0]["norm"], self.__entry("Formal Proof Search", doi="10.1/found", venue="Found Venue", repository="https://example.org/repo")["norm"])
+        self.assertIs(enriched[1], entries[1])
+        self.assertIs(enriched[2], entries[2])
+        self.assertEqual((statistics["candidates"], statistics["enriched"]), (3, 1))
+
+    def test_fields_no_resolver_fills_are_not_looked_up(self) -> None:
+        resolver: StubResolver = StubResolver({"doi": "10.1/found", "repository": "https://example.org/repo"})
+        complete: NormalisedEntry = self.__entry("Complete Paper", doi="10.1/known", venue="Venue", url="https://example.org", repository="NA")
+        incomplete: NormalisedEntry = self.__entry("Incomplete Paper", venue="Venue", url="https://example.org", repository="NA")
+        enriched, statistics = self.__enrich(resolver, [complete, incomplete])
+
+        self.assertEqual([query["title"] for query in resolver.queries], ["Incomplete Paper"])
+        self.assertIs(enriched[0], complete)
+        self.assertEqual((enriched[1]["raw"]["doi"], enriched[1]["raw"]["repository"]), ("10.1/found", "NA"))
+        self.assertEqual(statistics["candidates"], 1)
+
+    def test_unexpected_crossref_body_fails_only_its_entry(self) -> None:
+        found: bytes = dumps({"message": {"items": [{"DOI": "10.1/found", "title": ["Formal Proof Search"], "container-title": ["Venue"]}]}}).encode("utf-8")
+
+        def answer(pool: HttpConnectionPool, path: str, headers: dict[str, str]) -> tuple[int, bytes]:
+            return 200, found if "Formal+Proof+Search" in path else b"[]"
+
+        with patch.object(HttpConnectionPool, "get", answer):
+            enriched, statistics = self.__enrich(CrossrefResolver(), [self.__entry("Formal Proof Search"), self.__entry("Another Paper")])
+
+        self.assertEqual((enriched[0]["raw"]["doi"], enriched[0]["raw"]["venue"]), ("10.1/found", "Venue"))
+        self.assertNotIn("doi", enriched[1]["raw"])
+        self.assertEqual((statistics["requests"], statistics["failures"], statistics["enriched"]), (2, 1, 1))
+
+
+if __name__ == "__main__":
+    main()
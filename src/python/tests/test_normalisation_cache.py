@@ -0,0 +1,53 @@
+from contextlib import redirect_stdout
+from io import StringIO
+from tempfile import TemporaryDirectory
+from unittest import TestCase, main
+from unittest.mock import patch
+
+from bibtex_loader import BibTeXLoader, ConversionResult
+from bibtex_parser import BibTeXStreamReader, SourceEntry
+from normaliser import Normaliser
+from synthetic_corpus import SyntheticCorpus
+
+import os
+
+
+class NormalisationCacheTest(TestCase):
+    def setUp(self) -> None:
+        self.__directory: TemporaryDirectory[str] = TemporaryDirectory()
+        self.__working_directory: str = os.getcwd()
+        self.__cache_file: str = os.path.join(self.__directory.name, "cache", "normalised_entries.sqlite3")
+
+        # BibTeXLoader reads papers.bib from the working directory.
+        os.chdir(self.__directory.name)
+        SyntheticCorpus(size=40, duplicate_rate=0.0, seed=10).write_bibtex("papers.bib")
+
+        self.__blocks: list[SourceEntry] = list(BibTeXStreamReader("papers.bib").blocks())
+
+        # An import stores every entry it normalised in the cache.
+        with redirect_stdout(StringIO()):
+            BibTeXLoader(cache_file=self.__cache_file).main()
+
+    def tearDown(self) -> None:
+        os.chdir(self.__working_directory)
+        self.__directory.cleanup()
+
+    def test_hits_return_the_normalised_entry(self) -> None:
+        cached: list[ConversionResult] = BibTeXLoader(cache_file=self.__cache_file, read_only_cache=True).convert_chunk(self.__blocks)
+        fresh: list[ConversionResult] = BibTeXLoader().convert_chunk(self.__blocks)
+
+        self.assertEqual(len(cached), 40)
+        self.assertTrue(all(hit for _, _, _, hit in cached))
+        self.assertEqual([entry for _, entry, _, _ in cached], [entry for _, entry, _, _ in fresh])
+
+    def test_new_rules_invalidate_the_cache(self) -> None:
+        with patch.object(Normaliser, "rules_version", return_value="edited rules"):
+            results: list[ConversionResult] = BibTeXLoader(cache_file=self.__cache_file).convert_chunk(self.__blocks)
+
+        self.assertFalse(any(hit for _, _, _, hit in results))
+        # Entries normalised under other rules were dropped when the cache was opened, so they are not hit again either.
+        self.assertFalse(any(hit for _, _, _, hit in BibTeXLoader(cache_file=self.__cache_file).convert_chunk(self.__blocks)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+from typing import Any
+from unittest import TestCase, main
+
+from normaliser import Normaliser, NormalisedEntry
+
+import gc
+import weakref
+
+
+class NormaliserTest(TestCase):
+    ENTRY: dict[str, str] = {"id": "entry", "entrytype": "article", "title": "Proof {Search} in \\emph{Lean}", "author": "Smith, Anna and Chen, Wei", "journal": "Journal of Proofs"}
+
+    def test_instances_are_freed_without_the_garbage_collector(self) -> None:
+        normaliser: Normaliser = Normaliser()
+        normaliser.normalise_bibtex_entry(dict(self.ENTRY))
+        reference: weakref.ref[Normaliser] = weakref.ref(normaliser)
+
+        gc.disable()
+
+        try:
+            del normaliser
+
+            self.assertIsNone(reference())
+        finally:
+            gc.enable()
+
+    def test_caches_are_per_instance(self) -> None:
+        first: Normaliser = Normaliser()
+        second: Normaliser = Normaliser()
+        entry: NormalisedEntry = first.normalise_bibtex_entry(dict(self.ENTRY))
+
+        self.assertEqual(first.normalise_bibtex_entry(dict(self.ENTRY)), entry)
+        self.assertGreater(first.cache_statistics()["tokenise"]["hits"], 0)
+        self.assertEqual(second.cache_statistics()["tokenise"]["size"], 0)
+        self.assertEqual(second.normalise_bibtex_entry(dict(self.ENTRY)), entry)
+
+        norm: dict[str, Any] = entry["norm"]
+
+        self.assertEqual(norm["title"], "proof search in lean")
+        self.assertEqual(norm["title_tokens"], ["proof", "search", "in", "lean"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+from contextlib import redirect_stdout
+from io import StringIO
+from json import load
+from tempfile import TemporaryDirectory
+from threading import Thread
+from time import monotonic, sleep
+from typing import Any, Callable
+from unittest import TestCase, main
+from unittest.mock import patch
+
+from daemon_client import DaemonClient
+from database_journal import open_journaled_storage
+from normaliser import NormalisedEntry
+from pipeline_daemon import PipelineDaemon
+from sync_database import SyncDatabase
+from synthetic_corpus import SyntheticCorpus
+
+import os
+
+
+class PipelineDaemonTest(TestCase):
+    TIMEOUT: float = 30.0
+
+    def setUp(self) -> None:
+        self.__directory: TemporaryDirectory[str] = TemporaryDirectory()
+        self.__papers_json: str = self.__path("papers.json")
+        self.__entries: list[NormalisedEntry] = SyntheticCorpus(size=12, duplicate_rate=0.0, seed=3).normalised_entries()
+        self.__client: DaemonClient = DaemonClient(self.__path("pipeline.sock"), timeout=self.TIMEOUT)
+
+        open_journaled_storage(self.__papers_json).save(self.__entries[:10])
+
+    def tearDown(self) -> None:
+        self.__directory.cleanup()
+
+    def __path(self, name: str) -> str:
+        return os.path.join(self.__directory.name, name)
+
+    def __serve(self, client: Callable[[], None]) -> None:
+        # The daemon installs signal handlers, so it runs on the main thread and the client on another.
+        daemon: PipelineDaemon = PipelineDaemon(
+            papers_database=self.__papers_json,
+            bibtex_file=self.__path("papers.bib"),
+            socket_path=self.__client.socket_path,
+            poll_interval=0.05,
+            syncer=SyncDatabase(
+                papers_json=self.__papers_json,
+                db_path=self.__path("deployed.json"),
+                db_backup_path=self.__path("deployed.json.bak"),
+                incremental=True,
+                index_path=self.__path("index.json"),
+                related_path=self.__path("related.json"),
+                state_path=self.__path("sync_state.json"),
+            ),
+        )
+        errors: list[BaseException] = []
+
+        def run_client() -> None:
+            try:
+                self.__wait_until(lambda: os.path.exists(self.__client.socket_path))
+                client()
+            except BaseException as e:
+                errors.append(e)
+            finally:
+                try:
+                    self.__client.request({"command": "stop"})
+                except (ConnectionError, RuntimeError):
+                    daemon.stop()
+
+        thread: Thread = Thread(target=run_client)
+
+        thread.start()
+
+        with redirect_stdout(StringIO()):
+            daemon.serve()
+
+        thread.join()
+
+        if errors:
+            raise errors[0]
+
+    def __wait_until(self, condition: Callable[[], bool]) -> None:
+        deadline: float = monotonic() + self.TIMEOUT
+
+        while not condition():
+            if monotonic() > deadline:
+                raise AssertionError("The daemon did not get there in time.")
+
+            sleep(0.05)
+
+    def __status(self) -> dict[str, Any]:
+        return self.__client.request({"command": "status"})
+
+    def __read(self, name: str) -> Any:
+        with open(self.__path(name), "r", encoding="utf-8") as json_file:
+            return load(json_file)
+
+    def test_submitted_papers_are_synced(self) -> None:
+        def client() -> None:
+            self.assertEqual(self.__status()["syncs"], 1)
+
+            response: dict[str, Any] = self.__client.request({"command": "add", "entries": [dict(entry["raw"]) for entry in self.__entries[10:]]})
+
+            self.assertEqual([status for _, _, status, _ in response["report"]], ["accepted", "accepted"])
+            self.__wait_until(lambda: self.__status()["syncs"] == 2)
+            self.assertEqual(self.__status()["papers"], 12)
+
+        self.__serve(client)
+
+        self.assertEqual([paper["id"] for paper in self.__read("deployed.json")], [entry["raw"]["id"] for entry in self.__entries])
+        self.assertEqual(self.__read("index.json")["size"], 12)
+        self.assertEqual(self.__read("related.json")["size"], 12)
+
+    def test_failed_requests_are_answered(self) -> None:
+        def client() -> None:
+            with patch("pipeline_daemon.PaperEntryParser.add_entries", side_effect=OSError("disk full")), self.assertRaisesRegex(RuntimeError, "disk full"):
+                self.__client.request({"command": "add", "entries": [dict(self.__entries[10]["raw"])]})
+
+            with patch("pipeline_daemon.PaperEntryParser.add_entries", side_effect=ZeroDivisionError("unexpected")), self.assertRaisesRegex(RuntimeError, "unexpected"):
+                self.__client.request({"command": "add", "entries": [dict(self.__entries[10]["raw"])]})
+
+            with self.assertRaisesRegex(RuntimeError, "command"):
+                self.__client.request({"command": "unknown"})
+
+            # The daemon is still serving.
+            self.assertEqual(self.__status()["papers"], 10)
+
+        self.__serve(client)
+
+    def test_failed_syncs_are_retried(self) -> None:
+        def client() -> None:
+            with patch("sync_database.SyncDatabase.sync_database", side_effect=PermissionError("read-only file system")):
+                self.assertEqual(self.__client.request({"command": "sync"}), {"ok": True})
+
+            self.assertEqual(self.__status()["syncs"], 1)
+            self.assertEqual(self.__client.request({"command": "sync"}), {"ok": True})
+            self.assertEqual(self.__status()["syncs"], 2)
+
+        self.__serve(client)
+
+
+if __name__ == "__main__":
+    main()
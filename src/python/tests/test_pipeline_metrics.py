@@ -0,0 +1,43 @@
+from concurrent.futures import ProcessPoolExecutor
+from unittest import TestCase, main
+
+from bibtex_loader import WorkerResult, _convert_chunk_in_worker, _initialise_worker
+from bibtex_parser import SourceEntry
+from pipeline_metrics import PipelineMetrics
+from synthetic_corpus import SyntheticCorpus
+
+
+class PipelineMetricsTest(TestCase):
+    def test_merge_adds_times_and_counters(self) -> None:
+        worker: PipelineMetrics = PipelineMetrics()
+        worker.collect()
+        worker.add_time("normalisation", 0.25)
+        worker.count("conversion", "cache_hits", 3)
+
+        parent: PipelineMetrics = PipelineMetrics()
+        parent.collect()
+        parent.add_time("normalisation", 0.5)
+        parent.merge(worker.take())
+        parent.merge(worker.take())
+
+        self.assertEqual(parent.report()["stages"]["normalisation"], {"seconds": 0.75, "calls": 2})
+        self.assertEqual(parent.report()["counters"], {"conversion": {"cache_hits": 3}})
+        self.assertEqual(worker.take(), {"stages": {}, "counters": {}})
+
+    def test_workers_return_their_metrics(self) -> None:
+        chunk: list[SourceEntry] = [(line, entry) for line, entry in enumerate(SyntheticCorpus(size=20, seed=3).bibtex_entries(), start=1)]
+
+        with ProcessPoolExecutor(max_workers=1, initializer=_initialise_worker, initargs=(None, True)) as pool:
+            results, metrics = pool.submit(_convert_chunk_in_worker, chunk).result()
+
+        self.assertEqual(len(results), 20)
+        self.assertEqual(metrics["stages"]["normalisation"]["calls"], 20)
+
+        with ProcessPoolExecutor(max_workers=1, initializer=_initialise_worker, initargs=(None, False)) as pool:
+            worker_result: WorkerResult = pool.submit(_convert_chunk_in_worker, chunk).result()
+
+        self.assertIsNone(worker_result[1])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+from json import dumps, loads
+from typing import Any
+from unittest import TestCase, main
+
+from normaliser import NormalisedEntry
+from related_papers import Neighbour, RelatedPapers
+from synthetic_corpus import SyntheticCorpus
+
+
+class RelatedPapersTest(TestCase):
+    def setUp(self) -> None:
+        self.__entries: list[NormalisedEntry] = SyntheticCorpus(size=400, duplicate_rate=0.1, seed=8).normalised_entries()
+
+    def __update(self, entries: list[NormalisedEntry], state: dict[str, Any]) -> tuple[RelatedPapers, list[list[Neighbour]], dict[str, Any]]:
+        related: RelatedPapers = RelatedPapers(entries)
+        table: list[list[Neighbour]] = related.compute(state)
+
+        # The state goes through JSON between syncs.
+        return related, table, loads(dumps(related.state(table)))
+
+    def __assert_ranks_as_a_full_build(self, entries: list[NormalisedEntry], table: list[list[Neighbour]]) -> None:
+        exact: RelatedPapers = RelatedPapers(entries, k=len(entries))
+        full: list[list[Neighbour]] = RelatedPapers(entries).compute()
+        # Each weight behind a kept score is within IDF_DRIFT of a reference the current weight is also within.
+        tolerance: float = 8 * RelatedPapers.IDF_DRIFT
+
+        for row, (neighbours, expected) in enumerate(zip(table, full)):
+            scores: dict[int, float] = dict(exact.neighbours(row))
+
+            # Where the ranking differs from a full build, the paper at each rank scores within the tolerance of the one it displaced,
+            # and papers kept or dropped at the end of a list score within the tolerance of MINIMUM_SCORE.
+            for rank in range(max(len(neighbours), len(expected))):
+                score: float = scores.get(neighbours[rank][0], RelatedPapers.MINIMUM_SCORE) if rank < len(neighbours) else RelatedPapers.MINIMUM_SCORE
+                expected_score: float = expected[rank][1] if rank < len(expected) else RelatedPapers.MINIMUM_SCORE
+
+                self.assertLessEqual(abs(score - expected_score), tolerance * expected_score + 0.001, (row, neighbours, expected))
+
+        # Near ties are rare: almost every paper keeps exactly the related papers of a full build.
+        self.assertGreater(sum([other for other, _ in neighbours] == [other for other, _ in expected] for neighbours, expected in zip(table, full)), 0.95 * len(entries))
+
+    def test_updates_rank_as_a_full_build(self) -> None:
+        related: RelatedPapers = RelatedPapers(self.__entries[:300])
+        state: dict[str, Any] = loads(dumps(related.state(related.compute())))
+
+        # Papers added and removed a few at a time: the drift of the weights must not add up over the syncs.
+        for sync in range(1, 21):
+            entries: list[NormalisedEntry] = self.__entries[2 * sync:300 + 5 * sync]
+            related, table, state = self.__update(entries, state)
+
+            with self.subTest(sync=sync):
+                self.assertLess(related.recomputed, len(entries))
+                self.__assert_ranks_as_a_full_build(entries, table)
+
+    def test_drifted_weights_are_rescored(self) -> None:
+        related: RelatedPapers = RelatedPapers(self.__entries[:200])
+        state: dict[str, Any] = loads(dumps(related.state(related.compute())))
+
+        # Doubling the catalogue moves every weight by more than IDF_DRIFT.
+        related, table, state = self.__update(self.__entries, state)
+
+        self.assertEqual(related.recomputed, len(self.__entries))
+        self.assertEqual(table, RelatedPapers(self.__entries).compute())
+
+        # Nothing changed since, so nothing is rescored.
+        related, table, state = self.__update(self.__entries, state)
+
+        self.assertEqual(related.recomputed, 0)
+        self.assertEqual(table, RelatedPapers(self.__entries).compute())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+from hashlib import sha256
+from tempfile import TemporaryDirectory
+from typing import Any
+from unittest import TestCase, main
+from unittest.mock import patch
+
+from normaliser import Normaliser, NormalisedEntry
+from search_index import SearchIndex
+from synthetic_corpus import SyntheticCorpus
+
+import os
+import sqlite3
+
+
+class SearchIndexTest(TestCase):
+    def setUp(self) -> None:
+        self.__directory: TemporaryDirectory[str] = TemporaryDirectory()
+        self.__index_file: str = os.path.join(self.__directory.name, "papers.search.sqlite3")
+        self.__entries: list[NormalisedEntry] = SyntheticCorpus(size=20, duplicate_rate=0.0, seed=3).normalised_entries()
+
+    def tearDown(self) -> None:
+        self.__directory.cleanup()
+
+    def __edited(self, entry: NormalisedEntry, **fields: str) -> NormalisedEntry:
+        raw: dict[str, Any] = {**entry["raw"], **fields}
+
+        return Normaliser().normalise_bibtex_entry(raw)
+
+    def __ids(self, search_index: SearchIndex, query: str) -> list[str]:
+        return [entry_id for entry_id, _, _ in search_index.search(query, limit=100)]
+
+    def test_in_place_edit_is_reindexed(self) -> None:
+        search_index: SearchIndex = SearchIndex(self.__index_file)
+        entry_id: str = self.__entries[3]["norm"]["id"]
+
+        self.assertEqual(search_index.sync(self.__entries), 20)
+
+        entries: list[NormalisedEntry] = list(self.__entries)
+        entries[3] = self.__edited(entries[3], title="Zymurgical Quokkas in Proof Assistants")
+
+        self.assertEqual(search_index.sync(entries), 1)
+        self.assertEqual(self.__ids(search_index, "zymurgical quokkas"), [entry_id])
+        self.assertEqual(search_index.search("zymurgical", limit=1)[0][2], "Zymurgical Quokkas in Proof Assistants")
+
+        # The old title tokens no longer point at the edited paper.
+        for token in set(self.__entries[3]["norm"]["title_tokens"]) - set(entries[3]["norm"]["title_tokens"]):
+            self.assertNotIn(entry_id, self.__ids(search_index, token))
+
+        self.assertEqual(search_index.sync(entries), 0)
+        self.assertEqual(len(search_index), 20)
+
+        search_index.close()
+
+    def test_appends_and_removals(self) -> None:
+        search_index: SearchIndex = SearchIndex(self.__index_file)
+
+        self.assertEqual(search_index.sync(self.__entries[:15]), 15)
+        self.assertEqual(search_index.sync(self.__entries), 5)
+        # A removed paper rebuilds the index.
+        self.assertEqual(search_index.sync(self.__entries[1:]), 19)
+        self.assertEqual(len(search_index), 19)
+
+        search_index.close()
+
+    def test_changed_positions_limit_fingerprinting(self) -> None:
+        search_index: SearchIndex = SearchIndex(self.__index_file)
+        entries: list[NormalisedEntry] = list(self.__entries)
+
+        self.assertEqual(search_index.sync(entries[:15]), 15)
+
+        # An append only fingerprints the new papers.
+        with patch("search_index.sha256", wraps=sha256) as fingerprint:
+            self.assertEqual(search_index.sync(entries[:16], changed=()), 1)
+
+        self.assertEqual(fingerprint.call_count, 1)
+
+        entries[3] = self.__edited(entries[3], title="Zymurgical Quokkas in Proof Assistants")
+        entries[4] = self.__edited(entries[4], title="Unreported Edit of a Paper")
+
+        # Positions reported as changed are checked, others are trusted until a sync without them.
+        with patch("search_index.sha256", wraps=sha256) as fingerprint:
+            self.assertEqual(search_index.sync(entries[:17], changed=[3]), 2)
+
+        self.assertEqual(fingerprint.call_count, 3)
+        self.assertEqual(self.__ids(search_index, "zymurgical"), [entries[3]["norm"]["id"]])
+        self.assertEqual(self.__ids(search_index, "unreported"), [])
+        self.assertEqual(search_index.sync(entries), 4)
+        self.assertEqual(self.__ids(search_index, "unreported"), [entries[4]["norm"]["id"]])
+
+        search_index.close()
+
+    def test_index_without_fingerprints_is_rebuilt(self) -> None:
+        connection: sqlite3.Connection = sqlite3.connect(self.__index_file)
+
+        connection.execute("CREATE TABLE documents (doc INTEGER PRIMARY KEY, id TEXT NOT NULL, title TEXT NOT NULL, length REAL NOT NULL)")
+        connection.execute("INSERT INTO documents VALUES (0, 'stale', 'Stale', 1.0)")
+        connection.commit()
+        connection.close()
+
+        search_index: SearchIndex = SearchIndex(self.__index_file)
+
+        self.assertEqual(len(search_index), 0)
+        self.assertEqual(search_index.sync(self.__entries), 20)
+
+        search_index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+from contextlib import redirect_stdout
+from io import StringIO
+from json import load
+from tempfile import TemporaryDirectory
+from typing import Any, Optional, Sequence
+from unittest import TestCase, main
+from unittest.mock import patch
+
+from database_journal import open_journaled_storage
+from entry_store import EntryStore
+from normaliser import NormalisedEntry
+from sync_database import SyncDatabase
+from synthetic_corpus import SyntheticCorpus
+
+import os
+import stat
+
+
+class SyncDatabaseTest(TestCase):
+    UNCHANGED: dict[str, list[str]] = {"added": [], "removed": [], "modified": []}
+
+    def setUp(self) -> None:
+        self.__directory: TemporaryDirectory[str] = TemporaryDirectory()
+        self.__papers_json: str = self.__path("papers.json")
+        self.__entries: list[NormalisedEntry] = SyntheticCorpus(size=30, duplicate_rate=0.0, seed=2).normalised_entries()
+
+        open_journaled_storage(self.__papers_json).save(self.__entries[:25])
+
+    def tearDown(self) -> None:
+        self.__directory.cleanup()
+
+    def __path(self, name: str) -> str:
+        return os.path.join(self.__directory.name, name)
+
+    def __sync(self, shard_size: int = 10, related_k: int = 5, entries: Optional[Sequence[NormalisedEntry]] = None) -> dict[str, list[str]]:
+        syncer: SyncDatabase = SyncDatabase(
+            papers_json=self.__papers_json,
+            db_path=self.__path("deployed.json"),
+            db_backup_path=self.__path("deployed.json.bak"),
+            incremental=True,
+            change_set_path=self.__path("change_set.json"),
+            index_path=self.__path("index.json"),
+            shard_directory=self.__path("shards"),
+            shard_size=shard_size,
+            related_path=self.__path("related.json"),
+            related_state_path=self.__path("related_state.json"),
+            related_k=related_k,
+            state_path=self.__path("sync_state.json"),
+        )
+
+        with redirect_stdout(StringIO()):
+            syncer.sync_database(entries)
+
+        if not os.path.exists(self.__path("change_set.json")):
+            return {}
+
+        with open(self.__path("change_set.json"), "r", encoding="utf-8") as change_set_file:
+            change_set: dict[str, list[str]] = load(change_set_file)
+
+        return change_set
+
+    def __mode(self, name: str) -> int:
+        return stat.S_IMODE(os.stat(self.__path(name)).st_mode)
+
+    def __read(self, name: str) -> Any:
+        with open(self.__path(name), "r", encoding="utf-8") as json_file:
+            return load(json_file)
+
+    def test_change_sets(self) -> None:
+        ids: list[str] = [entry["raw"]["id"] for entry in self.__entries]
+
+        self.assertEqual(self.__sync(), {"added": ids[:25], "removed": [], "modified": []})
+        # Nothing changed, so the change set of the first run is replaced by an empty one.
+        self.assertEqual(self.__sync(), self.UNCHANGED)
+
+        edited: dict[str, Any] = {"raw": {**self.__entries[3]["raw"], "title": "An Edited Title"}, "norm": self.__entries[3]["norm"]}
+
+        open_journaled_storage(self.__papers_json).save([*self.__entries[:3], edited, *self.__entries[5:26]])
+
+        self.assertEqual(self.__sync(), {"added": [ids[25]], "removed": [ids[4]], "modified": [ids[3]]})
+
+        with open(self.__path("deployed.json"), "r", encoding="utf-8") as deployed_file:
+            self.assertEqual([paper["id"] for paper in load(deployed_file)], [*ids[:4], *ids[5:26]])
+
+    def test_output_modes(self) -> None:
+        self.__sync()
+
+        for name in ("deployed.json", "index.json", "related.json", os.path.join("shards", SyncDatabase.MANIFEST_FILE), *(os.path.join("shards", shard) for shard in os.listdir(self.__path("shards")))):
+            self.assertEqual(self.__mode(name), 0o644, name)
+
+        # An existing deployed file keeps the permissions it was given.
+        os.chmod(self.__path("deployed.json"), 0o640)
+        open_journaled_storage(self.__papers_json).save(self.__entries)
+        self.__sync()
+
+        self.assertEqual(self.__mode("deployed.json"), 0o640)
+
+    def test_outputs_catch_up_after_a_failed_sync(self) -> None:
+        self.__sync()
+
+        open_journaled_storage(self.__papers_json).save(self.__entries)
+
+        with patch("sync_database.FacetIndex", side_effect=OSError("disk full")), self.assertRaises(RuntimeError):
+            self.__sync()
+
+        # The deployed database was written before the failure, so only the outputs are behind.
+        self.assertEqual(len(self.__read("deployed.json")), 30)
+        self.assertEqual(self.__sync(), self.UNCHANGED)
+        self.assertEqual(self.__read("index.json")["size"], 30)
+        self.assertEqual(self.__read("related.json")["size"], 30)
+        self.assertEqual(self.__read(os.path.join("shards", SyncDatabase.MANIFEST_FILE))["size"], 30)
+
+    def test_outputs_follow_their_settings(self) -> None:
+        self.__sync()
+
+        self.assertEqual(len(self.__read(os.path.join("shards", SyncDatabase.MANIFEST_FILE))["shards"]), 3)
+        self.assertEqual(self.__read("related.json")["k"], 5)
+
+        with patch("sync_database.FacetIndex", side_effect=AssertionError("the index is up to date")):
+            self.assertEqual(self.__sync(shard_size=5, related_k=3), self.UNCHANGED)
+
+        self.assertEqual(len(self.__read(os.path.join("shards", SyncDatabase.MANIFEST_FILE))["shards"]), 5)
+        self.assertEqual(self.__read("related.json")["k"], 3)
+
+    def test_entries_from_memory(self) -> None:
+        self.__sync()
+
+        open_journaled_storage(self.__papers_json).save(self.__entries)
+
+        with open(self.__path("deployed.json"), "rb") as deployed_file:
+            before: bytes = deployed_file.read()
+
+        syncer: SyncDatabase = SyncDatabase(papers_json=self.__papers_json, db_path=self.__path("deployed.json"), db_backup_path=self.__path("deployed.json.bak"), incremental=True)
+
+        with redirect_stdout(StringIO()):
+            syncer.sync_database(self.__entries[:25])
+
+        with open(self.__path("deployed.json"), "rb") as deployed_file:
+            self.assertEqual(deployed_file.read(), before)
+
+    def test_entries_from_an_entry_store(self) -> None:
+        self.__sync(entries=self.__entries[:25])
+
+        with open(self.__path("index.json"), "rb") as index_file:
+            before: bytes = index_file.read()
+
+        # The views of an EntryStore fingerprint the same as the dicts they were built from, so nothing is rebuilt.
+        with patch("sync_database.FacetIndex", side_effect=AssertionError("the index is up to date")):
+            self.assertEqual(self.__sync(entries=EntryStore(self.__entries[:25])), self.UNCHANGED)
+
+        self.assertEqual(self.__sync(entries=EntryStore(self.__entries)), {"added": [entry["raw"]["id"] for entry in self.__entries[25:]], "removed": [], "modified": []})
+        self.assertEqual(self.__read("index.json")["size"], 30)
+        self.assertEqual(self.__read("related.json")["size"], 30)
+        self.assertEqual(self.__read(os.path.join("shards", SyncDatabase.MANIFEST_FILE))["size"], 30)
+
+        with open(self.__path("index.json"), "rb") as index_file:
+            self.assertNotEqual(index_file.read(), before)
+
+    def __sync_fully(self) -> None:
+        syncer: SyncDatabase = SyncDatabase(papers_json=self.__papers_json, db_path=self.__path("deployed.json"), db_backup_path=self.__path("deployed.json.bak"), index_path=self.__path("index.json"))
+
+        with redirect_stdout(StringIO()):
+            syncer.sync_database()
+
+    def test_full_sync_keeps_a_written_database(self) -> None:
+        self.__sync_fully()
+
+        open_journaled_storage(self.__papers_json).save(self.__entries)
+
+        # The new database was written, so an output that fails does not bring back the old one.
+        with patch("sync_database.FacetIndex", side_effect=OSError("disk full")), self.assertRaisesRegex(OSError, "disk full"):
+            self.__sync_fully()
+
+        self.assertEqual(len(self.__read("deployed.json")), 30)
+
+    def test_full_sync_restores_the_backup(self) -> None:
+        self.__sync_fully()
+
+        with patch("sync_database.dump", side_effect=OSError("disk full")), self.assertRaisesRegex(RuntimeError, "disk full"):
+            self.__sync_fully()
+
+        self.assertEqual(len(self.__read("deployed.json")), 25)
+
+        # Without a backup to restore, the failure to write is what is reported.
+        os.remove(self.__path("deployed.json"))
+
+        with patch("sync_database.dump", side_effect=OSError("disk full")), self.assertRaisesRegex(RuntimeError, "disk full"):
+            self.__sync_fully()
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,8 @@ import { AutoFormalisationPaperLoader } from "./papers/AutoFormalisationPaperLoa
 import { AutoFormalisationSidebarDiv, Page } from "./divs/AutoFormalisationSideBarDiv";
 import { AutoFormalisationHomePageDiv } from "./divs/AutoFormalisationHomePageDiv";
 import { Paper } from "./papers/Paper";
+import { PaperIndex } from "./papers/PaperIndex";
+import { PaperManifest } from "./papers/PaperManifest";
 import { EmptyFilters } from "./papers/EmptyFilters";
 import { AutoFormalisationAboutDiv } from "./divs/AutoFormalisationAboutDiv";
 import { AutoFormalisationStatisticsDiv } from "./divs/AutoFormalisationStatisticsDiv";
@@ -12,7 +14,8 @@ export class Main {
 
     public static async main(): Promise<void> {
         const papersJsonPath: string = "_data/papers.json";
-        const [papers] = await AutoFormalisationPaperLoader.loadPapers(papersJsonPath);
+        const manifestJsonPath: string = "_data/papers/manifest.json";
+        const indexJsonPath: string = "_data/papers.index.json";
 
         // Main content wrapper
         const mainContent: HTMLDivElement = document.createElement("div");
@@ -20,44 +23,94 @@ export class Main {
 
         // Pages
         const homePage: AutoFormalisationHomePageDiv = new AutoFormalisationHomePageDiv();
-        const browseDiv: AutoFormalisationMainContainerDiv = new AutoFormalisationMainContainerDiv(papers, new EmptyFilters(), "Browse Papers", "", "Filter and search the autoformalization paper catalogue.");
         const about: AutoFormalisationAboutDiv = new AutoFormalisationAboutDiv();
-        const statisticsPage: AutoFormalisationStatisticsDiv = new AutoFormalisationStatisticsDiv(papers);
+        let browseDiv: AutoFormalisationMainContainerDiv | null = null;
+        let statisticsPage: AutoFormalisationStatisticsDiv | null = null;
+        let currentPage: Page = "home";
 
-        browseDiv.pack();
-        browseDiv.getDiv().hidden = true;
         about.getDiv().hidden = true;
-        statisticsPage.pack();
-        statisticsPage.getDiv().hidden = true;
 
         mainContent.appendChild(homePage.getDiv());
-        mainContent.appendChild(browseDiv.getDiv());
         mainContent.appendChild(about.getDiv());
-        mainContent.appendChild(statisticsPage.getDiv());
 
-        // Sidebar
-        const sidebar: AutoFormalisationSidebarDiv = new AutoFormalisationSidebarDiv((page: Page) => {
+        const showPage = (page: Page): void => {
+            currentPage = page;
+
             homePage.hide();
-            browseDiv.getDiv().hidden = true;
             about.hide();
-            statisticsPage.getDiv().hidden = true;
+
+            if (browseDiv) {
+                browseDiv.getDiv().hidden = true;
+            }
+
+            if (statisticsPage) {
+                statisticsPage.getDiv().hidden = true;
+            }
 
             if (page === "home") {
                 homePage.show();
-            } else if (page === "browse") {
+            } else if (page === "browse" && browseDiv) {
                 browseDiv.getDiv().hidden = false;
                 browseDiv.show();
             } else if (page === "about") {
                 about.getDiv().hidden = false;
                 about.show();
-            } else if (page === "trends") {
+            } else if (page === "trends" && statisticsPage) {
                 statisticsPage.getDiv().hidden = false;
                 statisticsPage.show();
             }
             // Add new pages here as else-if branches
-        });
+        };
+
+        // Builds the paper pages, replacing those built from an earlier, partial list.
+        const showPapers = (papers: Paper[], index: PaperIndex | null): void => {
+            const newBrowseDiv: AutoFormalisationMainContainerDiv = new AutoFormalisationMainContainerDiv(papers, new EmptyFilters(), "Browse Papers", "", "Filter and search the autoformalization paper catalogue.", index);
+            const newStatisticsPage: AutoFormalisationStatisticsDiv = new AutoFormalisationStatisticsDiv(papers, index);
+
+            newBrowseDiv.pack();
+            newBrowseDiv.getDiv().hidden = true;
+            newStatisticsPage.pack();
+            newStatisticsPage.getDiv().hidden = true;
+
+            if (browseDiv && statisticsPage) {
+                statisticsPage.destroyCharts();
+                browseDiv.getDiv().replaceWith(newBrowseDiv.getDiv());
+                statisticsPage.getDiv().replaceWith(newStatisticsPage.getDiv());
+            }
+            else {
+                mainContent.appendChild(newBrowseDiv.getDiv());
+                mainContent.appendChild(newStatisticsPage.getDiv());
+            }
+
+            browseDiv = newBrowseDiv;
+            statisticsPage = newStatisticsPage;
+
+            showPage(currentPage);
+        };
+
+        // Sidebar
+        const sidebar: AutoFormalisationSidebarDiv = new AutoFormalisationSidebarDiv(showPage);
 
         document.body.appendChild(sidebar.getDiv());
         document.body.appendChild(mainContent);
+
+        const manifest: PaperManifest | null = await AutoFormalisationPaperLoader.loadManifest(manifestJsonPath);
+
+        if (manifest === null || manifest.shards.length === 0) {
+            const [papers] = await AutoFormalisationPaperLoader.loadPapers(papersJsonPath);
+
+            showPapers(papers, await AutoFormalisationPaperLoader.loadIndex(indexJsonPath, papers.length));
+
+            return;
+        }
+
+        // Every shard is requested at once; the first page is shown as soon as its shard arrives.
+        const shards: Promise<Paper[]>[] = AutoFormalisationPaperLoader.loadShards(manifestJsonPath, manifest);
+
+        showPapers(await shards[0], null);
+
+        const papers: Paper[] = (await Promise.all(shards)).flat();
+
+        showPapers(papers, await AutoFormalisationPaperLoader.loadIndex(indexJsonPath, papers.length));
     }
-}
\ No newline at end of file
+}
@@ -6,6 +6,8 @@ import { AutoFormalisationPaperDiv } from "./AutoFormalisationPaperDiv";
 import { Paper } from "../papers/Paper";
 import { Filters } from "../papers/Filters";
 import { EmptyFilters } from "../papers/EmptyFilters";
+import { PaperIndex } from "../papers/PaperIndex";
+import { AutoFormalisationPaperIndexer } from "../papers/AutoFormalisationPaperIndexer";
 import { AutoFormalisationPapersDiv } from "./AutoFormalisationPapersDiv";
 import { AutoFormalisationFiltersDiv } from "./AutoFormalisationFiltersDiv";
 import { AutoFormalisationPaginationDiv } from "./AutoFormalisationPaginationDiv";
@@ -14,6 +16,9 @@ export class AutoFormalisationMainContainerDiv implements AutoFormalisationDiv {
     private readonly div: HTMLDivElement;
     private readonly topMessageDiv: AutoFormalisationTopMessageDiv;
     private readonly filtersDiv: AutoFormalisationFiltersDiv;
+    private readonly papers: Paper[];
+    private readonly index: PaperIndex | null;
+    private readonly filteredPositions: number[] | null;
     private readonly filteredPapers: Paper[];
     private readonly topMessage: string;
     private readonly counterMessage: string;
@@ -24,7 +29,7 @@ export class AutoFormalisationMainContainerDiv implements AutoFormalisationDiv {
     private currentlyVisiblePapers: Paper[] = [];
     private currentPaginationDiv!: AutoFormalisationPaginationDiv;
 
-    public constructor(papers: Paper[], filters: Filters, topMessage: string, counterMessage: string, description: string) {
+    public constructor(papers: Paper[], filters: Filters, topMessage: string, counterMessage: string, description: string, index: PaperIndex | null = null) {
         AutoFormalisationValidator.ensureExists(papers, "The papers list cannot be null or undefined.");
         AutoFormalisationValidator.ensureAllExist(papers, "The papers list cannot contain null or undefined entries.");
         AutoFormalisationValidator.ensureExists(filters, "The filters cannot be null or undefined.");
@@ -32,7 +37,12 @@ export class AutoFormalisationMainContainerDiv implements AutoFormalisationDiv {
         AutoFormalisationValidator.ensureExists(counterMessage, "The counter message cannot be null or undefined.");
         AutoFormalisationValidator.ensureExists(description, "The description cannot be null or undefined.");
 
-        this.filteredPapers = AutoFormalisationMainContainerDiv.filterPapers(papers, filters);
+        this.papers = papers;
+        this.index = index;
+        this.filteredPositions = index ? AutoFormalisationPaperIndexer.matchingPositions(index, papers, filters ?? new EmptyFilters()) : null;
+        this.filteredPapers = this.filteredPositions
+            ? this.filteredPositions.map(position => papers[position])
+            : AutoFormalisationMainContainerDiv.filterPapers(papers, filters);
         this.currentlyVisiblePapers = [...this.filteredPapers];
         this.topMessage = topMessage;
         this.counterMessage = counterMessage;
@@ -49,7 +59,18 @@ export class AutoFormalisationMainContainerDiv implements AutoFormalisationDiv {
     }
 
     private filtersCallback(filters: Filters): void {
-        this.currentlyVisiblePapers = this.filteredPapers.filter(p => this.doesPaperMatchFilters(p, filters));
+        if (this.index && this.filteredPositions) {
+            const positions: number[] = AutoFormalisationPaperIndexer.intersect([
+                this.filteredPositions,
+                AutoFormalisationPaperIndexer.matchingPositions(this.index, this.papers, filters ?? new EmptyFilters()),
+            ]);
+
+            this.currentlyVisiblePapers = positions.map(position => this.papers[position]);
+        }
+        else {
+            this.currentlyVisiblePapers = this.filteredPapers.filter(p => this.doesPaperMatchFilters(p, filters));
+        }
+
         this.currentPage = 1;
         this.refreshPapersDiv();
         this.refreshPaginationDiv();
@@ -101,10 +122,7 @@ export class AutoFormalisationMainContainerDiv implements AutoFormalisationDiv {
             && (!appliedFilters.goal || paper.goal === appliedFilters.goal)
             && (!appliedFilters.area || paper.area === appliedFilters.area)
             && (!appliedFilters.repository || paper.repository === appliedFilters.repository)
-            && (appliedFilters.search
-                ? (paper.title?.toLowerCase().includes(appliedFilters.search.toLowerCase())
-                    || paper.author?.toLowerCase().includes(appliedFilters.search.toLowerCase()))
-                : true)) ?? false;
+            && AutoFormalisationPaperIndexer.matchesSearch(paper, appliedFilters.search)) ?? false;
     }
 
     private static filterPapers(papers: Paper[], filters: Filters): Paper[] {
@@ -116,19 +134,21 @@ export class AutoFormalisationMainContainerDiv implements AutoFormalisationDiv {
             .filter((p) => !appliedFilters.goal || p.goal === appliedFilters.goal)
             .filter((p) => !appliedFilters.area || p.area === appliedFilters.area)
             .filter((p) => !appliedFilters.repository || p.repository === appliedFilters.repository)
-            .filter((p) => {
-                if (appliedFilters.search) {
-                    const s: string = appliedFilters.search.toLowerCase();
-
-                    return (p.title?.toLowerCase().includes(s) || p.author?.toLowerCase().includes(s));
-                }
-                else {
-                    return true;
-                }
-            });
+            .filter((p) => AutoFormalisationPaperIndexer.matchesSearch(p, appliedFilters.search));
     }
 
     private createFiltersDiv(papers: Paper[]): AutoFormalisationFiltersDiv {
+        if (this.index) {
+            return new AutoFormalisationFiltersDiv(
+                AutoFormalisationPaperIndexer.facetValues(this.index, "language"),
+                AutoFormalisationPaperIndexer.facetValues(this.index, "type"),
+                AutoFormalisationPaperIndexer.facetValues(this.index, "goal"),
+                AutoFormalisationPaperIndexer.facetValues(this.index, "area"),
+                AutoFormalisationPaperIndexer.facetValues(this.index, "repository"),
+                this.filtersCallback.bind(this)
+            );
+        }
+
         const langsSet: Set<string> = new Set(papers.map(p => p.language).filter((x): x is string => !!x));
         const typesSet: Set<string> = new Set(papers.map(p => p.type).filter((x): x is string => !!x));
         const goalsSet: Set<string> = new Set(papers.map(p => p.goal).filter((x): x is string => !!x));
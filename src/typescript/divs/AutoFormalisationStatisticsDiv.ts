@@ -1,5 +1,6 @@
 import Chart from "chart.js/auto";
 import { Paper } from "../papers/Paper";
+import { PaperIndex } from "../papers/PaperIndex";
 import { AutoFormalisationValidator } from "../utils/AutoFormalisationValidator";
 import { AutoFormalisationDiv } from "./AutoFormalisationDiv";
 import { AutoFormalisationHTMLUtils } from "../utils/AutoFormalisationHTMLUtils";
@@ -7,17 +8,19 @@ import { AutoFormalisationHTMLUtils } from "../utils/AutoFormalisationHTMLUtils"
 export class AutoFormalisationStatisticsDiv implements AutoFormalisationDiv {
     private readonly div: HTMLDivElement;
     private readonly papers: Paper[];
+    private readonly index: PaperIndex | null;
     private yearChart!: HTMLCanvasElement;
     private llmChart!: HTMLCanvasElement;
     private yearChartInstance: Chart | null = null;
     private llmChartInstance: Chart | null = null;
     private packed: boolean;
 
-    public constructor(papers: Paper[]) {
+    public constructor(papers: Paper[], index: PaperIndex | null = null) {
         AutoFormalisationValidator.ensureExists(papers, "The papers cannot be null or undefined.");
         AutoFormalisationValidator.ensureAllExist(papers, "The papers cannot contain null or undefined entries.");
 
         this.papers = papers;
+        this.index = index;
 
         this.div = document.createElement("div");
 
@@ -154,6 +157,13 @@ export class AutoFormalisationStatisticsDiv implements AutoFormalisationDiv {
     }
 
     private packCharts(): void {
+        if (this.index) {
+            this.packYearChart({ ...this.index.counts.year });
+            this.packLLMChart({ ...this.index.counts.llm });
+
+            return;
+        }
+
         const byYear: Record<string, number> = {};
         const byLLM: Record<string, number> = {};
 
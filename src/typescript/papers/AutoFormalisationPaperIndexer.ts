@@ -0,0 +1,78 @@
+import { Filters } from "./Filters";
+import { Paper } from "./Paper";
+import { PaperIndex } from "./PaperIndex";
+
+export class AutoFormalisationPaperIndexer {
+    private constructor() {} // prevent instantiation
+
+    /** Whether the search text occurs in the title or the authors of the paper, ignoring case */
+    public static matchesSearch(paper: Paper, search: string | undefined): boolean {
+        if (!search) {
+            return true;
+        }
+
+        const s: string = search.toLowerCase();
+
+        return (paper.title?.toLowerCase().includes(s) || paper.author?.toLowerCase().includes(s)) ?? false;
+    }
+
+    /** Splits the search text into lowercase words the way FacetIndex splits titles and authors into tokens */
+    public static searchWords(search: string | undefined): string[] {
+        return (search ?? "").toLowerCase()
+            .split(/[ \t\n\r\f\v]+/)
+            .filter(word => word.length > 0);
+    }
+
+    /** Returns the facet values of the index, sorted for display */
+    public static facetValues(index: PaperIndex, facet: string): string[] {
+        return Object.keys(index.facets[facet] ?? {}).sort((a: string, b: string) => a.localeCompare(b));
+    }
+
+    /** Returns the positions of the papers matching the filters, in catalogue order */
+    public static matchingPositions(index: PaperIndex, papers: Paper[], filters: Filters): number[] {
+        const postings: number[][] = [];
+        const facetFilters: [string, string][] = [
+            ["language", filters.language],
+            ["type", filters.type],
+            ["goal", filters.goal],
+            ["area", filters.area],
+            ["repository", filters.repository],
+        ];
+
+        for (const [facet, value] of facetFilters) {
+            if (value) {
+                postings.push(index.facets[facet]?.[value] ?? []);
+            }
+        }
+
+        // A paper whose title or authors contain the search has, for each search word, a token containing that word.
+        // The tokens narrow the candidates, and each candidate is then checked by the same rule as without an index.
+        for (const word of AutoFormalisationPaperIndexer.searchWords(filters.search)) {
+            const positions: Set<number> = new Set();
+
+            for (const [token, tokenPostings] of Object.entries(index.tokens)) {
+                if (token.includes(word)) {
+                    tokenPostings.forEach(position => positions.add(position));
+                }
+            }
+
+            postings.push([...positions].sort((a: number, b: number) => a - b));
+        }
+
+        const positions: number[] = postings.length === 0
+            ? Array.from({ length: index.size }, (_, position: number) => position)
+            : AutoFormalisationPaperIndexer.intersect(postings);
+
+        return filters.search
+            ? positions.filter(position => AutoFormalisationPaperIndexer.matchesSearch(papers[position], filters.search))
+            : positions;
+    }
+
+    /** Intersects sorted postings, starting from the shortest */
+    public static intersect(postings: number[][]): number[] {
+        const [shortest, ...rest] = [...postings].sort((a: number[], b: number[]) => a.length - b.length);
+        const others: Set<number>[] = rest.map(p => new Set(p));
+
+        return shortest.filter(position => others.every(other => other.has(position)));
+    }
+}
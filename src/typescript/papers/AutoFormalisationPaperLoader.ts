@@ -1,5 +1,7 @@
 import { AutoFormalisationValidator } from "../utils/AutoFormalisationValidator";
 import { Paper } from "./Paper";
+import { PaperIndex } from "./PaperIndex";
+import { PaperManifest, PaperShard } from "./PaperManifest";
 
 export class AutoFormalisationPaperLoader {
     private constructor() {} // prevent instantiation
@@ -73,4 +75,83 @@ export class AutoFormalisationPaperLoader {
 
         return [papers, llmCount, languageCount];
     }
+
+    public static async loadManifest(manifestJsonPath: string): Promise<PaperManifest | null> {
+        AutoFormalisationValidator.ensureExists(manifestJsonPath, "The path to the manifest JSON file must be provided.");
+
+        // The manifest is the one file that changes on every deploy; the shards it names never do.
+        const url: URL = new URL(manifestJsonPath, globalThis.location.href);
+        const response: Response = await fetch(url.toString(), { cache: "no-cache" });
+
+        if (!response.ok) {
+            console.log(`No shard manifest at ${manifestJsonPath} (${response.status}); loading the whole papers file.`);
+
+            return null;
+        }
+
+        const manifest: unknown = JSON.parse(await response.text());
+
+        if (typeof manifest !== "object" || manifest === null || !Array.isArray((manifest as PaperManifest).shards)) {
+            throw new TypeError("The manifest JSON file must contain an object with a list of shards.");
+        }
+
+        return (manifest as PaperManifest).version === 1 ? manifest as PaperManifest : null;
+    }
+
+    public static async loadShard(manifestJsonPath: string, shard: PaperShard): Promise<Paper[]> {
+        AutoFormalisationValidator.ensureExists(shard, "The shard cannot be null or undefined.");
+
+        // Shard files are named relative to the manifest.
+        const url: URL = new URL(shard.file, new URL(manifestJsonPath, globalThis.location.href));
+        const response: Response = await fetch(url.toString());
+
+        if (!response.ok) {
+            throw new Error(`Failed to load papers from ${shard.file}: ${response.status} ${response.statusText}`);
+        }
+
+        const rawData: unknown = JSON.parse(await response.text());
+
+        if (!Array.isArray(rawData) || rawData.length !== shard.count) {
+            throw new TypeError(`The shard ${shard.file} must contain an array of ${shard.count} papers.`);
+        }
+
+        return rawData.map(AutoFormalisationPaperLoader.parsePaper);
+    }
+
+    public static loadShards(manifestJsonPath: string, manifest: PaperManifest): Promise<Paper[]>[] {
+        AutoFormalisationValidator.ensureExists(manifest, "The manifest cannot be null or undefined.");
+
+        return manifest.shards.map(shard => AutoFormalisationPaperLoader.loadShard(manifestJsonPath, shard));
+    }
+
+    public static async loadIndex(indexJsonPath: string, paperCount: number): Promise<PaperIndex | null> {
+        AutoFormalisationValidator.ensureExists(indexJsonPath, "The path to the index JSON file must be provided.");
+
+        // Like the manifest, the index changes on every deploy; a cached copy of the same size would point at the wrong papers.
+        const url: URL = new URL(indexJsonPath, globalThis.location.href);
+        const response: Response = await fetch(url.toString(), { cache: "no-cache" });
+
+        if (!response.ok) {
+            console.log(`No filter index at ${indexJsonPath} (${response.status}); filtering by scanning the papers.`);
+
+            return null;
+        }
+
+        const index: unknown = JSON.parse(await response.text());
+
+        if (typeof index !== "object" || index === null || Array.isArray(index)) {
+            throw new TypeError("The index JSON file must contain an object.");
+        }
+
+        const paperIndex: PaperIndex = index as PaperIndex;
+
+        // An index built from another version of the catalogue would point at the wrong papers.
+        if (paperIndex.version !== 2 || paperIndex.size !== paperCount) {
+            console.log(`The filter index at ${indexJsonPath} does not match the papers; filtering by scanning the papers.`);
+
+            return null;
+        }
+
+        return paperIndex;
+    }
 }
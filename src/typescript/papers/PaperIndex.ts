@@ -0,0 +1,7 @@
+export interface PaperIndex {
+    version: number;
+    size: number;
+    facets: { [facet: string]: { [value: string]: number[]; }; };
+    counts: { year: { [year: string]: number; }; llm: { [llm: string]: number; }; };
+    tokens: { [token: string]: number[]; };
+}
@@ -0,0 +1,12 @@
+export interface PaperShard {
+    file: string;
+    start: number;
+    count: number;
+}
+
+export interface PaperManifest {
+    version: number;
+    size: number;
+    shard_size: number;
+    shards: PaperShard[];
+}
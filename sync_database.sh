@@ -2,5 +2,6 @@
 
 set -euo pipefail
 
+python ./src/python/database_journal.py
 python ./src/python/bibtex_loader.py
-python ./src/python/sync_database.py
+python ./src/python/sync_database.py --incremental --shards _data/papers